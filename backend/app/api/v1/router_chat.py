@@ -1,47 +1,173 @@
-﻿from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.db.dependencies import get_db
+﻿from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dependencies import get_async_db
 from app.services.gemini_service import generate_response, generate_response_stream
-from app.services.rag_service import search_similar_chunks, build_prompt
+from app.services.rag_service import retrieve
+from app.services.prompt_builder import Prompt, assemble_prompt
+from app.services import get_embedding_service, get_embedding_batcher, get_answer_cache, get_reranker
+from app.core.config import RERANK_CANDIDATES, RERANK_TOP_K, PROMPT_TOKEN_BUDGET
+from app.core.metrics import metrics, StageTimer
 from typing import List, Optional
+import json
 import logging
+import time
 
-from app.schemas.chat import ChatRequest
+from app.schemas.chat import ChatRequest, ChatResponse, SourceInfo
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 logger = logging.getLogger(__name__)
 
-@router.post("/")
+SNIPPET_CHARS = 200
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sources(prompt: Prompt) -> List[SourceInfo]:
+    """
+    Attribution for each source in the prompt, from the rows retrieval
+    already loaded (document filenames are joined in by the search query).
+    """
+    sources = []
+    for source in prompt.sources:
+        first = source.chunks[0]
+        snippet = source.content[:SNIPPET_CHARS]
+        if len(source.content) > SNIPPET_CHARS:
+            snippet = snippet.rsplit(" ", 1)[0] + "…"
+        sources.append(SourceInfo(
+            document_id=source.document_id,
+            filename=first.document.filename,
+            chunk_index=first.chunk_index,
+            snippet=snippet,
+        ))
+    return sources
+
+
+async def _stream_events(http_request: Request, prompt: str, started: float, sources: List[dict], usage: dict):
+    """
+    Relay generated tokens as Server-Sent Events.
+
+    Stops (and thereby cancels the upstream generation) as soon as the client
+    disconnects. Time-to-first-token is measured from request arrival. After
+    the tokens a ``sources`` event lists the sources, and the ``done`` event
+    carries the prompt's token usage.
+    """
+    first_token = True
+    stream = generate_response_stream(prompt)
+    try:
+        async for text in stream:
+            if await http_request.is_disconnected():
+                metrics.counter("chat_stream_disconnects").inc()
+                return
+            if first_token:
+                metrics.histogram("chat_stream_ttft_seconds").observe(time.perf_counter() - started)
+                first_token = False
+            yield _sse_event("token", {"text": text})
+        yield _sse_event("sources", {"sources": sources})
+        yield _sse_event("done", {"usage": usage})
+    except Exception as e:
+        logger.error(f"Error while streaming response: {str(e)}")
+        yield _sse_event("error", {"detail": str(e)})
+    finally:
+        await stream.aclose()
+
+
+@router.post("/", response_model=ChatResponse)
 async def chat_with_doc(
     request: ChatRequest,
-    db: Session = Depends(get_db),
+    http_request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Handles user queries, searches relevant document chunks, and generates a response.
-    Optionally supports streaming responses.
+    Optionally streams the response as Server-Sent Events
+    (``token`` events, then ``sources`` and ``done``, or ``error``).
+
+    When re-ranking is enabled, RERANK_CANDIDATES chunks are retrieved and
+    the RERANK_TOP_K best by cross-encoder score are used. The prompt is
+    limited to PROMPT_TOKEN_BUDGET tokens and its token counts are returned
+    as ``usage``. Stage timings are returned in the ``Server-Timing`` header.
     """
+    started = time.perf_counter()
+    timer = StageTimer("chat")
+    reranker = get_reranker()
+
     if not request.message.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
 
     try:
-        # Step 1: Search for relevant chunks based on the query
-        chunks = search_similar_chunks(db, request.message, document_ids=request.document_ids, limit=5)
+        # Step 1: Embed the query (micro-batched with concurrent requests)
+        with timer.stage("embed"):
+            query_embedding = await get_embedding_batcher().embed(request.message)
+
+        # Step 2: Search for relevant chunks based on the query, over-fetching
+        # candidates for the re-ranker when it is enabled
+        with timer.stage("retrieve"):
+            chunks = await retrieve(
+                db,
+                request.message,
+                document_ids=request.document_ids,
+                limit=RERANK_CANDIDATES if reranker is not None else 5,
+                query_embedding=query_embedding,
+                mode=request.retrieval,
+            )
 
         if not chunks:
             raise HTTPException(status_code=404, detail="No relevant content found")
 
-        # Step 2: Build the prompt for the chat model using the relevant chunks
-        prompt = build_prompt(request.message, chunks)
+        if reranker is not None:
+            with timer.stage("rerank"):
+                chunks = await reranker.rerank(request.message, chunks, RERANK_TOP_K)
+
+        # Step 3: Build the prompt for the chat model using the relevant chunks
+        with timer.stage("prompt"):
+            prompt = assemble_prompt(
+                request.message,
+                chunks,
+                get_embedding_service().tokenizer,
+                PROMPT_TOKEN_BUDGET,
+            )
+        usage = prompt.usage._asdict()
+        sources = _sources(prompt)
+        metrics.histogram("chat_prompt_tokens", (256, 512, 1024, 2048, 4096, 8192)).observe(prompt.usage.prompt_tokens)
 
         if request.stream:
-            return generate_response_stream(prompt)  # Handle streaming if enabled
+            return StreamingResponse(
+                _stream_events(http_request, prompt.text, started, [s.model_dump() for s in sources], usage),
+                media_type="text/event-stream",
+                # Disable proxy buffering so tokens reach the client immediately
+                headers={
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no",
+                    "Server-Timing": timer.server_timing(),
+                },
+            )
         
+        # Reuse the answer to a near-identical question over the same chunks
+        answer_cache = get_answer_cache()
+        chunk_ids = [chunk.id for source in prompt.sources for chunk in source.chunks]
+        if answer_cache is not None:
+            cached = answer_cache.get(query_embedding, request.document_ids, chunk_ids)
+            if cached is not None:
+                response.headers["Server-Timing"] = timer.server_timing()
+                return {"response": cached, "sources": sources, "usage": usage}
+
         # For non-streaming, generate a full response
-        answer = generate_response(prompt)  # Calls the Gemini API to generate an answer
+        with timer.stage("generate"):
+            answer = await generate_response(prompt.text)  # Calls the Gemini API to generate an answer
+
+        if answer_cache is not None and answer:
+            answer_cache.put(query_embedding, request.document_ids, chunk_ids, answer)
         
-        return {"response": answer}
+        response.headers["Server-Timing"] = timer.server_timing()
+        return {"response": answer, "sources": sources, "usage": usage}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
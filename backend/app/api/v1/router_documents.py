@@ -1,81 +1,226 @@
-﻿from fastapi import APIRouter, UploadFile, File, Depends, Request, HTTPException
+﻿from fastapi import APIRouter, UploadFile, File, Form, Query, Depends, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from slowapi.util import get_remote_address
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 from app.db.dependencies import get_db
-from app.models import Document, Chunk
-from app.schemas.document import DocumentResponse
-from app.services import chunk_text, compute_file_hash
+from app.models import Document, Chunk, IngestionJob
+from app.schemas.document import DocumentPage, DocumentSummary, IngestionJobResponse
+from app.services.document_service import is_supported_filename
+from app.services.chunking import CHUNKERS
+from app.services.local_index import sync_local_index
+from app.services.blob_store import get_blob_store, iter_document_text
+from app.services.ingestion_service import get_ingestion_queue, new_upload_path, create_job
 from app.api.v1.utils import (
-    validate_file_size,
-    extract_and_validate_text,
-    check_duplicate_document,
-    create_document_record,
-    validate_chunks,
-    process_and_save_chunks,
+    save_upload_file,
+    invalidate_cached_answers,
+    encode_cursor,
+    decode_cursor,
 )
 from app.core.limiter import limiter
-from typing import List
+from app.core.config import CHUNKER_DEFAULT
+from typing import List, Literal, Optional
+import os
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
-@router.post("/upload", response_model=DocumentResponse)
+async def _enqueue_upload(
+    request: Request,
+    file: UploadFile,
+    chunker: str,
+    db: Session,
+    document_id: Optional[int] = None,
+) -> IngestionJob:
+    """
+    Validate an upload, persist it to disk and queue its ingestion job.
+    """
+    if not is_supported_filename(file.filename):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+    if chunker not in CHUNKERS:
+        raise HTTPException(status_code=400, detail=f"Unknown chunker, expected one of: {', '.join(CHUNKERS)}")
+
+    queue = get_ingestion_queue()
+    tenant = get_remote_address(request)
+    queue.admit(tenant)
+
+    try:
+        file_path = new_upload_path(file.filename)
+        await save_upload_file(file, file_path)
+        job = create_job(db, file.filename, file_path, tenant, chunker=chunker, document_id=document_id)
+    except HTTPException:
+        queue.release(tenant)
+        raise
+    except Exception as e:
+        queue.release(tenant)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Unexpected error: {str(e)}"
+        )
+
+    queue.submit(job.id, tenant)
+    return job
+
+
+@router.post("/upload", response_model=IngestionJobResponse, status_code=202)
 @limiter.limit("10/minute")
 async def upload_document(
     request: Request,
     file: UploadFile = File(...),
+    chunker: str = Form(CHUNKER_DEFAULT),
     db: Session = Depends(get_db),
 ):
     """
-    Upload and process a document for RAG system.
+    Accept a document for background ingestion.
+    
+    - `chunker` selects the chunking strategy: "token" (sentence packing up to
+      the embedding model's token limit) or "char" (fixed character windows)
+    - Validates format, then streams the file to disk enforcing the size limit (max 10MB)
+    - Queues an ingestion job
+    - Returns 202 with the job; poll /documents/jobs/{id} for progress
     
-    - Validates file size (max 10MB)
-    - Extracts and validates text content
-    - Checks for duplicates
-    - Creates document record
-    - Chunks text and generates embeddings
+    Extraction, chunking, embedding and storage run in the ingestion worker pool.
+    """
+    return await _enqueue_upload(request, file, chunker, db)
+
+
+@router.put("/{document_id}", response_model=IngestionJobResponse, status_code=202)
+@limiter.limit("10/minute")
+async def update_document(
+    request: Request,
+    document_id: int,
+    file: UploadFile = File(...),
+    chunker: str = Form(CHUNKER_DEFAULT),
+    db: Session = Depends(get_db),
+):
+    """
+    Replace a document with a revised version, re-indexing it in place.
+    
+    Only chunks whose text changed are re-embedded; unchanged chunks keep
+    their embeddings and deleted passages are removed. The document id is
+    preserved. Returns 202 with the job; poll /documents/jobs/{id} for progress.
+    """
+    if not db.query(Document.id).filter_by(id=document_id).first():
+        raise HTTPException(status_code=404, detail="Document not found")
+    return await _enqueue_upload(request, file, chunker, db, document_id=document_id)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+@limiter.limit("120/minute")
+async def get_ingestion_job(
+    request: Request,
+    job_id: int,
+    db: Session = Depends(get_db),
+):
+    job = db.query(IngestionJob).filter_by(id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/retry", response_model=IngestionJobResponse, status_code=202)
+@limiter.limit("10/minute")
+async def retry_ingestion_job(
+    request: Request,
+    job_id: int,
+    db: Session = Depends(get_db),
+):
+    """
+    Requeue a failed ingestion job from its persisted upload.
     """
+    job = db.query(IngestionJob).filter_by(id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "failed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, only failed jobs can be retried")
+    if not os.path.exists(job.file_path):
+        raise HTTPException(status_code=410, detail="Uploaded file is no longer available")
+
+    queue = get_ingestion_queue()
+    tenant = get_remote_address(request)
+    queue.admit(tenant)
+
     try:
-        # Validate file size
-        await validate_file_size(file)
-        
-        # Extract and validate text
-        text = extract_and_validate_text(file)
-        file_hash = compute_file_hash(text)
-        
-        # Check for duplicates
-        check_duplicate_document(db, file_hash)
-        
-        # Create document record
-        doc = create_document_record(db, file.filename, text, file_hash)
-        
-        # Chunk and process
-        chunks = chunk_text(text)
-        validate_chunks(chunks)
-        process_and_save_chunks(db, doc, chunks)
-        
-        return doc
-        
-    except HTTPException:
-        raise
+        job.status = "queued"
+        job.stage = "stored"
+        job.progress = 0.0
+        job.error = None
+        db.commit()
+        db.refresh(job)
     except Exception as e:
+        db.rollback()
+        queue.release(tenant)
         raise HTTPException(
             status_code=500,
-            detail=f"Unexpected error: {str(e)}"
+            detail=f"Failed to requeue job: {str(e)}"
         )
 
+    queue.submit(job.id, tenant)
+    return job
+
 
-@router.get("/", response_model=List[DocumentResponse])
+@router.get("/", response_model=DocumentPage)
 @limiter.limit("30/minute")
 async def list_documents(
-    request: Request, 
-    db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include: List[Literal["chunk_count", "size"]] = Query([]),
+    db: Session = Depends(get_db),
 ):
-    documents = (
-        db.query(Document)
-        .order_by(Document.created_at.desc())
+    """
+    List documents, newest first, one page at a time.
+    
+    - Returns metadata only; fetch text from /documents/{id}/content
+    - `include` adds `chunk_count` and/or `size` (bytes of extracted text),
+      computed in the same query
+    - Pass `next_cursor` back as `cursor` for the next page
+    """
+    columns = [Document.id, Document.filename, Document.file_hash, Document.created_at]
+    if "chunk_count" in include:
+        columns.append(
+            select(func.count(Chunk.id))
+            .where(Chunk.document_id == Document.id)
+            .scalar_subquery()
+            .label("chunk_count")
+        )
+    if "size" in include:
+        # octet_length reads the TOAST header, not the text itself
+        columns.append(func.coalesce(func.octet_length(Document.content), Document.content_size).label("size"))
+
+    query = db.query(*columns)
+    if cursor:
+        query = query.filter(tuple_(Document.created_at, Document.id) < decode_cursor(cursor))
+    rows = (
+        query
+        .order_by(Document.created_at.desc(), Document.id.desc())
+        .limit(limit + 1)
         .all()
     )
-    return documents
+
+    items = [DocumentSummary(**row._asdict()) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return DocumentPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/{document_id}/content")
+@limiter.limit("30/minute")
+async def get_document_content(
+    request: Request,
+    document_id: int,
+    db: Session = Depends(get_db),
+):
+    """
+    Stream a document's extracted text as text/plain, from its row or the
+    blob store.
+    """
+    pieces = iter_document_text(db, document_id)
+    if pieces is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return StreamingResponse(pieces, media_type="text/plain; charset=utf-8")
 
 
 @router.delete("/{document_id}")
@@ -94,6 +239,10 @@ async def delete_document(
         db.query(Chunk).filter_by(document_id=document_id).delete()
         db.delete(doc)
         db.commit()
+        if doc.content_ref:
+            get_blob_store().delete(doc.content_ref)
+        invalidate_cached_answers([document_id])
+        sync_local_index(db, [document_id])
         
         return {"message": "Document deleted successfully"}
         
@@ -1,9 +1,12 @@
 ﻿from fastapi import APIRouter, Request, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.db.dependencies import get_db
 from app.core.config import GEMINI_API_KEY
 from app.core.limiter import limiter
+from app.core.metrics import metrics
+from app.services.warmup import readiness
 
 router = APIRouter(tags=["misc"])
 
@@ -33,15 +36,50 @@ async def health(request: Request, db: Session = Depends(get_db)):
     }
 
 
+@router.get("/ready")
+@limiter.limit("100/minute")
+async def ready(request: Request, db: Session = Depends(get_db)):
+    """
+    Readiness: 503 until the models are loaded and warm and the database
+    answers, so traffic is only routed to a hot instance. ``/health`` is
+    the liveness check and does not wait for the models.
+    """
+    try:
+        db.execute(text("SELECT 1"))
+        db_ok = True
+    except Exception:
+        db_ok = False
+
+    model = readiness.status()
+    ok = db_ok and readiness.ready
+    return JSONResponse(
+        status_code=200 if ok else 503,
+        content={
+            "status": "ready" if ok else "not ready",
+            "database": "ok" if db_ok else "down",
+            "model": model,
+        },
+    )
+
+
+@router.get("/metrics")
+@limiter.limit("100/minute")
+async def get_metrics(request: Request):
+    return metrics.snapshot()
+
+
 @router.get("/rate-limit-info")
 @limiter.limit("10/minute")
 async def rate_info(request: Request):
     return {
         "rate_limits": {
             "upload": "10/minute",
+            "job_status": "120/minute",
+            "job_retry": "10/minute",
             "list": "30/minute",
             "delete": "20/minute",
             "chat": "20/minute",
             "health": "100/minute",
+            "ready": "100/minute",
         }
     }
@@ -1,74 +1,77 @@
+import base64
+import os
+from datetime import datetime
 from fastapi import HTTPException, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
-from app.models import Document, Chunk
-from app.services import get_embedding_service, extract_text_from_file
+from typing import List, Optional, Tuple
+from app.models import Document
+from app.services import get_answer_cache
 
 
-async def validate_file_size(file: UploadFile, max_size_mb: int = 10) -> bytes:
+async def save_upload_file(
+    file: UploadFile,
+    dest_path: str,
+    max_size_mb: int = 10,
+    block_size: int = 1024 * 1024,
+) -> int:
     """
-    Validate file size and return contents.
+    Stream an upload to disk in blocks, enforcing the size limit.
+    
+    Only one block is held in memory at a time; a partially written file
+    is removed if the limit is exceeded or writing fails.
     
     Args:
         file: The uploaded file
+        dest_path: Where to write the file
         max_size_mb: Maximum allowed file size in MB
+        block_size: Bytes read per block
         
     Returns:
-        File contents as bytes
+        File size in bytes
         
     Raises:
         HTTPException: If file exceeds size limit
     """
-    contents = await file.read()
-    size = len(contents)
     max_bytes = max_size_mb * 1024 * 1024
+    size = 0
     
-    if size > max_bytes:
-        raise HTTPException(
-            status_code=413, 
-            detail=f"File too large (max {max_size_mb}MB)"
-        )
-    
-    await file.seek(0)
-    return contents
-
-
-def extract_and_validate_text(file: UploadFile) -> str:
-    """
-    Extract text from file and validate it's not empty.
-    
-    Args:
-        file: The uploaded file
-        
-    Returns:
-        Extracted text content
-        
-    Raises:
-        HTTPException: If file is empty or unreadable
-    """
-    text = extract_text_from_file(file)
-    
-    if not text or not text.strip():
-        raise HTTPException(
-            status_code=400, 
-            detail="Empty or unreadable file"
-        )
+    try:
+        with open(dest_path, "wb") as out:
+            while True:
+                block = await file.read(block_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413, 
+                        detail=f"File too large (max {max_size_mb}MB)"
+                    )
+                out.write(block)
+    except Exception:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
     
-    return text
+    return size
 
 
-def check_duplicate_document(db: Session, file_hash: str) -> None:
+def check_duplicate_document(db: Session, file_hash: str, exclude_id: Optional[int] = None) -> None:
     """
     Check if document with given hash already exists.
     
     Args:
         db: Database session
         file_hash: Hash of the document content
+        exclude_id: Document allowed to have this hash (the one being updated)
         
     Raises:
         HTTPException: If duplicate document exists
     """
-    existing_doc = db.query(Document).filter_by(file_hash=file_hash).first()
+    query = db.query(Document).filter_by(file_hash=file_hash)
+    if exclude_id is not None:
+        query = query.filter(Document.id != exclude_id)
+    existing_doc = query.first()
     
     if existing_doc:
         raise HTTPException(
@@ -77,117 +80,46 @@ def check_duplicate_document(db: Session, file_hash: str) -> None:
         )
 
 
-def create_document_record(
-    db: Session, 
-    filename: str, 
-    text: str, 
-    file_hash: str
-) -> Document:
+def encode_cursor(created_at: datetime, document_id: int) -> str:
     """
-    Create and persist a new document record.
+    Opaque keyset cursor for the document list.
     
     Args:
-        db: Database session
-        filename: Original filename
-        text: Document text content
-        file_hash: Hash of the content
+        created_at: created_at of the last document on the page
+        document_id: id of the last document on the page
         
     Returns:
-        Created Document object
+        URL-safe cursor string
     """
-    doc = Document(
-        filename=filename,
-        content=text,
-        file_hash=file_hash,
-    )
-    db.add(doc)
-    db.commit()
-    db.refresh(doc)
-    return doc
+    raw = f"{created_at.isoformat()}|{document_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
 
 
-def validate_chunks(chunks: List[str]) -> None:
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
     """
-    Validate that chunks were successfully created.
+    Decode a cursor produced by ``encode_cursor``.
     
-    Args:
-        chunks: List of text chunks
-        
     Raises:
-        HTTPException: If chunking failed
+        HTTPException: If the cursor is malformed
     """
-    if not chunks:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, document_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(document_id)
+    except ValueError:
         raise HTTPException(
-            status_code=400, 
-            detail="Failed to chunk document"
+            status_code=400,
+            detail="Invalid cursor"
         )
 
 
-def create_chunk_objects(
-    document_id: int, 
-    chunks: List[str], 
-    embeddings: List
-) -> List[Chunk]:
+def invalidate_cached_answers(document_ids: List[int]) -> None:
     """
-    Create Chunk objects with embeddings.
+    Drop cached chat answers that may depend on the given documents.
     
     Args:
-        document_id: ID of the parent document
-        chunks: List of text chunks
-        embeddings: List of embedding vectors
-        
-    Returns:
-        List of Chunk objects ready for persistence
-    """
-    chunk_objects = []
-    
-    for idx, (chunk_content, embedding) in enumerate(zip(chunks, embeddings)):
-        chunk_objects.append(
-            Chunk(
-                document_id=document_id,
-                content=chunk_content,
-                embedding=embedding,
-                chunk_index=idx,
-            )
-        )
-    
-    return chunk_objects
-
-
-def process_and_save_chunks(
-    db: Session, 
-    doc: Document, 
-    chunks: List[str]
-) -> None:
+        document_ids: IDs of documents that were added, changed or removed
     """
-    Generate embeddings and save chunks to database.
-    
-    Args:
-        db: Database session
-        doc: Parent document
-        chunks: List of text chunks
-        
-    Raises:
-        HTTPException: If processing fails (also rolls back document)
-    """
-    try:
-        embedding_service = get_embedding_service()
-        embeddings = embedding_service.get_embeddings(chunks)
-        
-        chunk_objects = create_chunk_objects(doc.id, chunks, embeddings)
-        
-        db.bulk_save_objects(chunk_objects)
-        db.commit()
-        
-    except Exception as e:
-        db.rollback()
-        db.delete(doc)
-        db.commit()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to process document chunks: {str(e)}"
-        )
-
-
-
-
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.invalidate_documents(document_ids)
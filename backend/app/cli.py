@@ -0,0 +1,138 @@
+"""
+Operational commands.
+
+Usage:
+    python -m app.cli index-health
+    python -m app.cli index-rebuild [--force]
+    python -m app.cli offload-content [--batch N]
+    python -m app.cli embedding-worker [--socket PATH]
+"""
+import argparse
+import logging
+import sys
+
+from sqlalchemy import text
+
+from app.core.config import VECTOR_INDEX_TYPE, SEARCH_RECALL_TARGET, EMBEDDING_WORKER_SOCKET
+from app.db.base import engine, SessionLocal
+from app.models import Document
+from app.services import vector_index
+from app.services.blob_store import get_blob_store
+
+
+def index_health(args) -> int:
+    with engine.connect() as conn:
+        state = vector_index.read_index(conn)
+        rows = vector_index.estimate_rows(conn)
+    plan = vector_index.plan_maintenance(state, rows)
+
+    print(f"table:            {vector_index.TABLE} (~{rows} rows)")
+    print(f"configured:       {VECTOR_INDEX_TYPE} ({vector_index.OPCLASS})")
+    if state is None:
+        print(f"index:            {vector_index.INDEX_NAME} missing (searches use an exact scan)")
+    else:
+        params = f"lists={state.lists}" if state.kind == "ivfflat" else f"m={state.m}, ef_construction={state.ef_construction}"
+        print(f"index:            {vector_index.INDEX_NAME} {state.kind} ({params})")
+        print(f"opclass matches:  {'yes' if state.opclass_ok else 'NO'}")
+        print(f"valid:            {'yes' if state.valid else 'NO'}")
+        print(f"size:             {state.size_bytes / 1024 / 1024:.1f} MB")
+        print(f"built over:       {state.built_rows if state.built_rows is not None else 'unknown'} rows")
+        if state.kind == "ivfflat":
+            print(f"ideal lists:      {vector_index.ivfflat_lists(rows)}")
+
+    settings = vector_index.search_settings(SEARCH_RECALL_TARGET, 5, state)
+    print(f"search settings:  {', '.join(f'{k}={v}' for k, v in settings.items())} (recall target {SEARCH_RECALL_TARGET})")
+    print(f"action needed:    {plan or 'none'}")
+    return 1 if plan else 0
+
+
+def index_rebuild(args) -> int:
+    action = vector_index.maintain(engine, force=args.force)
+    print(action or "index is up to date (or another process is maintaining it)")
+    return 0
+
+
+def _documents_size() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT pg_total_relation_size('documents')")).scalar()
+
+
+def offload_content(args) -> int:
+    """
+    Move document text stored in the database to the blob store.
+
+    Each batch is written to the blob store before its rows are cleared, so
+    an interrupted run can simply be restarted.
+    """
+    store = get_blob_store()
+    before = _documents_size()
+    moved = 0
+
+    db = SessionLocal()
+    try:
+        while True:
+            rows = (
+                db.query(Document.id, Document.file_hash, Document.content)
+                .filter(Document.content.isnot(None))
+                .order_by(Document.id)
+                .limit(args.batch)
+                .all()
+            )
+            if not rows:
+                break
+            for document_id, file_hash, content in rows:
+                size = store.put(file_hash, [content])
+                db.query(Document).filter_by(id=document_id).update(
+                    {"content": None, "content_ref": file_hash, "content_size": size},
+                    synchronize_session=False,
+                )
+            db.commit()
+            moved += len(rows)
+            print(f"offloaded {moved} documents")
+    finally:
+        db.close()
+
+    # Plain VACUUM makes the freed TOAST space reusable; VACUUM FULL returns it to the OS
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE documents"))
+    after = _documents_size()
+    print(f"documents table: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB "
+          f"(run VACUUM FULL documents to release the space to the OS)")
+    return 0
+
+
+def embedding_worker(args) -> int:
+    """
+    Serve the embedding model to the API workers on this node.
+    """
+    from app.services.embedding_worker import run_worker
+
+    logging.basicConfig(level=logging.INFO)
+    run_worker(args.socket)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("index-health", help="Report vector index health; exits 1 if maintenance is needed")
+    rebuild = commands.add_parser("index-rebuild", help="Build or rebuild the vector index if needed")
+    rebuild.add_argument("--force", action="store_true", help="Rebuild even if the index looks healthy")
+    offload = commands.add_parser("offload-content", help="Move document text from the database to the blob store")
+    offload.add_argument("--batch", type=int, default=100, help="Documents per transaction")
+    worker = commands.add_parser("embedding-worker", help="Serve the embedding model to all API workers on the node")
+    worker.add_argument("--socket", default=EMBEDDING_WORKER_SOCKET, help="Unix socket path (default: EMBEDDING_WORKER_SOCKET)")
+
+    args = parser.parse_args(argv)
+    handler = {
+        "index-health": index_health,
+        "index-rebuild": index_rebuild,
+        "offload-content": offload_content,
+        "embedding-worker": embedding_worker,
+    }[args.command]
+    return handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
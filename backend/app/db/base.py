@@ -1,6 +1,8 @@
 ﻿from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import DATABASE_URL
+from app.core.config import DATABASE_URL, ASYNC_DATABASE_URL
 
 engine = create_engine(
     DATABASE_URL,
@@ -17,4 +19,24 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+# Async engine for request paths that must not block the event loop.
+# Derived from DATABASE_URL with the asyncpg driver unless configured explicitly.
+# Vectors are exchanged in pgvector's text format, which asyncpg passes through;
+# vector parameters are cast explicitly in the query (see rag_service).
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL or make_url(DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=1800,  # 30 minutes
+    echo=False,
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
@@ -0,0 +1,108 @@
+import io
+import struct
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+
+# Binary COPY framing (https://www.postgresql.org/docs/current/sql-copy.html)
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+NULL = struct.pack("!i", -1)
+
+CHUNK_COLUMNS = ("document_id", "content", "embedding", "chunk_index", "start_char", "end_char", "content_hash")
+
+# Rows per COPY statement, bounding the buffer held in memory
+COPY_BATCH_ROWS = 1000
+
+
+def _int4(value: Optional[int]) -> bytes:
+    if value is None:
+        return NULL
+    return b"\x00\x00\x00\x04" + struct.pack("!i", value)
+
+
+def _text(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+def encode_chunk_rows(
+    document_id: int,
+    texts: Sequence[str],
+    embeddings: np.ndarray,
+    indices: Sequence[int],
+    offsets: Sequence[Tuple[Optional[int], Optional[int]]],
+    hashes: Sequence[str],
+) -> bytes:
+    """
+    Encode chunk rows as a binary COPY stream in CHUNK_COLUMNS order.
+
+    Vectors use pgvector's binary representation (int16 dimensions, int16
+    unused, big-endian float4 values), taken straight from the array.
+    """
+    vectors = np.ascontiguousarray(embeddings, dtype=">f4")
+    dimensions = vectors.shape[1]
+    # Field length, dimensions and the unused flag are the same for every row
+    vector_prefix = struct.pack("!ihh", 4 + 4 * dimensions, dimensions, 0)
+    row_prefix = struct.pack("!h", len(CHUNK_COLUMNS)) + _int4(document_id)
+
+    parts = [COPY_HEADER]
+    for text, vector, index, (start_char, end_char), content_hash in zip(texts, vectors, indices, offsets, hashes):
+        parts.append(row_prefix)
+        parts.append(_text(text))
+        parts.append(vector_prefix)
+        parts.append(vector.tobytes())
+        parts.append(_int4(index))
+        parts.append(_int4(start_char))
+        parts.append(_int4(end_char))
+        parts.append(_text(content_hash) if content_hash is not None else NULL)
+    parts.append(COPY_TRAILER)
+    return b"".join(parts)
+
+
+def copy_chunks(
+    db: Session,
+    document_id: int,
+    texts: List[str],
+    embeddings: np.ndarray,
+    indices: Iterable[int],
+    offsets: Optional[List[Tuple[Optional[int], Optional[int]]]] = None,
+    hashes: Optional[List[str]] = None,
+    batch_rows: int = COPY_BATCH_ROWS,
+) -> None:
+    """
+    Insert chunks with binary COPY on the session's connection.
+
+    Runs inside the session's transaction, one COPY per ``batch_rows``
+    rows, so a failure rolls back with everything else the caller did.
+
+    Args:
+        db: Database session (its transaction is used)
+        document_id: ID of the parent document
+        texts: Chunk texts
+        embeddings: (len(texts), dimensions) array of vectors
+        indices: chunk_index of each chunk
+        offsets: Optional (start_char, end_char) span of each chunk
+        hashes: Optional content hash of each chunk
+    """
+    indices = list(indices)
+    offsets = offsets or [(None, None)] * len(texts)
+    hashes = hashes or [None] * len(texts)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    cursor = db.connection().connection.cursor()
+    statement = f"COPY chunks ({', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+    try:
+        for start in range(0, len(texts), batch_rows):
+            end = start + batch_rows
+            data = encode_chunk_rows(
+                document_id, texts[start:end], embeddings[start:end],
+                indices[start:end], offsets[start:end], hashes[start:end],
+            )
+            cursor.copy_expert(statement, io.BytesIO(data))
+    finally:
+        cursor.close()
+    metrics.counter("chunks_copied").inc(len(texts))
@@ -1,5 +1,5 @@
 ﻿from sqlalchemy.orm import Session
-from app.db.base import SessionLocal
+from app.db.base import SessionLocal, AsyncSessionLocal
 
 def get_db():
     db = SessionLocal()
@@ -7,3 +7,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,30 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import FULL_TEXT_CONFIG
+
+# create_all() only creates missing tables, so columns added to existing
+# tables are applied here. Every statement must be idempotent.
+MIGRATIONS = [
+    "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS start_char INTEGER",
+    "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS end_char INTEGER",
+    "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS action VARCHAR(20) NOT NULL DEFAULT 'create'",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS chunker VARCHAR(20) NOT NULL DEFAULT 'token'",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS chunk_count INTEGER",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS embeddings_reused INTEGER",
+    # Rewrites the chunks table once on existing deployments
+    "ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{FULL_TEXT_CONFIG}', content)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_chunks_content_tsv ON chunks USING gin (content_tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_documents_created_at_id ON documents (created_at DESC, id DESC)",
+    "ALTER TABLE documents ALTER COLUMN content DROP NOT NULL",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_ref VARCHAR(64)",
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_size INTEGER",
+]
+
+
+def run_migrations(engine: Engine) -> None:
+    with engine.begin() as conn:
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
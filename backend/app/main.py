@@ -12,7 +12,8 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 # Import models and database
-from app.db.base import engine, Base
+from app.db.base import engine, Base, SessionLocal
+from app.db.migrations import run_migrations
 
 
 @asynccontextmanager
@@ -24,6 +25,30 @@ async def lifespan(app: FastAPI):
         conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         conn.commit()
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    # Check the vector index in the background; search works (as an exact
+    # scan) while it is being built
+    from app.services import vector_index
+    vector_index.refresh_state(engine)
+    vector_index.maintain_in_background(engine)
+
+    # Load (or rebuild) the in-process vector index when it is enabled
+    from app.services.local_index import ensure_local_index
+    db = SessionLocal()
+    try:
+        ensure_local_index(db)
+    finally:
+        db.close()
+
+    # Load and warm the embedding model (and cross-encoder) now rather than
+    # on the first request; /ready reports when they are hot
+    from app.services.warmup import start_warmup
+    start_warmup()
+
+    # Pick up uploads that were accepted but not processed before a restart
+    from app.services.ingestion_service import resume_queued_jobs
+    resume_queued_jobs()
     yield
 
 
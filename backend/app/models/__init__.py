@@ -1,5 +1,7 @@
 from .document import Document
 from .chunk import Chunk
 from .user import User
+from .ingestion_job import IngestionJob
+from .chunk_embedding import ChunkEmbedding
 
-__all__ = ["Document", "Chunk", "User"]
+__all__ = ["Document", "Chunk", "User", "IngestionJob", "ChunkEmbedding"]
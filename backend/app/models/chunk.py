@@ -1,5 +1,8 @@
-﻿from sqlalchemy import Column, Integer, Text, ForeignKey, Index
+﻿from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from pgvector.sqlalchemy import Vector
+from app.core.config import FULL_TEXT_CONFIG
 from app.db.base import Base
 
 class Chunk(Base):
@@ -15,11 +18,26 @@ class Chunk(Base):
     # all-MiniLM-L6-v2 produces 384 dimensions
     embedding = Column(Vector(384), nullable=False)
     chunk_index = Column(Integer, nullable=False)
+    # Character span in the document text (NULL for chunks indexed before
+    # offsets were tracked)
+    start_char = Column(Integer, nullable=True)
+    end_char = Column(Integer, nullable=True)
+    # SHA-256 of the chunk text, used to reuse unchanged chunks on re-index
+    content_hash = Column(String(64), nullable=True)
+    # Full-text search vector for hybrid retrieval, maintained by Postgres
+    content_tsv = deferred(Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{FULL_TEXT_CONFIG}', content)", persisted=True),
+    ))
+
+    # Loaded explicitly (see rag_service.with_source) so that retrieval can
+    # attribute chunks without a query per chunk
+    document = relationship("Document", lazy="raise")
+
+    # The ANN index on embedding (ix_chunks_embedding) is created and rebuilt
+    # by app.services.vector_index, not by create_all, so it is never built
+    # on an empty table.
 
     __table_args__ = (
-        Index(
-            "ix_chunks_embedding",
-            "embedding",
-            postgresql_using="ivfflat",
-        ),
+        Index("ix_chunks_content_tsv", "content_tsv", postgresql_using="gin"),
     )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime
+from pgvector.sqlalchemy import Vector
+from datetime import datetime
+from app.db.base import Base
+
+class ChunkEmbedding(Base):
+    """
+    Content-addressed embedding store shared by all documents.
+
+    Keyed by SHA-256 of the embedding model id and the whitespace-normalized
+    chunk text, so boilerplate repeated across documents is embedded once.
+    """
+    __tablename__ = "chunk_embeddings"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    # all-MiniLM-L6-v2 produces 384 dimensions
+    embedding = Column(Vector(384), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
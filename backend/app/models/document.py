@@ -1,4 +1,5 @@
-﻿from sqlalchemy import Column, Integer, String, Text, DateTime
+﻿from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.orm import deferred
 from datetime import datetime
 from app.db.base import Base
 
@@ -7,6 +8,16 @@ class Document(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), index=True, nullable=False)
-    content = Column(Text, nullable=False)
+    # Extracted text; NULL when it is offloaded to the blob store
+    content = deferred(Column(Text, nullable=True))
+    # Blob store key (the file_hash the text was stored under) and the
+    # text's size in bytes, when offloaded
+    content_ref = Column(String(64), nullable=True)
+    content_size = Column(Integer, nullable=True)
     file_hash = Column(String(64), unique=True, index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination of the document list (newest first)
+        Index("ix_documents_created_at_id", created_at.desc(), id.desc()),
+    )
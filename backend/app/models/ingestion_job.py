@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
+from datetime import datetime
+from app.db.base import Base
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    # Raw upload persisted on disk until the job succeeds
+    file_path = Column(String(1024), nullable=False)
+    tenant = Column(String(255), index=True, nullable=False)
+    # queued -> running -> succeeded | failed
+    status = Column(String(20), index=True, nullable=False, default="queued")
+    # stored -> extracting -> indexing -> done
+    stage = Column(String(20), nullable=False, default="stored")
+    progress = Column(Float, nullable=False, default=0.0)
+    # "create" ingests a new document, "update" re-indexes document_id in place
+    action = Column(String(20), nullable=False, default="create")
+    # Chunking strategy, see app.services.chunking
+    chunker = Column(String(20), nullable=False, default="token")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    # Chunks indexed and how many of their embeddings were reused rather than encoded
+    chunk_count = Column(Integer, nullable=True)
+    embeddings_reused = Column(Integer, nullable=True)
+    document_id = Column(
+        Integer,
+        ForeignKey("documents.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    @property
+    def dedup_ratio(self):
+        if not self.chunk_count:
+            return None
+        return (self.embeddings_reused or 0) / self.chunk_count
@@ -1,16 +1,29 @@
 ﻿from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class ChatRequest(BaseModel):
     message: str
     document_ids: Optional[List[int]] = None
     stream: bool = False
+    # "vector" or "hybrid"; defaults to RETRIEVAL_MODE_DEFAULT
+    retrieval: Optional[Literal["vector", "hybrid"]] = None
 
 class SourceInfo(BaseModel):
     document_id: int
-    content: str
+    filename: str
+    # First chunk of the source; adjacent chunks are merged into one source
     chunk_index: int
+    snippet: str
+
+class PromptUsage(BaseModel):
+    prompt_tokens: int
+    context_tokens: int
+    retrieved_tokens: int
+    sources: int
+    sources_dropped: int
 
 class ChatResponse(BaseModel):
     response: str
+    # In prompt order: sources[0] is "[Source 1]"
     sources: List[SourceInfo]
+    usage: PromptUsage
@@ -1,6 +1,23 @@
 ﻿from pydantic import BaseModel
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+
+class DocumentSummary(BaseModel):
+    id: int
+    filename: str
+    file_hash: str
+    created_at: datetime
+    # Only present when requested with ?include=
+    chunk_count: Optional[int] = None
+    # Extracted text size in bytes
+    size: Optional[int] = None
+
+
+class DocumentPage(BaseModel):
+    items: List[DocumentSummary]
+    # Pass as ?cursor= to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
 
 class DocumentResponse(BaseModel):
     id: int
@@ -11,3 +28,25 @@ class DocumentResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class IngestionJobResponse(BaseModel):
+    id: int
+    filename: str
+    status: str
+    stage: str
+    progress: float
+    action: str
+    chunker: str
+    attempts: int
+    error: Optional[str] = None
+    chunk_count: Optional[int] = None
+    embeddings_reused: Optional[int] = None
+    # Share of chunks whose embedding was reused instead of encoded
+    dedup_ratio: Optional[float] = None
+    document_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -1,14 +1,126 @@
 import logging
-from typing import List, Optional
-from sentence_transformers import SentenceTransformer
-import torch
+import threading
+from typing import TYPE_CHECKING, List, Optional
+import numpy as np
 from functools import lru_cache
+from app.core.config import (
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_MAX_BYTES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_BACKEND,
+    EMBEDDING_ONNX_QUANTIZATION,
+    EMBEDDING_THREADS,
+    EMBEDDING_WORKER_SOCKET,
+)
+from .embedding_cache import EmbeddingCache, SqliteEmbeddingStore, normalize_cache_key
+
+# torch and sentence_transformers take seconds to import; they are loaded
+# with the model rather than with the app
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
+# ONNX exports published with the model, by quantization target. The int8
+# files are dynamically quantized (int8 weights, activations quantized at
+# run time); the avx2 build uses unsigned int8.
+ONNX_FILES = {
+    "none": "onnx/model.onnx",
+    "avx2": "onnx/model_quint8_avx2.onnx",
+    "avx512": "onnx/model_qint8_avx512.onnx",
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+    "arm64": "onnx/model_qint8_arm64.onnx",
+}
+
+
+def _load_torch(model_name: str, threads: int, quantization: str) -> "SentenceTransformer":
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        # Process-wide: also applies to the cross-encoder
+        torch.set_num_threads(threads)
+    # Automatically uses CUDA if available, otherwise CPU
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Using device: {device}")
+    return SentenceTransformer(model_name, device=device)
+
+
+def _load_onnx(model_name: str, threads: int, quantization: str) -> "SentenceTransformer":
+    if quantization not in ONNX_FILES:
+        raise ValueError(f"Unknown ONNX quantization '{quantization}', expected one of {sorted(ONNX_FILES)}")
+    # Optional dependency, installed with the "onnx" extra
+    import onnxruntime
+    from sentence_transformers import SentenceTransformer
+
+    options = onnxruntime.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+    # Batches are parallelized within operators; there is one graph to run
+    options.inter_op_num_threads = 1
+    logger.info(f"Using ONNX Runtime on CPU with {ONNX_FILES[quantization]}")
+    return SentenceTransformer(
+        model_name,
+        device="cpu",
+        backend="onnx",
+        model_kwargs={
+            "file_name": ONNX_FILES[quantization],
+            "provider": "CPUExecutionProvider",
+            "session_options": options,
+        },
+    )
+
+
+BACKENDS = {
+    "torch": _load_torch,
+    "onnx": _load_onnx,
+}
+
+
+def load_embedding_model(
+    backend: str,
+    model_name: str,
+    threads: int = EMBEDDING_THREADS,
+    quantization: str = EMBEDDING_ONNX_QUANTIZATION,
+) -> "SentenceTransformer":
+    """
+    Load the embedding model on one of the BACKENDS.
+
+    Every backend returns a SentenceTransformer, so encoding, the tokenizer
+    and max_seq_length behave the same whichever runs the model.
+
+    Args:
+        backend: "torch" or "onnx"
+        model_name: Model to load
+        threads: Intra-op threads (0 for the library default)
+        quantization: ONNX_FILES key, used by the onnx backend
+
+    Returns:
+        The loaded model
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](model_name, threads, quantization)
+
+
+def backend_variant(backend: str, quantization: str) -> str:
+    """
+    Name of the model runtime producing the vectors, e.g. "onnx-avx2".
+    """
+    if backend == "onnx":
+        return f"onnx-{quantization}"
+    return backend
+
 class SentenceTransformerService:
+    MODEL_NAME = 'all-MiniLM-L6-v2'
+    BACKEND = EMBEDDING_BACKEND
+    QUANTIZATION = EMBEDDING_ONNX_QUANTIZATION
+
     _instance = None
     _model = None
+    _cache = None
+    # Warm-up and ingestion workers may ask for the model at the same time
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -16,75 +128,185 @@ class SentenceTransformerService:
         return cls._instance
 
     def __init__(self):
-        if self._model is None:
-            self._load_model()
+        with self._lock:
+            if self._model is None:
+                self._load_model()
+            if self._cache is None:
+                self._init_cache()
+
+    def _init_cache(self):
+        store = None
+        if EMBEDDING_CACHE_PATH:
+            try:
+                store = SqliteEmbeddingStore(EMBEDDING_CACHE_PATH)
+            except Exception as e:
+                logger.warning(f"Shared embedding cache unavailable, using memory only: {e}")
+        SentenceTransformerService._cache = EmbeddingCache(
+            namespace=self.model_id,
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+            max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+            store=store,
+        )
+
+    @property
+    def model_id(self) -> str:
+        """
+        Identifies the vectors this service produces. Quantized backends give
+        slightly different vectors, so they are cached under their own id;
+        the torch backend keeps the plain model name.
+        """
+        variant = backend_variant(self.BACKEND, self.QUANTIZATION)
+        if variant == "torch":
+            return self.MODEL_NAME
+        return f"{self.MODEL_NAME}@{variant}"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def tokenizer(self):
+        return self._model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        # Inputs longer than this are truncated by the model
+        return self._model.max_seq_length
 
     def _load_model(self):
         try:
-            logger.info("Loading SentenceTransformer model 'all-MiniLM-L6-v2'...")
-            # Automatically uses CUDA if available, otherwise CPU
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            logger.info(f"Using device: {device}")
-            
-            self._model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+            logger.info(f"Loading SentenceTransformer model '{self.MODEL_NAME}' on the {self.BACKEND} backend...")
+            self._model = load_embedding_model(self.BACKEND, self.MODEL_NAME)
             logger.info("Model loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
             raise RuntimeError(f"Could not load embedding model: {e}")
 
-    def get_embedding(self, text: str) -> List[float]:
+    @property
+    def dimensions(self) -> int:
+        return self._model.get_sentence_embedding_dimension()
+
+    def encode_one(self, text: str, normalize: bool = False) -> np.ndarray:
         """
-        Generate embedding for a single text.
+        Embed a single text as a float32 vector.
+        Repeated texts are served from the embedding cache.
         """
         try:
             if not text or not text.strip():
                 raise ValueError("Cannot embed empty text")
-            
-            # encode returns a numpy array by default, convert to list
-            embedding = self._model.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
+
+            cached = self._cache.get_many([text]) if self._cache is not None else {}
+            if cached:
+                embedding = next(iter(cached.values()))
+            else:
+                embedding = np.asarray(self._model.encode(text, convert_to_tensor=False), dtype=np.float32)
+                if self._cache is not None:
+                    self._cache.put_many({text: embedding})
+            return l2_normalize(embedding) if normalize else embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
 
-    def get_embeddings(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        use_cache: bool = True,
+        normalize: bool = False,
+    ) -> np.ndarray:
         """
-        Generate embeddings for a list of texts using batch processing.
+        Embed texts as a (n, dimensions) float32 array, one row per non-blank
+        text (blank texts are skipped).
+        Only texts missing from the embedding cache are encoded.
         Includes fallback to individual processing on error.
         """
-        if not texts:
-            return []
-            
         valid_texts = [t for t in texts if t and t.strip()]
         if not valid_texts:
-            logger.warning("No valid texts provided for embedding")
+            if texts:
+                logger.warning("No valid texts provided for embedding")
+            return np.empty((0, self.dimensions), dtype=np.float32)
+
+        keys = [normalize_cache_key(t) for t in valid_texts]
+        use_cache = use_cache and self._cache is not None
+        vectors = self._cache.get_many(valid_texts) if use_cache else {}
+
+        # Encode each distinct missing text once
+        pending = {}
+        for key, text in zip(keys, valid_texts):
+            if key not in vectors and key not in pending:
+                pending[key] = text
+
+        if pending:
+            missing_texts = list(pending.values())
+            try:
+                logger.info(f"Generating embeddings for {len(missing_texts)} texts with batch_size={batch_size}")
+
+                embeddings = self._model.encode(
+                    missing_texts,
+                    batch_size=batch_size,
+                    convert_to_tensor=False,
+                    show_progress_bar=False
+                )
+                encoded = dict(zip(pending.keys(), np.asarray(embeddings, dtype=np.float32)))
+
+            except Exception as e:
+                logger.error(f"Error extracting embeddings in batch: {e}")
+                logger.info("Falling back to individual embedding generation")
+
+                # Fallback: Process one by one
+                encoded = {}
+                for i, (key, text) in enumerate(pending.items()):
+                    try:
+                        encoded[key] = np.asarray(self._model.encode(text, convert_to_tensor=False), dtype=np.float32)
+                    except Exception as inner_e:
+                        logger.error(f"Failed to embed text at index {i} during fallback: {inner_e}")
+                        raise inner_e
+
+            if use_cache:
+                self._cache.put_many({pending[key]: vector for key, vector in encoded.items()})
+            vectors.update(encoded)
+
+        result = np.stack([vectors[key] for key in keys])
+        return l2_normalize(result) if normalize else result
+
+    def get_embedding(self, text: str) -> List[float]:
+        """
+        List-returning wrapper around ``encode_one``.
+        """
+        return self.encode_one(text).tolist()
+
+    def get_embeddings(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        use_cache: bool = True,
+    ) -> List[List[float]]:
+        """
+        List-returning wrapper around ``encode``.
+        """
+        if not texts:
             return []
-            
-        try:
-            logger.info(f"Generating embeddings for {len(valid_texts)} texts with batch_size={batch_size}")
-            
-            embeddings = self._model.encode(
-                valid_texts, 
-                batch_size=batch_size, 
-                convert_to_tensor=False, 
-                show_progress_bar=False
-            )
-            return embeddings.tolist()
-            
-        except Exception as e:
-            logger.error(f"Error extracting embeddings in batch: {e}")
-            logger.info("Falling back to individual embedding generation")
-            
-            # Fallback: Process one by one
-            results = []
-            for i, text in enumerate(valid_texts):
-                try:
-                    results.append(self.get_embedding(text))
-                except Exception as inner_e:
-                    logger.error(f"Failed to embed text at index {i} during fallback: {inner_e}")
-                    raise inner_e
-            return results
+        return self.encode(texts, batch_size=batch_size, use_cache=use_cache).tolist()
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors (the last axis) to unit length, so cosine similarity is a
+    dot product.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
 
 @lru_cache()
 def get_embedding_service():
-    return SentenceTransformerService()
+    """
+    The process's embedding service: a client of the shared embedding
+    worker when EMBEDDING_WORKER_SOCKET is set, otherwise the local model.
+    """
+    if EMBEDDING_WORKER_SOCKET:
+        from .embedding_worker import RemoteEmbeddingService
+        return RemoteEmbeddingService()
+    service = SentenceTransformerService()
+    from .warmup import readiness
+    readiness.model_loaded()
+    return service
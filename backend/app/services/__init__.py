@@ -1,4 +1,7 @@
 from .SentenceTransformerService import get_embedding_service
+from .embedding_batcher import get_embedding_batcher
+from .answer_cache import get_answer_cache
+from .reranker import get_reranker
 from .document_service import extract_text_from_file, chunk_text, compute_file_hash
 
-__all__ = ["get_embedding_service", "extract_text_from_file", "chunk_text", "compute_file_hash"]
+__all__ = ["get_embedding_service", "get_embedding_batcher", "get_answer_cache", "get_reranker", "extract_text_from_file", "chunk_text", "compute_file_hash"]
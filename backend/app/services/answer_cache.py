@@ -0,0 +1,235 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("key", "embedding", "scope", "chunk_ids", "answer", "created_at", "size")
+
+    def __init__(self, key, embedding, scope, chunk_ids, answer, created_at):
+        self.key = key
+        self.embedding = embedding
+        self.scope = scope
+        self.chunk_ids = chunk_ids
+        self.answer = answer
+        self.created_at = created_at
+        self.size = embedding.nbytes + sys.getsizeof(answer)
+
+
+class _Group:
+    """
+    Entries sharing a scope and chunk set, the only ones a lookup can hit.
+
+    Their embeddings are stacked into one matrix (rebuilt lazily after a
+    change) so a lookup scores them all with one matrix-vector product.
+    """
+
+    __slots__ = ("entries", "keys", "matrix", "created")
+
+    def __init__(self):
+        self.entries: Dict[int, _Entry] = {}
+        self.keys: Optional[List[int]] = None
+        self.matrix: Optional[np.ndarray] = None
+        self.created: Optional[np.ndarray] = None
+
+    def add(self, entry: _Entry) -> None:
+        self.entries[entry.key] = entry
+        self.keys = None
+
+    def discard(self, key: int) -> None:
+        del self.entries[key]
+        self.keys = None
+
+    def stacked(self) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        if self.keys is None:
+            entries = list(self.entries.values())
+            self.keys = [entry.key for entry in entries]
+            self.matrix = np.stack([entry.embedding for entry in entries])
+            self.created = np.array([entry.created_at for entry in entries])
+        return self.keys, self.matrix, self.created
+
+
+class AnswerCache:
+    """
+    Semantic cache of generated answers.
+
+    An entry is keyed on the (L2-normalized) query embedding and the
+    ``document_ids`` scope of the request. A lookup hits when an entry in the
+    same scope has cosine similarity >= ``threshold`` with the new query and
+    was answered from exactly the same retrieved chunks.
+
+    Entries are evicted least-recently-used once ``max_entries`` or
+    ``max_bytes`` is exceeded, expire after ``ttl_seconds``, and are dropped
+    when a document they could depend on is uploaded or deleted.
+
+    Entries are grouped by (scope, chunk set), so a lookup only scores
+    the candidates it could hit, with one matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._groups: Dict[Tuple[Optional[FrozenSet[int]], FrozenSet[int]], _Group] = {}
+        self._next_key = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(document_ids: Optional[Sequence[int]]) -> Optional[FrozenSet[int]]:
+        # None means "all documents"
+        return frozenset(document_ids) if document_ids else None
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key: int) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        group_key = (entry.scope, entry.chunk_ids)
+        group = self._groups[group_key]
+        group.discard(key)
+        if not group.entries:
+            del self._groups[group_key]
+
+    def get(
+        self,
+        embedding,
+        document_ids: Optional[Sequence[int]],
+        chunk_ids: Iterable[int],
+    ) -> Optional[str]:
+        """
+        Return a cached answer for a semantically equivalent query, if any.
+        """
+        query = self._normalize(embedding)
+        scope = self._scope(document_ids)
+        chunk_ids = frozenset(chunk_ids)
+        now = time.monotonic()
+
+        with self._lock:
+            best, best_score = None, self.threshold
+            group = self._groups.get((scope, chunk_ids))
+            if group is not None and self.ttl_seconds > 0:
+                keys, _, created = group.stacked()
+                for i in np.flatnonzero(now - created > self.ttl_seconds):
+                    self._remove(keys[i])
+                group = self._groups.get((scope, chunk_ids))
+
+            if group is not None:
+                keys, matrix, _ = group.stacked()
+                scores = matrix @ query
+                i = int(np.argmax(scores))
+                if scores[i] >= best_score:
+                    best, best_score = self._entries[keys[i]], float(scores[i])
+
+            if best is None:
+                metrics.counter("answer_cache_misses").inc()
+                return None
+
+            self._entries.move_to_end(best.key)
+            metrics.counter("answer_cache_hits").inc()
+            logger.debug(f"Answer cache hit (similarity={best_score:.3f})")
+            return best.answer
+
+    def put(
+        self,
+        embedding,
+        document_ids: Optional[Sequence[int]],
+        chunk_ids: Iterable[int],
+        answer: str,
+    ) -> None:
+        entry = _Entry(
+            key=None,
+            embedding=self._normalize(embedding),
+            scope=self._scope(document_ids),
+            chunk_ids=frozenset(chunk_ids),
+            answer=answer,
+            created_at=time.monotonic(),
+        )
+        if entry.size > self.max_bytes:
+            return
+
+        with self._lock:
+            entry.key = self._next_key
+            self._next_key += 1
+            self._entries[entry.key] = entry
+            self._groups.setdefault((entry.scope, entry.chunk_ids), _Group()).add(entry)
+            self._bytes += entry.size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                metrics.counter("answer_cache_evictions").inc()
+
+    def invalidate_documents(self, document_ids: Iterable[int]) -> int:
+        """
+        Drop entries whose answer may change because these documents changed.
+
+        Unscoped entries (search over all documents) are always dropped, as
+        are entries whose scope includes one of the documents.
+        """
+        changed = set(document_ids)
+        removed = 0
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.scope is None or entry.scope & changed:
+                    self._remove(key)
+                    removed += 1
+        if removed:
+            metrics.counter("answer_cache_invalidations").inc(removed)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        hits = metrics.counter("answer_cache_hits").value
+        misses = metrics.counter("answer_cache_misses").value
+        total = hits + misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+@lru_cache()
+def get_answer_cache() -> Optional[AnswerCache]:
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    return AnswerCache()
@@ -0,0 +1,140 @@
+import logging
+import os
+import tempfile
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import BLOB_DIR, DOCUMENT_STORAGE
+from app.core.metrics import metrics
+from app.models import Document, Chunk
+from app.services.prompt_builder import stitch_chunks
+
+logger = logging.getLogger(__name__)
+
+# Characters per block when streaming text out of a blob
+READ_BLOCK_CHARS = 64 * 1024
+
+
+class BlobStore:
+    """
+    Content-addressed text blobs on the local filesystem.
+
+    A blob is stored at ``<root>/<key[:2]>/<key>`` and never modified: the
+    key is the SHA-256 of the text, so writing an existing key is a no-op.
+    Writes go to a temporary file that is renamed into place, so readers
+    never see a partial blob.
+    """
+
+    def __init__(self, root: str = BLOB_DIR):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def put(self, key: str, pieces: Iterable[str]) -> int:
+        """
+        Store text streamed as ``pieces`` under ``key``.
+
+        Returns:
+            Size of the blob in bytes
+        """
+        path = self.path(key)
+        if os.path.exists(path):
+            return os.path.getsize(path)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+                for piece in pieces:
+                    out.write(piece)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        metrics.counter("blob_store_writes").inc()
+        return os.path.getsize(path)
+
+    def iter_text(self, key: str, block_chars: int = READ_BLOCK_CHARS) -> Iterator[str]:
+        with open(self.path(key), encoding="utf-8", newline="") as f:
+            while True:
+                block = f.read(block_chars)
+                if not block:
+                    return
+                yield block
+
+    def read_text(self, key: str) -> str:
+        with open(self.path(key), encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    """
+    The blob store. Always available for reads, since documents offloaded
+    earlier stay there if DOCUMENT_STORAGE is switched back to "database".
+    """
+    return BlobStore()
+
+
+def offload_enabled() -> bool:
+    return DOCUMENT_STORAGE == "blob"
+
+
+def reconstruct_text(db: Session, document_id: int) -> Optional[str]:
+    """
+    Rebuild a document's text from its chunks, using their offsets to cut
+    the overlap between neighbours.
+
+    For documents chunked with offsets this is exact, except that
+    whitespace falling between two chunks comes back as spaces (a line
+    break there becomes a space). For older chunks the overlap is found by
+    matching text. Returns None if the document has no chunks.
+    """
+    chunks = (
+        db.query(Chunk)
+        .filter(Chunk.document_id == document_id)
+        .order_by(Chunk.chunk_index)
+        .all()
+    )
+    if not chunks:
+        return None
+    return stitch_chunks(chunks)
+
+
+def iter_document_text(db: Session, document_id: int) -> Optional[Iterator[str]]:
+    """
+    Stream a document's text from its row or the blob store.
+
+    If the blob is missing, the text is reconstructed from the chunks.
+
+    Returns:
+        An iterator of text blocks, or None if the document does not exist
+    """
+    row = db.query(Document.content_ref, Document.content).filter_by(id=document_id).first()
+    if row is None:
+        return None
+    if row.content_ref is None:
+        content = row.content or ""
+        return (content[i:i + READ_BLOCK_CHARS] for i in range(0, len(content), READ_BLOCK_CHARS))
+
+    store = get_blob_store()
+    if store.exists(row.content_ref):
+        return store.iter_text(row.content_ref)
+
+    logger.warning(f"Blob {row.content_ref} of document {document_id} is missing, rebuilding from chunks")
+    metrics.counter("blob_store_missing").inc()
+    return iter([reconstruct_text(db, document_id) or ""])
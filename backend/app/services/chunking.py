@@ -0,0 +1,189 @@
+import re
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.core.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+from .document_service import iter_chunks
+
+# Sentence ends and line breaks (paragraphs are single lines after normalization)
+UNIT_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class TextChunk(NamedTuple):
+    content: str
+    start_char: int
+    end_char: int
+
+
+def _join_pieces(pieces: Iterable[str], separator: str) -> Iterator[str]:
+    for i, piece in enumerate(pieces):
+        yield piece if i == 0 else separator + piece
+
+
+class CharChunker:
+    """
+    Fixed-size character windows with overlap (the original chunker).
+    """
+
+    name = "char"
+
+    def __init__(self, chunk_size: int = 800, overlap: int = 150):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def iter_chunks(self, pieces: Iterable[str], separator: str = "\n") -> Iterator[TextChunk]:
+        step = self.chunk_size - self.overlap
+        for i, content in enumerate(iter_chunks(pieces, self.chunk_size, self.overlap, separator)):
+            start = i * step
+            yield TextChunk(content, start, start + len(content))
+
+
+class TokenChunker:
+    """
+    Sentence-packing chunker bounded by the embedding model's token limit.
+
+    Text is tokenized once per window (``window_chars``) with character
+    offsets. Sentence and line boundaries are mapped onto token positions
+    with a vectorized search, then whole sentences are packed greedily until
+    ``max_tokens`` is reached. Consecutive chunks share up to
+    ``overlap_tokens`` tokens of trailing sentences. A sentence longer than
+    ``max_tokens`` is split at token boundaries.
+
+    Chunks never exceed the model limit, so nothing is silently truncated,
+    and every chunk records its character span in the document.
+    """
+
+    name = "token"
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 32, window_chars: int = 32 * 1024):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.window_chars = window_chars
+
+    def _token_offsets(self, text: str) -> np.ndarray:
+        encoded = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            truncation=False,
+            verbose=False,
+        )
+        offsets = np.asarray(encoded["offset_mapping"], dtype=np.int64)
+        return offsets.reshape(-1, 2)
+
+    def _units(self, text: str, starts: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Token ranges of sentences/lines, each split to fit ``max_tokens``.
+        """
+        boundaries = np.fromiter((m.end() for m in UNIT_BOUNDARY.finditer(text)), dtype=np.int64)
+        unit_starts = np.unique(np.concatenate(([0], np.searchsorted(starts, boundaries))))
+        unit_ends = np.append(unit_starts[1:], len(starts))
+
+        units = []
+        step = self.max_tokens - self.overlap_tokens
+        for start, end in zip(unit_starts.tolist(), unit_ends.tolist()):
+            if end <= start:
+                continue
+            if end - start <= self.max_tokens:
+                units.append((start, end))
+                continue
+            # Over-long sentence: overlapping token windows
+            for piece_start in range(start, end, step):
+                units.append((piece_start, min(piece_start + self.max_tokens, end)))
+                if piece_start + self.max_tokens >= end:
+                    break
+        return units
+
+    def _pack(self, text: str, final: bool) -> Tuple[List[TextChunk], int]:
+        """
+        Pack the units of ``text`` into chunks.
+
+        Unless ``final``, the chunk containing the last unit is held back
+        (the unit may continue in the next window) and the returned offset
+        is where packing should resume.
+        """
+        offsets = self._token_offsets(text)
+        if not len(offsets):
+            return [], len(text)
+
+        units = self._units(text, offsets[:, 0])
+        chunks = []
+        i = 0
+
+        while i < len(units):
+            j, tokens = i, 0
+            while j < len(units) and tokens + units[j][1] - units[j][0] <= self.max_tokens:
+                tokens += units[j][1] - units[j][0]
+                j += 1
+
+            if j == len(units) and not final:
+                break
+
+            start_char = int(offsets[units[i][0], 0])
+            end_char = int(offsets[units[j - 1][1] - 1, 1])
+            chunks.append(TextChunk(text[start_char:end_char], start_char, end_char))
+
+            if j == len(units):
+                return chunks, len(text)
+
+            # Step back over trailing sentences that fit in the overlap budget
+            k, overlap = j, 0
+            while k - 1 > i and overlap + units[k - 1][1] - units[k - 1][0] <= self.overlap_tokens:
+                k -= 1
+                overlap += units[k][1] - units[k][0]
+            i = k
+
+        return chunks, int(offsets[units[i][0], 0]) if i < len(units) else len(text)
+
+    def iter_chunks(self, pieces: Iterable[str], separator: str = "\n") -> Iterator[TextChunk]:
+        buffer = ""
+        base = 0  # document offset of buffer[0]
+
+        for piece in _join_pieces(pieces, separator):
+            buffer += piece
+            if len(buffer) < self.window_chars:
+                continue
+            chunks, consumed = self._pack(buffer, final=False)
+            for chunk in chunks:
+                yield TextChunk(chunk.content, base + chunk.start_char, base + chunk.end_char)
+            buffer = buffer[consumed:]
+            base += consumed
+
+        chunks, _ = self._pack(buffer, final=True)
+        for chunk in chunks:
+            yield TextChunk(chunk.content, base + chunk.start_char, base + chunk.end_char)
+
+    def chunk(self, text: str) -> List[TextChunk]:
+        return list(self.iter_chunks([text]))
+
+
+CHUNKERS = ("char", "token")
+
+
+@lru_cache()
+def get_chunker(name: str):
+    """
+    Return the chunker registered under ``name``.
+
+    Raises:
+        HTTPException: If the chunker is unknown
+    """
+    if name == "char":
+        return CharChunker()
+    if name == "token":
+        from .SentenceTransformerService import get_embedding_service
+
+        service = get_embedding_service()
+        # Leave room for the [CLS]/[SEP] tokens the model adds
+        max_tokens = CHUNK_MAX_TOKENS or service.max_seq_length - 2
+        return TokenChunker(service.tokenizer, max_tokens, CHUNK_OVERLAP_TOKENS)
+    raise HTTPException(
+        status_code=400,
+        detail=f"Unknown chunker '{name}', expected one of: {', '.join(CHUNKERS)}"
+    )
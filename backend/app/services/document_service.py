@@ -1,11 +1,35 @@
 ﻿import hashlib
-from io import BytesIO
-from typing import List
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO, TextIOWrapper
+from typing import BinaryIO, Iterable, Iterator, List
 
-import PyPDF2
-import docx
 from fastapi import UploadFile, HTTPException
 
+from app.core.config import (
+    PDF_EXTRACT_WORKERS,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_PAGES_PER_TASK,
+    PDF_SLOW_PAGE_SECONDS,
+)
+from app.core.metrics import metrics
+from app.utils.pdf_extract import count_pages, extract_page_range, iter_pdf_pages
+from app.utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+
+# Characters of plain text normalized and yielded at a time
+TEXT_BLOCK_SIZE = 64 * 1024
+
+
+def is_supported_filename(filename: str) -> bool:
+    return (filename or "").lower().endswith(SUPPORTED_EXTENSIONS)
+
 
 def extract_text_from_file(file: UploadFile) -> str:
     try:
@@ -14,32 +38,128 @@ def extract_text_from_file(file: UploadFile) -> str:
     except Exception:
         raise HTTPException(status_code=400, detail="Failed to read file")
 
-    filename = (file.filename or "").lower()
+    return extract_text_from_bytes(content, file.filename)
+
+
+def extract_text_from_bytes(content: bytes, filename: str) -> str:
+    return "\n".join(iter_text_from_stream(BytesIO(content), filename))
+
+
+def iter_text_from_path(path: str, filename: str) -> Iterator[str]:
+    """
+    Stream normalized text from a file on disk without loading it whole.
+    Large PDFs are extracted in parallel across a process pool.
+    """
+    if (filename or "").lower().endswith(".pdf") and PDF_EXTRACT_WORKERS > 1:
+        page_count = count_pages(path)
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            yield from _iter_pdf_parallel(path, page_count)
+            return
+
+    with open(path, "rb") as f:
+        yield from iter_text_from_stream(f, filename)
+
+
+@lru_cache()
+def get_pdf_executor() -> ProcessPoolExecutor:
+    # spawn: workers must not inherit the parent's threads, model or DB pools
+    return ProcessPoolExecutor(
+        max_workers=PDF_EXTRACT_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def _record_page(number: int, elapsed: float) -> None:
+    metrics.histogram("pdf_page_extract_seconds").observe(elapsed)
+    if elapsed >= PDF_SLOW_PAGE_SECONDS:
+        logger.warning(f"Slow PDF page {number + 1}: extraction took {elapsed:.2f}s")
+
+
+def _iter_pdf_parallel(path: str, page_count: int) -> Iterator[str]:
+    """
+    Extract page ranges in worker processes and yield text in page order.
+
+    At most two ranges per worker are in flight, so memory stays bounded
+    by the number of workers rather than by the document.
+    """
+    executor = get_pdf_executor()
+    ranges = iter(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    pending = deque()
+
+    def submit_next() -> None:
+        page_range = next(ranges, None)
+        if page_range is not None:
+            pending.append(executor.submit(extract_page_range, path, *page_range))
+
+    try:
+        for _ in range(PDF_EXTRACT_WORKERS * 2):
+            submit_next()
+
+        while pending:
+            pages = pending.popleft().result()
+            submit_next()
+            for number, text, elapsed in pages:
+                _record_page(number, elapsed)
+                if text:
+                    yield text
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_text_from_stream(stream: BinaryIO, filename: str) -> Iterator[str]:
+    """
+    Yield normalized, non-empty text pieces from a binary stream.
+
+    PDFs are read page by page, DOCX paragraph by paragraph and TXT/MD in
+    blocks of lines, so memory stays proportional to one piece rather than
+    to the document. Joining the pieces with newlines gives the same text as
+    normalizing the whole document at once.
+    """
+    filename = (filename or "").lower()
 
     if filename.endswith(".pdf"):
-        reader = PyPDF2.PdfReader(BytesIO(content))
-        text = []
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text.append(page_text)
-        return normalize_text("\n".join(text))
+        for number, text, elapsed in iter_pdf_pages(stream):
+            _record_page(number, elapsed)
+            if text:
+                yield text
 
     elif filename.endswith(".docx"):
-        doc = docx.Document(BytesIO(content))
-        return normalize_text("\n".join(p.text for p in doc.paragraphs))
+        import docx
+
+        doc = docx.Document(stream)
+        for paragraph in doc.paragraphs:
+            text = normalize_text(paragraph.text)
+            if text:
+                yield text
 
     elif filename.endswith((".txt", ".md")):
-        return normalize_text(content.decode("utf-8", errors="ignore"))
+        reader = TextIOWrapper(stream, encoding="utf-8", errors="ignore")
+        try:
+            lines = []
+            size = 0
+            for line in reader:
+                lines.append(line)
+                size += len(line)
+                if size >= TEXT_BLOCK_SIZE:
+                    text = normalize_text("".join(lines))
+                    if text:
+                        yield text
+                    lines, size = [], 0
+            text = normalize_text("".join(lines))
+            if text:
+                yield text
+        finally:
+            # Leave the underlying stream open for the caller
+            reader.detach()
 
     else:
         raise HTTPException(status_code=400, detail="Unsupported file format")
 
 
-def normalize_text(text: str) -> str:
-    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
-
-
 def chunk_text(
     text: str,
     chunk_size: int = 800,
@@ -49,19 +169,38 @@ def chunk_text(
     Character-based chunking with safe overlap.
     Tuned for embedding models.
     """
+    return list(iter_chunks([text], chunk_size=chunk_size, overlap=overlap, separator=""))
+
+
+def iter_chunks(
+    pieces: Iterable[str],
+    chunk_size: int = 800,
+    overlap: int = 150,
+    separator: str = "\n",
+) -> Iterator[str]:
+    """
+    Generator version of ``chunk_text`` over a stream of text pieces.
+
+    Produces exactly the chunks ``chunk_text(separator.join(pieces))`` would,
+    while only buffering the current window plus one incoming piece.
+    """
     if overlap >= chunk_size:
         raise ValueError("overlap must be smaller than chunk_size")
 
-    chunks = []
-    start = 0
-    text_length = len(text)
+    step = chunk_size - overlap
+    buffer = ""
+    first = True
 
-    while start < text_length:
-        end = min(start + chunk_size, text_length)
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
+    for piece in pieces:
+        buffer += piece if first else separator + piece
+        first = False
+        while len(buffer) >= chunk_size:
+            yield buffer[:chunk_size]
+            buffer = buffer[step:]
 
-    return chunks
+    while buffer:
+        yield buffer[:chunk_size]
+        buffer = buffer[step:]
 
 
 def compute_file_hash(text: str) -> str:
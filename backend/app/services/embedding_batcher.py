@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import (
+    EMBEDDING_BATCH_WINDOW_MS,
+    EMBEDDING_BATCH_MAX_SIZE,
+    EMBEDDING_EXECUTOR_WORKERS,
+)
+from app.core.metrics import metrics
+from .SentenceTransformerService import get_embedding_service
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """
+    Async micro-batching front-end for the embedding service.
+
+    Callers await ``embed(text)``. Texts arriving within ``window_ms`` of the
+    first queued text (or until ``max_batch_size`` is reached) are encoded in
+    a single ``encode`` call on a bounded thread pool, and each caller's
+    future is resolved with its own row of the result: an L2-normalized
+    float32 vector, so cosine similarity is a dot product.
+    """
+
+    def __init__(
+        self,
+        service=None,
+        window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        self._service = service
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        # Bounded so encoding never competes with more threads than cores allow
+        self.max_workers = max(1, EMBEDDING_EXECUTOR_WORKERS)
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="embed"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = get_embedding_service()
+        return self._service
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Queues and tasks are bound to the loop they were created on
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Queue a text for embedding and wait for its vector.
+        """
+        if not text or not text.strip():
+            raise ValueError("Cannot embed empty text")
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            # Wait for a free encoder before collecting, so that requests keep
+            # accumulating into the next batch while all encoders are busy.
+            await self._slots.acquire()
+            batch = await self._collect()
+            task = self._loop.create_task(self._encode(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._encode_done)
+
+    def _encode_done(self, task: asyncio.Task) -> None:
+        self._inflight.discard(task)
+        self._slots.release()
+
+    async def _encode(self, batch: list) -> None:
+        started = time.perf_counter()
+
+        for _, _, enqueued in batch:
+            metrics.histogram("embedding_queue_wait_seconds").observe(started - enqueued)
+        metrics.histogram("embedding_batch_size", BATCH_SIZE_BUCKETS).observe(len(batch))
+
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = await self._loop.run_in_executor(
+                self._executor, partial(self.service.encode, texts, normalize=True)
+            )
+            if len(embeddings) != len(texts):
+                raise RuntimeError(
+                    f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+                )
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} texts failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        metrics.histogram("embedding_batch_encode_seconds").observe(time.perf_counter() - started)
+        for (_, future, _), embedding in zip(batch, embeddings):
+            # The caller may have been cancelled while waiting
+            if not future.done():
+                future.set_result(embedding)
+
+
+@lru_cache()
+def get_embedding_batcher():
+    return EmbeddingBatcher()
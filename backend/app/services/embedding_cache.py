@@ -0,0 +1,192 @@
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_cache_key(text: str) -> str:
+    """
+    Normalize text for exact-match lookups.
+
+    Only whitespace is collapsed: the tokenizer splits on it, so texts that
+    differ only in whitespace produce identical embeddings.
+    """
+    return " ".join(text.split())
+
+
+class SqliteEmbeddingStore:
+    """
+    On-disk embedding store shared by all workers on a node.
+
+    Vectors are stored as raw float32 bytes. SQLite in WAL mode allows
+    concurrent readers across processes with a single writer at a time.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if not keys:
+            return {}
+        found = {}
+        conn = self._conn()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+        )
+        conn.commit()
+
+
+class EmbeddingCache:
+    """
+    Bounded exact-match cache of text -> embedding.
+
+    Vectors are kept as float32 arrays (1.5 KB for 384 dimensions rather than
+    ~12 KB as a list of Python floats) in an LRU bounded by entry count and
+    total bytes. An optional shared store is consulted on in-memory misses
+    and populated on inserts, so workers can reuse each other's results.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int,
+        max_bytes: int,
+        store: Optional[SqliteEmbeddingStore] = None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def _store_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _insert(self, key: str, vector: np.ndarray) -> None:
+        # Caller holds the lock
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up texts, returning a mapping of normalized key -> vector for hits.
+        """
+        keys = list(dict.fromkeys(normalize_cache_key(t) for t in texts))
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many([self._store_key(k) for k in missing])
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding store lookup failed: {e}")
+                stored = {}
+            prefix = len(self.namespace) + 1
+            with self._lock:
+                for store_key, vector in stored.items():
+                    key = store_key[prefix:]
+                    found[key] = vector
+                    self._insert(key, vector)
+
+        hits = len(found)
+        misses = len(keys) - hits
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+        metrics.counter("embedding_cache_hits").inc(hits)
+        metrics.counter("embedding_cache_misses").inc(misses)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """
+        Insert vectors keyed by raw text.
+        """
+        normalized = {
+            normalize_cache_key(text): np.asarray(vector, dtype=np.float32)
+            for text, vector in items.items()
+        }
+        with self._lock:
+            for key, vector in normalized.items():
+                self._insert(key, vector)
+
+        if self.store is not None:
+            try:
+                self.store.put_many({self._store_key(k): v for k, v in normalized.items()})
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding store write failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
@@ -0,0 +1,83 @@
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.models import ChunkEmbedding
+from .embedding_cache import normalize_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_key(text: str, model: str) -> str:
+    """
+    Content address of a chunk embedding: SHA-256 of the model id and the
+    whitespace-normalized text.
+    """
+    return hashlib.sha256(f"{model}\n{normalize_cache_key(text)}".encode("utf-8")).hexdigest()
+
+
+def lookup_embeddings(db: Session, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+    """
+    Fetch stored vectors for ``keys`` in a single query.
+    """
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    rows = db.query(ChunkEmbedding.key, ChunkEmbedding.embedding).filter(ChunkEmbedding.key.in_(keys))
+    return {key: embedding for key, embedding in rows}
+
+
+def save_embeddings(db: Session, model: str, vectors: Dict[str, np.ndarray]) -> None:
+    """
+    Insert new vectors, ignoring keys another job stored concurrently.
+    """
+    if not vectors:
+        return
+    db.execute(
+        insert(ChunkEmbedding)
+        .values([{"key": key, "model": model, "embedding": vector} for key, vector in vectors.items()])
+        .on_conflict_do_nothing(index_elements=["key"])
+    )
+
+
+def embed_with_store(db: Session, texts: List[str], service) -> Tuple[np.ndarray, int]:
+    """
+    Embed chunk texts, reusing vectors already in the store.
+
+    Only texts without a stored vector (deduplicated within the batch) are
+    sent to ``service.encode``; their vectors are added to the store in the
+    caller's transaction.
+
+    Args:
+        db: Database session
+        texts: Chunk texts
+        service: Embedding service
+
+    Returns:
+        Tuple of ((len(texts), dimensions) float32 array, number of texts
+        that were not encoded)
+    """
+    model = service.model_id
+    keys = [embedding_key(text, model) for text in texts]
+    vectors = lookup_embeddings(db, keys)
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors and key not in pending:
+            pending[key] = text
+
+    if pending:
+        # Chunk texts rarely repeat as queries; keep them out of the query cache
+        encoded = dict(zip(pending, service.encode(list(pending.values()), use_cache=False)))
+        save_embeddings(db, model, encoded)
+        vectors.update(encoded)
+
+    reused = len(texts) - len(pending)
+    metrics.counter("embedding_store_hits").inc(reused)
+    metrics.counter("embedding_store_misses").inc(len(pending))
+    return np.asarray([vectors[key] for key in keys], dtype=np.float32), reused
@@ -0,0 +1,360 @@
+"""
+Shared embedding worker.
+
+One process per node loads the embedding model and serves encode requests
+from every API worker over a Unix socket, so the model (and torch) is in
+memory once instead of once per ``uvicorn`` worker. Single-query requests
+from all connections are micro-batched together.
+
+Wire format: every message is a frame, a 4-byte big-endian length followed
+by that many bytes. A request is one JSON frame, ``{"op": "encode", "texts":
+[...], "normalize": bool, "use_cache": bool, "batch_size": int}`` or ``{"op":
+"info"}``. An encode response is a JSON frame ``{"rows": n, "dims": d}``
+followed by a frame of n * d little-endian float32 values; failures are a
+JSON frame ``{"error": "..."}``.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.core.config import (
+    EMBEDDING_EXECUTOR_WORKERS,
+    EMBEDDING_WORKER_SOCKET,
+    EMBEDDING_WORKER_CONNECT_TIMEOUT,
+)
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!I")
+# Upper bound on a frame, so a corrupt length cannot exhaust memory
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+WARMUP_TEXT = "warm up"
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _json_frame(message: dict) -> bytes:
+    return encode_frame(json.dumps(message).encode("utf-8"))
+
+
+def _check_length(length: int) -> int:
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return length
+
+
+class EmbeddingWorker:
+    """
+    Serves an embedding service over a Unix socket.
+
+    Requests that look like query embeddings (normalized, cacheable, at
+    most ``max_batch_size`` non-blank texts) go through an
+    ``EmbeddingBatcher`` shared by all connections, so concurrent queries
+    from different API workers are encoded in one forward pass. Other
+    requests (ingestion batches) are encoded as they are, on the same
+    bounded thread pool.
+    """
+
+    def __init__(self, service, executor: Optional[ThreadPoolExecutor] = None):
+        # Imported here: the batcher module pulls in the local service getter
+        from .embedding_batcher import EmbeddingBatcher
+
+        self.service = service
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max(1, EMBEDDING_EXECUTOR_WORKERS), thread_name_prefix="embed"
+        )
+        self.batcher = EmbeddingBatcher(service=service, executor=self._executor)
+
+    def info(self) -> dict:
+        return {
+            "model_id": self.service.model_id,
+            "dimensions": self.service.dimensions,
+            "max_seq_length": self.service.max_seq_length,
+            "tokenizer": self.service.tokenizer.name_or_path,
+        }
+
+    async def encode(self, request: dict) -> np.ndarray:
+        texts = request["texts"]
+        normalize = request.get("normalize", False)
+        use_cache = request.get("use_cache", True)
+
+        if (
+            normalize and use_cache
+            and 0 < len(texts) <= self.batcher.max_batch_size
+            and all(text and text.strip() for text in texts)
+        ):
+            return np.stack(await asyncio.gather(*(self.batcher.embed(text) for text in texts)))
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(
+            self.service.encode,
+            texts,
+            batch_size=request.get("batch_size", 32),
+            use_cache=use_cache,
+            normalize=normalize,
+        ))
+
+    async def _respond(self, request: dict) -> bytes:
+        op = request.get("op")
+        if op == "info":
+            return _json_frame(self.info())
+        if op != "encode":
+            raise ValueError(f"Unknown operation '{op}'")
+
+        started = time.perf_counter()
+        vectors = np.ascontiguousarray(await self.encode(request), dtype="<f4")
+        metrics.histogram("embedding_worker_request_seconds").observe(time.perf_counter() - started)
+        rows, dims = vectors.shape
+        return _json_frame({"rows": rows, "dims": dims}) + encode_frame(vectors.tobytes())
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one API worker connection until it closes.
+        """
+        try:
+            while True:
+                try:
+                    (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+                    request = json.loads(await reader.readexactly(_check_length(length)))
+                except asyncio.IncompleteReadError:
+                    return
+
+                try:
+                    response = await self._respond(request)
+                except Exception as e:
+                    logger.error(f"Embedding worker request failed: {e}")
+                    metrics.counter("embedding_worker_errors").inc()
+                    response = _json_frame({"error": str(e)})
+                writer.write(response)
+                await writer.drain()
+        except Exception as e:
+            logger.warning(f"Embedding worker connection closed: {e}")
+        finally:
+            writer.close()
+
+    async def serve(self, path: str) -> None:
+        if os.path.exists(path):
+            # Left over from a previous run; binding fails otherwise
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        logger.info(f"Embedding worker listening on {path}")
+        async with server:
+            await server.serve_forever()
+
+
+def run_worker(path: str = EMBEDDING_WORKER_SOCKET) -> None:
+    """
+    Load and warm the model, then serve it on ``path``.
+
+    The socket only appears once the model is warm, so API workers that
+    are waiting to connect become ready together with the worker.
+    """
+    if not path:
+        raise ValueError("EMBEDDING_WORKER_SOCKET (or --socket) must be set")
+    from .SentenceTransformerService import SentenceTransformerService
+
+    service = SentenceTransformerService()
+    service.encode([WARMUP_TEXT], use_cache=False, normalize=True)
+    asyncio.run(EmbeddingWorker(service).serve(path))
+
+
+class LightTokenizer:
+    """
+    The part of the HuggingFace tokenizer call interface the app uses (ids
+    and offset mappings of a text or a list of texts), on the ``tokenizers``
+    library alone. ``transformers`` imports torch when it is installed,
+    which would bring back most of the memory the shared worker saves.
+    """
+
+    def __init__(self, tokenizer, name_or_path: str):
+        # Chunkers and prompt budgets need every token, unpadded
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        self._tokenizer = tokenizer
+        self.name_or_path = name_or_path
+
+    @classmethod
+    def from_pretrained(cls, name_or_path: str) -> "LightTokenizer":
+        from tokenizers import Tokenizer
+
+        if os.path.isdir(name_or_path):
+            return cls(Tokenizer.from_file(os.path.join(name_or_path, "tokenizer.json")), name_or_path)
+        return cls(Tokenizer.from_pretrained(name_or_path), name_or_path)
+
+    def __call__(
+        self,
+        text: Union[str, Sequence[str]],
+        add_special_tokens: bool = True,
+        return_offsets_mapping: bool = False,
+        **kwargs,
+    ) -> dict:
+        single = isinstance(text, str)
+        encodings = self._tokenizer.encode_batch([text] if single else list(text), add_special_tokens=add_special_tokens)
+        result = {"input_ids": [e.ids for e in encodings]}
+        if return_offsets_mapping:
+            result["offset_mapping"] = [e.offsets for e in encodings]
+        if single:
+            result = {key: value[0] for key, value in result.items()}
+        return result
+
+
+class RemoteEmbeddingService:
+    """
+    Client for the shared embedding worker, with the embedding service's
+    interface (``encode``, ``encode_one``, ``tokenizer``, ...).
+
+    Each thread keeps its own connection, so the batcher's threads and the
+    ingestion workers can call it concurrently. Only the tokenizer is
+    loaded in the API process: chunking and prompt budgets count tokens
+    locally.
+    """
+
+    def __init__(self, path: str = EMBEDDING_WORKER_SOCKET, connect_timeout: float = EMBEDDING_WORKER_CONNECT_TIMEOUT):
+        self.path = path
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._info: Optional[dict] = None
+        self._tokenizer = None
+
+    def _connect(self) -> socket.socket:
+        # The worker may still be loading the model; wait for its socket
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                conn.connect(self.path)
+                return conn
+            except (FileNotFoundError, ConnectionRefusedError):
+                conn.close()
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(
+                        f"Embedding worker at {self.path} not reachable after {self.connect_timeout:.0f}s"
+                    )
+                time.sleep(0.2)
+
+    def _connection(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _read_exactly(conn: socket.socket, size: int) -> bytes:
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = conn.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("Embedding worker closed the connection")
+            received += count
+        return bytes(data)
+
+    def _read_frame(self, conn: socket.socket) -> bytes:
+        (length,) = FRAME_HEADER.unpack(self._read_exactly(conn, FRAME_HEADER.size))
+        return self._read_exactly(conn, _check_length(length))
+
+    def _call(self, request: dict) -> Tuple[dict, Optional[bytes]]:
+        """
+        Send a request and read its response. Requests are idempotent, so
+        a broken connection (e.g. the worker restarted) is retried once on
+        a new one.
+        """
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.sendall(_json_frame(request))
+                header = json.loads(self._read_frame(conn))
+                payload = self._read_frame(conn) if "rows" in header else None
+                break
+            except OSError:
+                self._close()
+                if attempt:
+                    raise
+            except Exception:
+                # The stream is out of sync; start over on the next call
+                self._close()
+                raise
+        if "error" in header:
+            raise RuntimeError(f"Embedding worker error: {header['error']}")
+        return header, payload
+
+    @property
+    def info(self) -> dict:
+        if self._info is None:
+            self._info = self._call({"op": "info"})[0]
+        return self._info
+
+    @property
+    def model_id(self) -> str:
+        return self.info["model_id"]
+
+    @property
+    def dimensions(self) -> int:
+        return self.info["dimensions"]
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.info["max_seq_length"]
+
+    @property
+    def tokenizer(self):
+        with self._lock:
+            if self._tokenizer is None:
+                self._tokenizer = LightTokenizer.from_pretrained(self.info["tokenizer"])
+            return self._tokenizer
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        use_cache: bool = True,
+        normalize: bool = False,
+    ) -> np.ndarray:
+        """
+        Embed texts in the worker. Same contract as
+        ``SentenceTransformerService.encode``.
+        """
+        started = time.perf_counter()
+        header, payload = self._call({
+            "op": "encode",
+            "texts": list(texts),
+            "batch_size": batch_size,
+            "use_cache": use_cache,
+            "normalize": normalize,
+        })
+        metrics.histogram("embedding_worker_call_seconds").observe(time.perf_counter() - started)
+        return np.frombuffer(payload, dtype="<f4").astype(np.float32).reshape(header["rows"], header["dims"])
+
+    def encode_one(self, text: str, normalize: bool = False) -> np.ndarray:
+        if not text or not text.strip():
+            raise ValueError("Cannot embed empty text")
+        return self.encode([text], normalize=normalize)[0]
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.encode_one(text).tolist()
+
+    def get_embeddings(self, texts: List[str], batch_size: int = 32, use_cache: bool = True) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.encode(texts, batch_size=batch_size, use_cache=use_cache).tolist()
@@ -1,44 +1,73 @@
-﻿import google.generativeai as genai
-import time
+﻿import time
 from google.api_core import exceptions
 from tenacity import (
+    Retrying,
     retry,
     stop_after_attempt,
+    stop_when_event_set,
     wait_exponential,
     retry_if_exception_type,
 )
-from app.core.config import GEMINI_API_KEY
+from app.core.config import (
+    GEMINI_API_KEY,
+    GEMINI_MIN_REQUEST_INTERVAL,
+    GEMINI_STREAM_BUFFER,
+    GEMINI_STREAM_WORKERS,
+)
+from app.core.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from typing import List
+import concurrent.futures
 import logging
 import asyncio
+import threading
 
 logger = logging.getLogger(__name__)
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Threads that pump synchronous Gemini streams into the event loop
+_stream_executor = ThreadPoolExecutor(
+    max_workers=GEMINI_STREAM_WORKERS, thread_name_prefix="gemini-stream"
+)
 
 
-# Global rate limiter state
-_last_request_time = 0
-_min_request_interval = 1.0  # Minimum seconds between requests
+class AsyncRateLimiter:
+    """
+    Non-blocking rate limiter to prevent overwhelming the API.
 
+    Each caller reserves the next free slot synchronously (no await between
+    reading and updating state, so no lock is needed on a single event loop)
+    and then sleeps until its slot with ``asyncio.sleep``.
+    """
 
-def _rate_limit():
-    """Simple rate limiter to prevent overwhelming the API"""
-    global _last_request_time
-    current_time = time.time()
-    time_since_last = current_time - _last_request_time
-    
-    if time_since_last < _min_request_interval:
-        sleep_time = _min_request_interval - time_since_last
-        logger.debug(f"Rate limiting: sleeping for {sleep_time:.2f}s")
-        time.sleep(sleep_time)
-    
-    _last_request_time = time.time()
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            logger.debug(f"Rate limiting: sleeping for {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+_rate_limiter = AsyncRateLimiter(GEMINI_MIN_REQUEST_INTERVAL)
+
+
+async def _rate_limit():
+    await _rate_limiter.acquire()
 
 
 @lru_cache
 def get_chat_model():
+    # The SDK takes about a second to import, so it is loaded on first use
+    import google.generativeai as genai
+
+    genai.configure(api_key=GEMINI_API_KEY)
     return genai.GenerativeModel("gemini-flash-latest")
 
 
@@ -51,12 +80,12 @@ def get_chat_model():
     wait=wait_exponential(multiplier=2, min=4, max=30),
     stop=stop_after_attempt(5),
 )
-def generate_response(prompt: str) -> str:
-    _rate_limit()
+async def generate_response(prompt: str) -> str:
+    await _rate_limit()
     
     try:
         model = get_chat_model()
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         return response.text or ""
     except exceptions.InvalidArgument as e:
         raise ValueError(f"Invalid input to Gemini: {e}")
@@ -67,26 +96,145 @@ def generate_response(prompt: str) -> str:
         raise RuntimeError(f"Generation failed: {e}")
 
 
-@retry(
-    retry=retry_if_exception_type(
-        (exceptions.ResourceExhausted, exceptions.ServiceUnavailable)
-    ),
-    wait=wait_exponential(multiplier=2, min=4, max=30),
-    stop=stop_after_attempt(5),
-)
-async def generate_response_stream(prompt: str):
-    _rate_limit()
-    
+_STREAM_DONE = object()
+
+
+def _open_stream(prompt: str, cancelled: threading.Event, on_open=None):
+    """
+    Start a streaming generation and wait for its first chunk.
+
+    Retrying is only safe before any token has reached the client, so the
+    retry wraps the call up to and including the first chunk. Once
+    ``cancelled`` is set, the backoff is cut short and no new attempt is
+    made. ``on_open`` receives each response as soon as it exists, so the
+    caller can cancel a call still waiting for its first chunk.
+
+    Returns:
+        (response, chunk iterator, first chunk), or None if cancelled
+    """
+    for attempt in Retrying(
+        retry=retry_if_exception_type(
+            (exceptions.ResourceExhausted, exceptions.ServiceUnavailable)
+        ),
+        wait=wait_exponential(multiplier=2, min=4, max=30),
+        stop=stop_after_attempt(5) | stop_when_event_set(cancelled),
+        sleep=cancelled.wait,
+        reraise=True,
+    ):
+        with attempt:
+            if cancelled.is_set():
+                return None
+            model = get_chat_model()
+            response = model.generate_content(prompt, stream=True)
+            if on_open is not None:
+                on_open(response)
+            chunks = iter(response)
+            first = next(chunks, None)
+            return response, chunks, first
+
+
+_cancel_unsupported_logged = False
+
+
+def _cancel_upstream(response) -> None:
+    global _cancel_unsupported_logged
+
+    # The SDK exposes no public cancel; the underlying gRPC call does
+    call = getattr(response, "_iterator", None)
+    cancel = getattr(call, "cancel", None)
+    if not callable(cancel):
+        metrics.counter("gemini_stream_cancel_unsupported").inc()
+        if not _cancel_unsupported_logged:
+            _cancel_unsupported_logged = True
+            logger.warning(
+                f"Cannot cancel Gemini streams: {type(response).__name__} has no "
+                f"'_iterator.cancel' (SDK changed?); abandoned generations will run to completion"
+            )
+        return
     try:
-        model = get_chat_model()
-        response = model.generate_content(prompt, stream=True)
-        for chunk in response:
-            if chunk.text:
-                yield chunk.text
-    except exceptions.InvalidArgument as e:
-        yield f"\n[Error: Invalid input to Gemini: {e}]"
-    except exceptions.ResourceExhausted as e:
-        logger.warning(f"Rate limit hit in generate_response_stream: {e}")
-        yield f"\n[Error: Rate limit exceeded. Please try again in a moment.]"
+        cancel()
     except Exception as e:
-        yield f"\n[Error generating response: {e}]"
\ No newline at end of file
+        logger.debug(f"Failed to cancel upstream stream: {e}")
+
+
+async def generate_response_stream(prompt: str, max_buffered: int = GEMINI_STREAM_BUFFER):
+    """
+    Stream generated text without blocking the event loop.
+
+    The synchronous Gemini stream is consumed on a background thread that
+    pushes text into a bounded asyncio queue. When the queue is full the
+    thread waits (backpressure); when the consumer stops iterating (client
+    disconnect, cancellation) the upstream call is cancelled right away and
+    the thread stops reading.
+
+    Raises:
+        ValueError: If Gemini rejects the input
+        RuntimeError: If generation fails
+    """
+    await _rate_limit()
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+    cancelled = threading.Event()
+    # The open upstream response, so the consumer can cancel it directly
+    upstream = []
+
+    def put(item) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if cancelled.is_set():
+                    future.cancel()
+                    return False
+
+    def pump():
+        try:
+            opened = _open_stream(prompt, cancelled, on_open=upstream.append)
+            if opened is None:
+                return
+            _, chunks, first = opened
+            if first is not None and first.text and not put(first.text):
+                return
+            for chunk in chunks:
+                if cancelled.is_set():
+                    return
+                if chunk.text and not put(chunk.text):
+                    return
+        except exceptions.InvalidArgument as e:
+            put(ValueError(f"Invalid input to Gemini: {e}"))
+        except exceptions.ResourceExhausted as e:
+            logger.warning(f"Rate limit hit in generate_response_stream: {e}")
+            put(RuntimeError("Rate limit exceeded. Please try again in a moment."))
+        except Exception as e:
+            put(RuntimeError(f"Generation failed: {e}"))
+        finally:
+            if cancelled.is_set():
+                # The consumer may have left before the response existed
+                for response in upstream:
+                    _cancel_upstream(response)
+            else:
+                put(_STREAM_DONE)
+
+    loop.run_in_executor(_stream_executor, pump)
+    finished = False
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_DONE or isinstance(item, Exception):
+                finished = True
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        if not finished:
+            logger.info("Stream consumer went away, cancelling upstream generation")
+            # Cancel here rather than in the pump, which may be blocked
+            # waiting for the next chunk and would only notice after it
+            for response in upstream:
+                _cancel_upstream(response)
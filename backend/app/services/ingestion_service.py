@@ -0,0 +1,596 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, TextIO, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    UPLOAD_DIR,
+    INGESTION_WORKERS,
+    INGESTION_QUEUE_SIZE,
+    INGESTION_MAX_PENDING_PER_TENANT,
+    INGESTION_STAGE_RETRIES,
+    INGESTION_EMBED_BATCH,
+    INGESTION_STALE_JOB_SECONDS,
+    INGESTION_MAX_ATTEMPTS,
+    CHUNKER_DEFAULT,
+)
+from app.core.metrics import metrics
+from app.db.base import SessionLocal, engine
+from app.db.bulk import copy_chunks
+from app.models import Document, Chunk, IngestionJob
+from app.services import get_embedding_service, compute_file_hash
+from app.services.embedding_store import embed_with_store
+from app.services.vector_index import maintain_in_background
+from app.services.local_index import sync_local_index
+from app.services.blob_store import get_blob_store, offload_enabled
+from app.services.document_service import iter_text_from_path
+from app.services.chunking import get_chunker, TextChunk
+from app.api.v1.utils import (
+    check_duplicate_document,
+    invalidate_cached_answers,
+)
+
+logger = logging.getLogger(__name__)
+
+# Progress reported when each stage starts
+STAGE_PROGRESS = {
+    "stored": 0.0,
+    "extracting": 0.05,
+    "indexing": 0.2,
+    "done": 1.0,
+}
+
+# Characters read back from the spooled text at a time
+SPOOL_READ_SIZE = 64 * 1024
+
+# Seconds between heartbeats while a long extraction produces no progress;
+# well below INGESTION_STALE_JOB_SECONDS so live jobs are never recovered
+HEARTBEAT_SECONDS = 60
+
+
+def new_upload_path(filename: str) -> str:
+    """
+    Return a unique path in UPLOAD_DIR for a raw upload.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    safe_name = os.path.basename(filename or "upload")
+    return os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{safe_name}")
+
+
+def create_job(
+    db: Session,
+    filename: str,
+    file_path: str,
+    tenant: str,
+    chunker: str = CHUNKER_DEFAULT,
+    document_id: Optional[int] = None,
+) -> IngestionJob:
+    """
+    Persist a queued ingestion job.
+
+    With ``document_id`` the job re-indexes that document in place instead
+    of creating a new one.
+    """
+    job = IngestionJob(
+        filename=filename,
+        file_path=file_path,
+        tenant=tenant,
+        chunker=chunker,
+        action="update" if document_id is not None else "create",
+        document_id=document_id,
+        status="queued",
+        stage="stored",
+        progress=0.0,
+        attempts=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _update_job(db: Session, job: IngestionJob, **fields) -> None:
+    for name, value in fields.items():
+        setattr(job, name, value)
+    db.commit()
+
+
+def _claim_job(db: Session, job_id: int) -> bool:
+    """
+    Atomically move a job from queued to running.
+
+    Guarantees a job runs once even if several API workers resubmit it.
+    """
+    result = db.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id, IngestionJob.status == "queued")
+        .values(status="running", attempts=IngestionJob.attempts + 1, error=None)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _run_stage(db: Session, job: IngestionJob, stage: str, fn: Callable):
+    """
+    Run one pipeline stage, retrying transient failures with backoff.
+
+    HTTPExceptions signal bad input (unsupported format, duplicate, empty
+    file) and are not retried.
+    """
+    _update_job(db, job, stage=stage, progress=STAGE_PROGRESS[stage])
+    started = time.perf_counter()
+
+    for attempt in range(1, INGESTION_STAGE_RETRIES + 1):
+        try:
+            result = fn()
+            metrics.histogram(f"ingestion_{stage}_seconds").observe(time.perf_counter() - started)
+            return result
+        except HTTPException:
+            raise
+        except Exception as e:
+            db.rollback()
+            if attempt == INGESTION_STAGE_RETRIES:
+                raise
+            delay = 2 ** (attempt - 1)
+            logger.warning(
+                f"Job {job.id} stage '{stage}' failed (attempt {attempt}), retrying in {delay}s: {e}"
+            )
+            time.sleep(delay)
+
+
+def _extract_to_spool(job: IngestionJob, spool: TextIO) -> Tuple[str, int]:
+    """
+    Stream extracted text into a spool file, hashing it on the way.
+
+    Returns the SHA-256 of the normalized text (identical to
+    ``compute_file_hash`` over the joined text) and its length in characters.
+    """
+    spool.seek(0)
+    spool.truncate()
+    digest = hashlib.sha256()
+    length = 0
+    heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+
+    for i, piece in enumerate(iter_text_from_path(job.file_path, job.filename)):
+        if i:
+            piece = "\n" + piece
+        digest.update(piece.encode("utf-8"))
+        spool.write(piece)
+        length += len(piece)
+        if time.monotonic() >= heartbeat:
+            # Touches updated_at, so startup recovery can tell this job is alive
+            _report_progress(job.id, STAGE_PROGRESS["extracting"])
+            heartbeat = time.monotonic() + HEARTBEAT_SECONDS
+
+    spool.flush()
+    return digest.hexdigest(), length
+
+
+def _read_spool(spool: TextIO) -> Iterator[str]:
+    spool.seek(0)
+    while True:
+        block = spool.read(SPOOL_READ_SIZE)
+        if not block:
+            return
+        yield block
+
+
+def _store_text(doc: Document, spool: TextIO, file_hash: str) -> Optional[str]:
+    """
+    Put the spooled text on the document row, or in the blob store when
+    DOCUMENT_STORAGE is "blob".
+
+    Returns:
+        The blob key written, so the caller can remove it if the
+        transaction fails
+    """
+    if not offload_enabled():
+        spool.seek(0)
+        doc.content = spool.read()
+        doc.content_ref = None
+        doc.content_size = None
+        return None
+
+    store = get_blob_store()
+    written = None if store.exists(file_hash) else file_hash
+    doc.content_size = store.put(file_hash, _read_spool(spool))
+    doc.content = None
+    doc.content_ref = file_hash
+    return written
+
+
+def _index_document(db: Session, job: IngestionJob, spool: TextIO, file_hash: str, length: int) -> Document:
+    """
+    Chunk, embed and insert the spooled text in a single transaction.
+
+    Chunks are embedded and flushed in batches of INGESTION_EMBED_BATCH as
+    they are produced, so only one batch of chunks and vectors is held in
+    memory at a time.
+    """
+    chunker = get_chunker(job.chunker or CHUNKER_DEFAULT)
+    check_duplicate_document(db, file_hash)
+
+    doc = Document(filename=job.filename, file_hash=file_hash)
+    written = _store_text(doc, spool, file_hash)
+    try:
+        db.add(doc)
+        db.flush()
+        _insert_chunks(db, job, doc, chunker, spool, length)
+    except Exception:
+        if written:
+            get_blob_store().delete(written)
+        raise
+    db.refresh(doc)
+    return doc
+
+
+def _insert_chunks(db: Session, job: IngestionJob, doc: Document, chunker, spool: TextIO, length: int) -> None:
+    """
+    Chunk the spooled text into ``doc`` batch by batch, then commit.
+    """
+    start_progress = STAGE_PROGRESS["indexing"]
+    span = STAGE_PROGRESS["done"] - start_progress
+
+    batch: List[TextChunk] = []
+    chunk_count = 0
+    deduplicated = 0
+
+    def flush_batch():
+        nonlocal deduplicated
+        deduplicated += _embed_and_insert(db, doc.id, batch, range(chunk_count, chunk_count + len(batch)))
+        # Progress is committed on a separate session so the document stays
+        # invisible until all of its chunks are in
+        _report_progress(job.id, start_progress + span * min(batch[-1].end_char, length) / length)
+
+    for chunk in chunker.iter_chunks(_read_spool(spool), separator=""):
+        batch.append(chunk)
+        if len(batch) >= INGESTION_EMBED_BATCH:
+            flush_batch()
+            chunk_count += len(batch)
+            batch = []
+
+    if batch:
+        flush_batch()
+        chunk_count += len(batch)
+
+    if not chunk_count:
+        raise HTTPException(status_code=400, detail="Failed to chunk document")
+
+    _record_dedup(job, chunk_count, deduplicated)
+    db.commit()
+    metrics.histogram("ingestion_chunks_per_document", (1, 10, 50, 100, 500, 1000, 5000)).observe(chunk_count)
+
+
+def _embed_and_insert(db: Session, document_id: int, chunks: List[TextChunk], indices) -> int:
+    """
+    Embed a batch of chunks and write it with binary COPY in the current
+    transaction.
+
+    Returns the number of chunks whose vector came from the embedding store.
+    """
+    texts = [chunk.content for chunk in chunks]
+    embeddings, reused = embed_with_store(db, texts, get_embedding_service())
+    copy_chunks(
+        db, document_id, texts, embeddings, indices,
+        offsets=[(chunk.start_char, chunk.end_char) for chunk in chunks],
+        hashes=[compute_file_hash(text) for text in texts],
+    )
+    return reused
+
+
+def _record_dedup(job: IngestionJob, chunk_count: int, reused: int) -> None:
+    """
+    Record how many of a job's chunks did not need to be encoded.
+    """
+    job.chunk_count = chunk_count
+    job.embeddings_reused = reused
+    metrics.histogram("ingestion_dedup_ratio", (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)).observe(
+        reused / chunk_count
+    )
+    logger.info(f"Job {job.id}: {reused}/{chunk_count} chunk embeddings reused")
+
+
+def _existing_chunks_by_hash(db: Session, document_id: int) -> dict:
+    """
+    Map content hash -> ids of the document's current chunks.
+
+    Chunks stored before hashes were recorded are hashed from their content.
+    """
+    by_hash = defaultdict(list)
+    legacy = []
+    for chunk_id, content_hash in db.query(Chunk.id, Chunk.content_hash).filter(Chunk.document_id == document_id):
+        if content_hash:
+            by_hash[content_hash].append(chunk_id)
+        else:
+            legacy.append(chunk_id)
+
+    if legacy:
+        for chunk_id, content in db.query(Chunk.id, Chunk.content).filter(Chunk.id.in_(legacy)):
+            by_hash[compute_file_hash(content)].append(chunk_id)
+    return by_hash
+
+
+def _reindex_document(db: Session, job: IngestionJob, spool: TextIO, file_hash: str, length: int) -> Document:
+    """
+    Re-index an existing document in place from a revised upload.
+
+    The new text is re-chunked and every chunk is matched by content hash
+    against the document's current chunks. Matches keep their row and
+    embedding and only have their position updated; new or changed chunks
+    are embedded and inserted; chunks that no longer occur are deleted. All
+    of it happens in one transaction, so searches see either version whole.
+    """
+    doc = db.get(Document, job.document_id) if job.document_id else None
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    check_duplicate_document(db, file_hash, exclude_id=doc.id)
+
+    chunker = get_chunker(job.chunker or CHUNKER_DEFAULT)
+    start_progress = STAGE_PROGRESS["indexing"]
+    span = STAGE_PROGRESS["done"] - start_progress
+
+    reusable = _existing_chunks_by_hash(db, doc.id)
+    moved: List[dict] = []
+    batch: List[TextChunk] = []
+    batch_indices: List[int] = []
+    reused = inserted = store_hits = chunk_count = 0
+
+    for index, chunk in enumerate(chunker.iter_chunks(_read_spool(spool), separator="")):
+        chunk_count += 1
+        content_hash = compute_file_hash(chunk.content)
+        ids = reusable.get(content_hash)
+
+        if ids:
+            moved.append({
+                "id": ids.pop(),
+                "chunk_index": index,
+                "start_char": chunk.start_char,
+                "end_char": chunk.end_char,
+                "content_hash": content_hash,
+            })
+            reused += 1
+        else:
+            batch.append(chunk)
+            batch_indices.append(index)
+
+        if len(batch) >= INGESTION_EMBED_BATCH or len(moved) >= INGESTION_EMBED_BATCH:
+            if batch:
+                store_hits += _embed_and_insert(db, doc.id, batch, batch_indices)
+                inserted += len(batch)
+            db.bulk_update_mappings(Chunk, moved)
+            batch, batch_indices, moved = [], [], []
+            _report_progress(job.id, start_progress + span * min(chunk.end_char, length) / length)
+
+    if not chunk_count:
+        raise HTTPException(status_code=400, detail="Failed to chunk document")
+
+    if batch:
+        store_hits += _embed_and_insert(db, doc.id, batch, batch_indices)
+        inserted += len(batch)
+    if moved:
+        db.bulk_update_mappings(Chunk, moved)
+
+    stale = [chunk_id for ids in reusable.values() for chunk_id in ids]
+    if stale:
+        db.query(Chunk).filter(Chunk.id.in_(stale)).delete(synchronize_session=False)
+
+    previous_ref = doc.content_ref
+    doc.filename = job.filename
+    doc.file_hash = file_hash
+    written = _store_text(doc, spool, file_hash)
+    _record_dedup(job, chunk_count, reused + store_hits)
+    try:
+        db.commit()
+    except Exception:
+        if written:
+            get_blob_store().delete(written)
+        raise
+    if previous_ref and previous_ref != doc.content_ref:
+        get_blob_store().delete(previous_ref)
+    db.refresh(doc)
+
+    metrics.counter("reindex_chunks_reused").inc(reused)
+    metrics.counter("reindex_chunks_inserted").inc(inserted)
+    metrics.counter("reindex_chunks_deleted").inc(len(stale))
+    logger.info(
+        f"Re-indexed document {doc.id}: {reused} chunks kept, {inserted} inserted "
+        f"({store_hits} from the embedding store), {len(stale)} deleted"
+    )
+    return doc
+
+
+def _report_progress(job_id: int, progress: float) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(IngestionJob).where(IngestionJob.id == job_id).values(progress=progress))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_job(job_id: int) -> None:
+    """
+    Execute an ingestion job: extract, then chunk, embed and store.
+    """
+    db = SessionLocal()
+    try:
+        if not _claim_job(db, job_id):
+            return
+        job = db.get(IngestionJob, job_id)
+        started = time.perf_counter()
+
+        try:
+            # Extracted text is spooled to disk rather than held in memory
+            with tempfile.TemporaryFile(mode="w+", encoding="utf-8", dir=UPLOAD_DIR) as spool:
+                file_hash, length = _run_stage(db, job, "extracting", lambda: _extract_to_spool(job, spool))
+                if not length:
+                    raise HTTPException(status_code=400, detail="Empty or unreadable file")
+
+                index = _reindex_document if job.action == "update" else _index_document
+                doc = _run_stage(
+                    db, job, "indexing",
+                    lambda: index(db, job, spool, file_hash, length),
+                )
+
+        except Exception as e:
+            db.rollback()
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Ingestion job {job_id} failed at stage '{job.stage}': {detail}")
+            _update_job(db, job, status="failed", error=detail)
+            metrics.counter("ingestion_jobs_failed").inc()
+            return
+
+        invalidate_cached_answers([doc.id])
+        sync_local_index(db, [doc.id])
+        _update_job(db, job, status="succeeded", stage="done", progress=1.0, document_id=doc.id)
+        metrics.counter("ingestion_jobs_succeeded").inc()
+        metrics.histogram("ingestion_job_seconds").observe(time.perf_counter() - started)
+        # Rebuild the ANN index if the table has outgrown it, off this worker
+        maintain_in_background(engine)
+
+        try:
+            os.remove(job.file_path)
+        except OSError as e:
+            logger.warning(f"Could not remove upload {job.file_path}: {e}")
+
+    except Exception as e:
+        logger.error(f"Unexpected error running ingestion job {job_id}: {e}")
+    finally:
+        db.close()
+
+
+class IngestionQueue:
+    """
+    Bounded worker pool for ingestion jobs with admission control.
+
+    At most ``max_pending`` jobs may be queued or running in this process and
+    at most ``max_pending_per_tenant`` per tenant, so one tenant's bulk upload
+    cannot occupy every slot. A small fixed number of workers keeps
+    ingestion from starving chat traffic of CPU.
+    """
+
+    def __init__(
+        self,
+        workers: int = INGESTION_WORKERS,
+        max_pending: int = INGESTION_QUEUE_SIZE,
+        max_pending_per_tenant: int = INGESTION_MAX_PENDING_PER_TENANT,
+    ):
+        self.max_pending = max_pending
+        self.max_pending_per_tenant = max_pending_per_tenant
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest")
+        self._pending = 0
+        self._per_tenant = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def admit(self, tenant: str) -> None:
+        """
+        Reserve a slot for a new job, or reject it.
+
+        Raises:
+            HTTPException: 503 if the queue is full, 429 if the tenant is at its limit
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                metrics.counter("ingestion_rejected").inc()
+                raise HTTPException(status_code=503, detail="Ingestion queue is full, try again later")
+            if self._per_tenant[tenant] >= self.max_pending_per_tenant:
+                metrics.counter("ingestion_rejected").inc()
+                raise HTTPException(status_code=429, detail="Too many uploads in progress")
+            self._pending += 1
+            self._per_tenant[tenant] += 1
+
+    def release(self, tenant: str) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._per_tenant[tenant] -= 1
+            if self._per_tenant[tenant] <= 0:
+                del self._per_tenant[tenant]
+
+    def submit(self, job_id: int, tenant: str) -> None:
+        """
+        Run an admitted job in the background; its slot is released when it ends.
+        """
+        future = self._executor.submit(run_job, job_id)
+        future.add_done_callback(lambda _: self.release(tenant))
+
+    def resume(self, job_ids: List[int], tenant: str = "recovered") -> None:
+        """
+        Resubmit jobs left queued by a previous process, bypassing admission.
+        """
+        for job_id in job_ids:
+            with self._lock:
+                self._pending += 1
+                self._per_tenant[tenant] += 1
+            self.submit(job_id, tenant)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pending": self._pending, "tenants": dict(self._per_tenant)}
+
+
+@lru_cache()
+def get_ingestion_queue() -> IngestionQueue:
+    return IngestionQueue()
+
+
+def recover_stale_jobs(db: Session, stale_after: float = INGESTION_STALE_JOB_SECONDS) -> Tuple[int, int]:
+    """
+    Release jobs left running by a process that died mid-job.
+
+    A running job updates its row at every stage, progress step and
+    heartbeat, so one untouched for ``stale_after`` seconds has no worker.
+    It is requeued, unless it has already been attempted
+    INGESTION_MAX_ATTEMPTS times: a file that keeps killing the process is
+    failed instead of crashing every restart.
+
+    Returns:
+        The number of jobs requeued and failed
+    """
+    stale = (
+        IngestionJob.status == "running",
+        IngestionJob.updated_at < datetime.utcnow() - timedelta(seconds=stale_after),
+    )
+    failed = db.execute(
+        update(IngestionJob)
+        .where(*stale, IngestionJob.attempts >= INGESTION_MAX_ATTEMPTS)
+        .values(status="failed", error="Interrupted too many times, giving up")
+    ).rowcount
+    requeued = db.execute(update(IngestionJob).where(*stale).values(status="queued")).rowcount
+    db.commit()
+
+    if requeued or failed:
+        logger.warning(f"Recovered stale ingestion jobs: {requeued} requeued, {failed} failed")
+        metrics.counter("ingestion_jobs_recovered").inc(requeued)
+        metrics.counter("ingestion_jobs_failed").inc(failed)
+    return requeued, failed
+
+
+def resume_queued_jobs() -> None:
+    """
+    Pick up jobs that were queued but never run, and jobs orphaned while
+    running, e.g. after a restart.
+    """
+    db = SessionLocal()
+    try:
+        recover_stale_jobs(db)
+        job_ids = [
+            job_id for (job_id,) in db.query(IngestionJob.id).filter(IngestionJob.status == "queued")
+        ]
+    finally:
+        db.close()
+
+    if job_ids:
+        logger.info(f"Resuming {len(job_ids)} queued ingestion jobs")
+        get_ingestion_queue().resume(job_ids)
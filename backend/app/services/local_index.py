@@ -0,0 +1,372 @@
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import VECTOR_BACKEND, LOCAL_INDEX_DIR
+from app.core.metrics import metrics
+from app.models import Chunk
+
+logger = logging.getLogger(__name__)
+
+# all-MiniLM-L6-v2 produces 384 dimensions
+DIMENSIONS = 384
+# Rows scored per matrix product when searching the whole index
+BLOCK_ROWS = 65536
+# Rows fetched per query when rebuilding from the database
+REBUILD_BATCH = 10000
+
+COLUMNS = {
+    "vectors": np.float32,
+    "ids": np.int64,
+    "docs": np.int64,
+    "alive": np.uint8,
+}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the ``k`` highest scores per row, best first.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+class LocalVectorIndex:
+    """
+    Exact cosine index over chunk embeddings in memory-mapped files.
+
+    Normalized float32 vectors are stored contiguously with their chunk id,
+    document id and a tombstone flag, one file per column. The page cache is
+    shared, so every worker process on the node maps the same memory.
+
+    Appends write rows past the published count and then publish the new
+    count in ``manifest.json`` (replaced atomically); readers re-map when
+    the manifest changes. Deletes clear the rows' ``alive`` flag in place.
+    A rebuild writes a new generation directory and switches the manifest
+    to it. Writers serialize on an flock, across threads and processes.
+    """
+
+    def __init__(self, directory: str, dimensions: int = DIMENSIONS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dimensions = dimensions
+        self._manifest_path = os.path.join(directory, "manifest.json")
+        # _write_lock serializes writers in this process (the flock does so
+        # across processes); _lock only guards swapping the mapped arrays
+        self._write_lock = threading.RLock()
+        self._lock = threading.Lock()
+        self._lock_depth = 0
+        self._manifest_version = None
+        self._manifest = {"generation": 0, "count": 0}
+        self._arrays = self._map(0, 0)
+
+    def _path(self, generation: int, column: str) -> str:
+        return os.path.join(self.directory, f"gen-{generation}", f"{column}.bin")
+
+    @contextmanager
+    def _exclusive(self):
+        with self._write_lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            with open(os.path.join(self.directory, "lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._lock_depth = 1
+                try:
+                    self._refresh()
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _map(self, generation: int, count: int) -> dict:
+        arrays = {}
+        for column, dtype in COLUMNS.items():
+            shape = (count, self.dimensions) if column == "vectors" else (count,)
+            if count:
+                arrays[column] = np.memmap(self._path(generation, column), dtype=dtype, mode="r", shape=shape)
+            else:
+                arrays[column] = np.empty(shape, dtype=dtype)
+        return arrays
+
+    def _refresh(self) -> None:
+        """
+        Re-map the files if another process (or thread) changed the manifest.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self._manifest_path)
+                version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                version = None
+            if version == self._manifest_version:
+                return
+
+            manifest = {"generation": 0, "count": 0}
+            if version is not None:
+                with open(self._manifest_path) as f:
+                    manifest = json.load(f)
+            self._arrays = self._map(manifest["generation"], manifest["count"])
+            self._manifest, self._manifest_version = manifest, version
+
+    def _publish(self, generation: int, count: int) -> None:
+        temp_path = f"{self._manifest_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"generation": generation, "count": count, "dimensions": self.dimensions}, f)
+        os.replace(temp_path, self._manifest_path)
+        self._refresh()
+
+    def _write_rows(self, generation: int, start: int, ids, docs, vectors) -> int:
+        """
+        Write rows at position ``start`` (past the published count).
+        """
+        os.makedirs(os.path.dirname(self._path(generation, "ids")), exist_ok=True)
+        columns = {
+            "vectors": _normalize(vectors).reshape(-1, self.dimensions),
+            "ids": np.asarray(ids, dtype=np.int64),
+            "docs": np.asarray(docs, dtype=np.int64),
+        }
+        columns["alive"] = np.ones(len(columns["ids"]), dtype=np.uint8)
+
+        for column, data in columns.items():
+            path = self._path(generation, column)
+            row_bytes = data.itemsize * (self.dimensions if column == "vectors" else 1)
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                f.seek(start * row_bytes)
+                f.write(np.ascontiguousarray(data).tobytes())
+                # Drop rows left behind by an interrupted append
+                f.truncate()
+        return len(columns["ids"])
+
+    def append(self, ids: Sequence[int], docs: Sequence[int], vectors) -> None:
+        if not len(ids):
+            return
+        with self._exclusive():
+            generation, count = self._manifest["generation"], self._manifest["count"]
+            added = self._write_rows(generation, count, ids, docs, vectors)
+            self._publish(generation, count + added)
+
+    def _clear(self, mask_fn) -> int:
+        with self._exclusive():
+            count = self._manifest["count"]
+            if not count:
+                return 0
+            alive = np.memmap(self._path(self._manifest["generation"], "alive"), dtype=np.uint8, mode="r+", shape=(count,))
+            rows = np.flatnonzero(mask_fn(self._arrays) & (alive == 1))
+            alive[rows] = 0
+            alive.flush()
+            return len(rows)
+
+    def remove_chunks(self, chunk_ids: Iterable[int]) -> int:
+        chunk_ids = np.fromiter(chunk_ids, dtype=np.int64)
+        return self._clear(lambda arrays: np.isin(arrays["ids"], chunk_ids))
+
+    def remove_documents(self, document_ids: Iterable[int]) -> int:
+        document_ids = np.fromiter(document_ids, dtype=np.int64)
+        return self._clear(lambda arrays: np.isin(arrays["docs"], document_ids))
+
+    def rebuild(self, batches: Iterable[Tuple[Sequence[int], Sequence[int], np.ndarray]]) -> int:
+        """
+        Replace the contents with ``batches`` of (chunk ids, document ids, vectors).
+        """
+        with self._exclusive():
+            old_generation = self._manifest["generation"]
+            generation = old_generation + 1
+            shutil.rmtree(os.path.dirname(self._path(generation, "ids")), ignore_errors=True)
+
+            count = 0
+            for ids, docs, vectors in batches:
+                if len(ids):
+                    count += self._write_rows(generation, count, ids, docs, vectors)
+            self._publish(generation, count)
+            # Processes still mapping the old files keep them until they re-map
+            shutil.rmtree(os.path.dirname(self._path(old_generation, "ids")), ignore_errors=True)
+            return count
+
+    def document_chunk_ids(self, document_id: int) -> np.ndarray:
+        self._refresh()
+        arrays = self._arrays
+        return arrays["ids"][(arrays["docs"] == document_id) & (arrays["alive"] == 1)]
+
+    def fingerprint(self) -> Tuple[int, int, int]:
+        """
+        (live rows, max chunk id, sum of chunk ids), comparable with the table's.
+        """
+        self._refresh()
+        ids = self._arrays["ids"][self._arrays["alive"] == 1]
+        if not len(ids):
+            return 0, 0, 0
+        return len(ids), int(ids.max()), int(ids.sum())
+
+    def search_many(
+        self,
+        queries,
+        limit: int,
+        document_ids: Optional[Sequence[int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact top-``limit`` chunks by cosine similarity for a batch of queries.
+
+        Returns:
+            (chunk ids, scores), each of shape (queries, <= limit), best first
+        """
+        self._refresh()
+        arrays = self._arrays
+        queries = _normalize(np.atleast_2d(queries))
+        vectors, alive = arrays["vectors"], arrays["alive"]
+
+        if document_ids is not None:
+            rows = np.flatnonzero(np.isin(arrays["docs"], np.asarray(document_ids, dtype=np.int64)) & (alive == 1))
+            scores = (vectors[rows] @ queries.T).T
+            best = _top_k(scores, limit)
+            return arrays["ids"][rows[best]], np.take_along_axis(scores, best, axis=1)
+
+        # Whole index: score in blocks, keeping a running top-k per query
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS]
+            scores = (block @ queries.T).T
+            scores[:, alive[start:start + BLOCK_ROWS] == 0] = -np.inf
+            top = _top_k(scores, limit)
+            candidates = np.concatenate([best_rows, top + start], axis=1)
+            candidate_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            keep = _top_k(candidate_scores, limit)
+            best_rows = np.take_along_axis(candidates, keep, axis=1)
+            best_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+
+        # Fewer live rows than limit: drop tombstoned fillers
+        live = np.isfinite(best_scores).all(axis=0)
+        return arrays["ids"][best_rows[:, live]], best_scores[:, live]
+
+    def search(self, query, limit: int = 5, document_ids: Optional[Sequence[int]] = None) -> List[int]:
+        ids, _ = self.search_many(query, limit, document_ids)
+        return ids[0].tolist()
+
+    def stats(self) -> dict:
+        self._refresh()
+        return {
+            "generation": self._manifest["generation"],
+            "rows": self._manifest["count"],
+            "live": int(np.count_nonzero(self._arrays["alive"])),
+        }
+
+
+@lru_cache()
+def get_local_index() -> Optional[LocalVectorIndex]:
+    """
+    The node's local vector index, or None when VECTOR_BACKEND is "pgvector".
+    """
+    if VECTOR_BACKEND != "local":
+        return None
+    return LocalVectorIndex(LOCAL_INDEX_DIR)
+
+
+def _table_fingerprint(db: Session) -> Tuple[int, int, int]:
+    count, max_id, id_sum = db.query(
+        func.count(Chunk.id), func.coalesce(func.max(Chunk.id), 0), func.coalesce(func.sum(Chunk.id), 0)
+    ).one()
+    return int(count), int(max_id), int(id_sum)
+
+
+def _iter_table(db: Session):
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Chunk.id, Chunk.document_id, Chunk.embedding)
+            .filter(Chunk.id > last_id)
+            .order_by(Chunk.id)
+            .limit(REBUILD_BATCH)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [r[0] for r in rows], [r[1] for r in rows], np.stack([np.asarray(r[2]) for r in rows])
+
+
+def ensure_local_index(db: Session) -> None:
+    """
+    Rebuild the local index from the chunks table unless it already matches.
+
+    Run on startup by every worker; the first one rebuilds while holding
+    the index lock, the others then find it consistent.
+    """
+    index = get_local_index()
+    if index is None:
+        return
+    with index._exclusive():
+        if index.fingerprint() == _table_fingerprint(db):
+            logger.info(f"Local vector index is up to date ({index.stats()['live']} chunks)")
+            return
+        count = index.rebuild(_iter_table(db))
+    logger.info(f"Rebuilt local vector index from the database ({count} chunks)")
+
+
+def sync_local_index(db: Session, document_ids: Iterable[int]) -> None:
+    """
+    Bring the local index in line with the stored chunks of ``document_ids``.
+
+    Chunks no longer in the table are tombstoned and new ones appended, which
+    covers new uploads, in-place re-indexing and deletions. A failure leaves
+    the index stale until the next startup check, so it is logged, not raised.
+    """
+    index = get_local_index()
+    if index is None:
+        return
+    try:
+        for document_id in document_ids:
+            # Held across read, diff and append: two syncs of one document
+            # would otherwise both see its new chunks as missing
+            with index._exclusive():
+                stored = {chunk_id for (chunk_id,) in db.query(Chunk.id).filter(Chunk.document_id == document_id)}
+                indexed = set(index.document_chunk_ids(document_id).tolist())
+
+                removed = indexed - stored
+                if removed:
+                    index.remove_chunks(removed)
+
+                added = sorted(stored - indexed)
+                for start in range(0, len(added), REBUILD_BATCH):
+                    rows = (
+                        db.query(Chunk.id, Chunk.embedding)
+                        .filter(Chunk.id.in_(added[start:start + REBUILD_BATCH]))
+                        .all()
+                    )
+                    index.append(
+                        [r[0] for r in rows],
+                        [document_id] * len(rows),
+                        np.stack([np.asarray(r[1]) for r in rows]),
+                    )
+                metrics.counter("local_index_rows_appended").inc(len(added))
+                metrics.counter("local_index_rows_removed").inc(len(removed))
+    except Exception as e:
+        logger.error(f"Failed to update the local vector index: {e}")
@@ -0,0 +1,216 @@
+from typing import List, NamedTuple, Sequence, Tuple
+
+from app.models import Chunk
+
+PROMPT_TEMPLATE = """You are a factual assistant.
+Answer ONLY using the provided context.
+If the answer is not in the context, say: "I don't have enough information to answer that."
+
+Context:
+{context}
+
+Question:
+{query}
+
+Answer:
+"""
+
+# A truncated source shorter than this is more noise than context
+MIN_TRUNCATED_TOKENS = 32
+# Longest overlap searched for between chunks that have no stored offsets
+# (the char chunker overlaps by 150 characters)
+MAX_OVERLAP_CHARS = 1000
+ELLIPSIS = " …"
+
+
+class ContextSource(NamedTuple):
+    """
+    One ``[Source n]`` block: a run of adjacent chunks of one document.
+    """
+    document_id: int
+    chunks: List[Chunk]
+    content: str
+    # Best retrieval rank (0 = most relevant) among the chunks
+    rank: int
+    truncated: bool = False
+
+
+class PromptUsage(NamedTuple):
+    prompt_tokens: int
+    context_tokens: int
+    # Context tokens the retrieved chunks would have cost as-is
+    retrieved_tokens: int
+    sources: int
+    sources_dropped: int
+
+
+class Prompt(NamedTuple):
+    text: str
+    sources: List[ContextSource]
+    usage: PromptUsage
+
+
+def render_prompt(query: str, contents: Sequence[str]) -> str:
+    context = "\n\n".join(
+        f"[Source {i + 1}]\n{content}" for i, content in enumerate(contents)
+    )
+    return PROMPT_TEMPLATE.format(context=context, query=query)
+
+
+def _offsets(tokenizer, text: str) -> List[Tuple[int, int]]:
+    return tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+
+def count_tokens(tokenizer, text: str) -> int:
+    return len(_offsets(tokenizer, text))
+
+
+def truncate_to_tokens(tokenizer, text: str, max_tokens: int) -> str:
+    offsets = _offsets(tokenizer, text)
+    if len(offsets) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    return text[:offsets[max_tokens - 1][1]]
+
+
+def _overlap(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of ``left`` that is a prefix of ``right``.
+    """
+    probe = right[:16]
+    if not probe:
+        return 0
+    tail_start = max(0, len(left) - MAX_OVERLAP_CHARS)
+    position = left.find(probe, tail_start)
+    while position != -1:
+        if right.startswith(left[position:]):
+            return len(left) - position
+        position = left.find(probe, position + 1)
+    return 0
+
+
+def _join(left: Chunk, right: Chunk, text: str) -> str:
+    """
+    Append ``right`` (the next chunk of the same document) to ``text``,
+    which ends with ``left``, without repeating their overlap.
+    """
+    if None not in (left.end_char, right.start_char):
+        shared = left.end_char - right.start_char
+        if shared >= 0:
+            return text + right.content[shared:]
+        # The token chunker leaves the whitespace between sentences out of
+        # both chunks; the separator is not stored, so restore it as spaces
+        return text + " " * -shared + right.content
+    shared = _overlap(left.content, right.content)
+    if shared:
+        return text + right.content[shared:]
+    return text + "\n" + right.content
+
+
+def merge_chunks(chunks: Sequence[Chunk]) -> List[ContextSource]:
+    """
+    Merge runs of consecutive chunks (by ``chunk_index``) of each document
+    into single sources with their overlap removed, and drop chunks whose
+    text repeats a better-ranked one.
+
+    Returns:
+        Sources ordered by their best-ranked chunk
+    """
+    ranked = []
+    seen = set()
+    for position, chunk in enumerate(chunks):
+        key = chunk.content_hash or chunk.content
+        if key in seen:
+            continue
+        seen.add(key)
+        ranked.append((position, chunk))
+
+    sources = []
+    run = []
+    for position, chunk in sorted(ranked, key=lambda item: (item[1].document_id, item[1].chunk_index)):
+        if run and (chunk.document_id != run[-1][1].document_id or chunk.chunk_index != run[-1][1].chunk_index + 1):
+            sources.append(_source(run))
+            run = []
+        run.append((position, chunk))
+    if run:
+        sources.append(_source(run))
+
+    return sorted(sources, key=lambda source: source.rank)
+
+
+def stitch_chunks(chunks: Sequence[Chunk]) -> str:
+    """
+    Join consecutive chunks of one document into the text they cover.
+    """
+    text = chunks[0].content
+    for left, right in zip(chunks, chunks[1:]):
+        text = _join(left, right, text)
+    return text
+
+
+def _source(run: List[Tuple[int, Chunk]]) -> ContextSource:
+    chunks = [chunk for _, chunk in run]
+    return ContextSource(
+        document_id=chunks[0].document_id,
+        chunks=chunks,
+        content=stitch_chunks(chunks).strip(),
+        rank=min(position for position, _ in run),
+    )
+
+
+def assemble_prompt(
+    query: str,
+    chunks: Sequence[Chunk],
+    tokenizer,
+    max_tokens: int,
+) -> Prompt:
+    """
+    Build the chat prompt from retrieved chunks within a token budget.
+
+    Adjacent and duplicate chunks are merged (see ``merge_chunks``), then
+    sources are added in rank order until the budget is spent. The first
+    source that does not fit is truncated if enough room is left, and it
+    and all lower-ranked sources are dropped otherwise.
+
+    Args:
+        query: The user's question
+        chunks: Retrieved chunks, most relevant first
+        tokenizer: HuggingFace-style fast tokenizer used to count tokens
+        max_tokens: Budget for the whole prompt; 0 for no limit
+
+    Returns:
+        The prompt, the sources it contains and its token usage
+    """
+    sources = merge_chunks(chunks)
+    retrieved_tokens = sum(count_tokens(tokenizer, chunk.content.strip()) for chunk in chunks)
+
+    base_tokens = count_tokens(tokenizer, render_prompt(query, []))
+    remaining = max_tokens - base_tokens if max_tokens else None
+    included = []
+    context_tokens = 0
+
+    for source in sources:
+        header_tokens = count_tokens(tokenizer, f"[Source {len(included) + 1}]")
+        tokens = count_tokens(tokenizer, source.content)
+        if remaining is not None and header_tokens + tokens > remaining:
+            room = remaining - header_tokens
+            if room >= MIN_TRUNCATED_TOKENS:
+                content = truncate_to_tokens(tokenizer, source.content, room - count_tokens(tokenizer, ELLIPSIS))
+                included.append(source._replace(content=content + ELLIPSIS, truncated=True))
+                context_tokens += header_tokens + count_tokens(tokenizer, included[-1].content)
+            break
+        included.append(source)
+        context_tokens += header_tokens + tokens
+        if remaining is not None:
+            remaining -= header_tokens + tokens
+
+    text = render_prompt(query, [source.content for source in included])
+    usage = PromptUsage(
+        prompt_tokens=count_tokens(tokenizer, text),
+        context_tokens=context_tokens,
+        retrieved_tokens=retrieved_tokens,
+        sources=len(included),
+        sources_dropped=len(sources) - len(included),
+    )
+    return Prompt(text=text, sources=included, usage=usage)
@@ -1,50 +1,276 @@
-﻿from sqlalchemy.orm import Session
-from typing import List, Optional
+﻿import asyncio
+import logging
+import time
+import numpy as np
+from sqlalchemy import select, func, literal_column, cast, text, Text
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional, Tuple
 
-from app.models import Chunk
-from app.services import get_embedding_service
+from app.core.config import (
+    SEARCH_RECALL_TARGET,
+    FILTERED_SEARCH_EXACT_MAX_ROWS,
+    FILTERED_SEARCH_MAX_ATTEMPTS,
+    RETRIEVAL_MODE_DEFAULT,
+    FULL_TEXT_CONFIG,
+    HYBRID_CANDIDATES,
+    HYBRID_RRF_K,
+    HYBRID_LEXICAL_BUDGET_MS,
+)
+from app.db.base import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models import Chunk, Document
+from app.services import get_embedding_batcher
+from app.services import vector_index
+from app.services.vector_index import search_settings, settings_statement
+from app.services.local_index import get_local_index
+from app.services.prompt_builder import render_prompt
 
-def search_similar_chunks(
-    db: Session,
+logger = logging.getLogger(__name__)
+
+
+def with_source(stmt):
+    """
+    Load each chunk's document id and filename in the same query (a join),
+    for source attribution.
+    """
+    return stmt.options(joinedload(Chunk.document).load_only(Document.id, Document.filename))
+
+
+async def _scope_size(db: AsyncSession, document_ids: List[int]) -> Tuple[int, int]:
+    """
+    Chunks in the scope and (estimated) in the whole table.
+    """
+    scoped = select(func.count()).select_from(Chunk).where(Chunk.document_id.in_(document_ids)).scalar_subquery()
+    total = literal_column("(SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'chunks'::regclass)")
+    row = (await db.execute(select(scoped, total))).one()
+    return row[0], row[1]
+
+
+async def _search_local(
+    db: AsyncSession,
+    index,
+    query_embedding: np.ndarray,
+    document_ids: Optional[List[int]],
+    limit: int,
+) -> List[Chunk]:
+    """
+    Rank chunk ids in the in-process index, then load those rows by primary key.
+    """
+    started = time.perf_counter()
+    # The matrix product releases the GIL; keep it off the event loop
+    ids = await asyncio.get_running_loop().run_in_executor(
+        None, index.search, query_embedding, limit, document_ids or None
+    )
+    metrics.histogram("vector_search_local_seconds").observe(time.perf_counter() - started)
+    if not ids:
+        return []
+
+    result = await db.execute(with_source(select(Chunk).where(Chunk.id.in_(ids))))
+    by_id = {chunk.id: chunk for chunk in result.scalars().all()}
+    # Rows deleted since the index was read are skipped
+    return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
+
+
+async def _run(db: AsyncSession, stmt, settings: dict) -> List[Chunk]:
+    statement, params = settings_statement(settings)
+    await db.execute(statement, params)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def search_similar_chunks(
+    db: AsyncSession,
     query: str,
     document_ids: Optional[List[int]] = None,
     limit: int = 5,
-):
-    # Use local embedding service
-    embedding_service = get_embedding_service()
-    query_embedding = embedding_service.get_embedding(query)
+    query_embedding: Optional[np.ndarray] = None,
+    recall: float = SEARCH_RECALL_TARGET,
+) -> List[Chunk]:
+    """
+    Return the ``limit`` chunks closest to the query by cosine distance.
 
-    q = db.query(Chunk)
+    ``recall`` trades latency for accuracy: it sets ivfflat.probes /
+    hnsw.ef_search for this query's transaction, and 1.0 forces an exact scan.
+
+    Searches scoped to ``document_ids`` pick a plan:
+
+    - exact: the scope has at most FILTERED_SEARCH_EXACT_MAX_ROWS chunks
+      (or there is no ANN index); scoped rows are scanned and sorted
+    - ann: the index is searched with effort scaled by the inverse of the
+      scope's share of the table, and searched deeper (doubling) while fewer
+      than ``limit`` rows survive the filter
+    - fallback: still short after FILTERED_SEARCH_MAX_ATTEMPTS, exact scan
+
+    With VECTOR_BACKEND="local" ranking is done exactly by the in-process
+    index instead, and Postgres only serves the winning rows.
+    """
+    if query_embedding is None:
+        # Encoding runs on the batcher's executor, off the event loop
+        query_embedding = await get_embedding_batcher().embed(query)
+
+    local = get_local_index()
+    if local is not None:
+        return await _search_local(db, local, query_embedding, document_ids, limit)
+
+    stmt = with_source(select(Chunk))
 
     if document_ids:
-        q = q.filter(Chunk.document_id.in_(document_ids))
+        stmt = stmt.where(Chunk.document_id.in_(document_ids))
+
+    # asyncpg has no codec for vector: bind the text form and cast it, so the
+    # parameter's type never depends on operator resolution server-side
+    query_vector = cast(query_embedding, Chunk.embedding.type)
+    stmt = stmt.order_by(Chunk.embedding.cosine_distance(query_vector)).limit(limit)
 
-    return (
-        q.order_by(Chunk.embedding.cosine_distance(query_embedding))
-        .limit(limit)
-        .all()
+    if not document_ids:
+        return await _run(db, stmt, search_settings(recall, limit))
+
+    started = time.perf_counter()
+    scoped, total = await _scope_size(db, document_ids)
+    state = vector_index.get_state()
+    plan = "exact"
+    attempts = 0
+
+    if state is None or recall >= 1 or scoped <= FILTERED_SEARCH_EXACT_MAX_ROWS:
+        chunks = await _run(db, stmt, search_settings(1.0, limit))
+    else:
+        plan = "ann"
+        # Only ~scoped/total of the candidates the index yields pass the filter
+        scale = max(1.0, total / scoped)
+        while True:
+            attempts += 1
+            settings = search_settings(recall, limit, state, scale=scale)
+            chunks = await _run(db, stmt, settings)
+            if len(chunks) >= min(scoped, limit):
+                break
+            if attempts >= FILTERED_SEARCH_MAX_ATTEMPTS or vector_index.max_effort(settings, state):
+                plan = "fallback"
+                chunks = await _run(db, stmt, search_settings(1.0, limit))
+                break
+            scale *= 2
+
+    elapsed = time.perf_counter() - started
+    metrics.counter(f"vector_search_plan_{plan}").inc()
+    metrics.histogram(f"vector_search_{plan}_seconds").observe(elapsed)
+    logger.info(
+        f"Filtered vector search: plan={plan} scope={scoped}/{total} chunks "
+        f"attempts={attempts} results={len(chunks)} in {elapsed * 1000:.1f}ms"
     )
+    return chunks
 
 
-def build_prompt(query: str, chunks: List[Chunk]) -> str:
-    context_parts = []
+async def lexical_search(
+    query: str,
+    document_ids: Optional[List[int]] = None,
+    limit: int = HYBRID_CANDIDATES,
+    timeout_ms: float = HYBRID_LEXICAL_BUDGET_MS,
+) -> List[Chunk]:
+    """
+    Full-text search over chunk content, ranked by ts_rank_cd.
+
+    Query terms are OR-ed, so a question that mentions an identifier matches
+    chunks containing it even if they lack the other words. Runs on its own
+    session so it can overlap the vector query, with a server-side
+    statement_timeout matching the budget.
+    """
+    ts_query = cast(
+        func.replace(cast(func.plainto_tsquery(FULL_TEXT_CONFIG, query), Text), " & ", " | "),
+        TSQUERY,
+    )
+    stmt = with_source(select(Chunk)).where(Chunk.content_tsv.op("@@")(ts_query))
+
+    if document_ids:
+        stmt = stmt.where(Chunk.document_id.in_(document_ids))
+
+    stmt = stmt.order_by(func.ts_rank_cd(Chunk.content_tsv, ts_query).desc()).limit(limit)
 
-    for i, chunk in enumerate(chunks):
-        context_parts.append(
-            f"[Source {i + 1}]\n{chunk.content.strip()}"
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            text("SELECT set_config('statement_timeout', :ms, true)"),
+            {"ms": str(int(timeout_ms))},
         )
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
 
-    context = "\n\n".join(context_parts)
 
-    return f"""You are a factual assistant.
-Answer ONLY using the provided context.
-If the answer is not in the context, say: "I don't have enough information to answer that."
+def reciprocal_rank_fusion(rankings: List[List[Chunk]], k: int = HYBRID_RRF_K) -> List[Chunk]:
+    """
+    Merge ranked lists by summing 1 / (k + rank) per chunk.
 
-Context:
-{context}
+    Ties keep the order in which chunks were first seen, so the first
+    ranking wins them.
+    """
+    scores = {}
+    chunks = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(chunk.id, chunk)
+    return [chunks[chunk_id] for chunk_id in sorted(scores, key=lambda chunk_id: -scores[chunk_id])]
 
-Question:
-{query}
 
-Answer:
-"""
+async def hybrid_search(
+    db: AsyncSession,
+    query: str,
+    document_ids: Optional[List[int]] = None,
+    limit: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    candidates: int = HYBRID_CANDIDATES,
+    budget_ms: float = HYBRID_LEXICAL_BUDGET_MS,
+) -> List[Chunk]:
+    """
+    Vector and full-text search run concurrently, fused by reciprocal rank.
+
+    If the lexical leg fails or misses its latency budget it is dropped and
+    the vector ranking is returned alone.
+    """
+    started = time.perf_counter()
+    lexical_task = asyncio.create_task(
+        asyncio.wait_for(lexical_search(query, document_ids, candidates, budget_ms), budget_ms / 1000)
+    )
+    try:
+        vector = await search_similar_chunks(
+            db, query, document_ids=document_ids, limit=max(limit, candidates), query_embedding=query_embedding,
+        )
+    except BaseException:
+        lexical_task.cancel()
+        raise
+
+    try:
+        lexical = await lexical_task
+        metrics.histogram("hybrid_lexical_seconds").observe(time.perf_counter() - started)
+    except Exception as e:
+        reason = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e)
+        logger.warning(f"Dropping lexical results from hybrid search ({reason})")
+        metrics.counter("hybrid_lexical_dropped").inc()
+        lexical = []
+
+    return reciprocal_rank_fusion([vector, lexical])[:limit]
+
+
+async def retrieve(
+    db: AsyncSession,
+    query: str,
+    document_ids: Optional[List[int]] = None,
+    limit: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    mode: Optional[str] = None,
+) -> List[Chunk]:
+    """
+    Retrieve context chunks with the requested mode ("vector" or "hybrid").
+    """
+    if (mode or RETRIEVAL_MODE_DEFAULT) == "hybrid":
+        return await hybrid_search(db, query, document_ids, limit, query_embedding)
+    return await search_similar_chunks(
+        db, query, document_ids=document_ids, limit=limit, query_embedding=query_embedding,
+    )
+
+
+def build_prompt(query: str, chunks: List[Chunk]) -> str:
+    """
+    Prompt with every chunk in full; see ``prompt_builder.assemble_prompt``
+    for the token-budgeted version.
+    """
+    return render_prompt(query, [chunk.content.strip() for chunk in chunks])
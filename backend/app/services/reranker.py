@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from app.core.config import (
+    RERANK_ENABLED,
+    RERANK_MODEL,
+    RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS,
+    RERANK_MAX_PENDING,
+)
+from app.core.metrics import metrics
+from app.models import Chunk
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+logger = logging.getLogger(__name__)
+
+# Seconds a failed model load is remembered before it is attempted again
+LOAD_RETRY_SECONDS = 60.0
+
+
+class CrossEncoderReranker:
+    """
+    Re-orders retrieved chunks by a cross-encoder's query/passage score.
+
+    All candidates are scored in one batched ``predict`` on a dedicated
+    thread, so the event loop stays free and re-ranks do not queue behind
+    query embeddings. At most ``max_pending`` jobs are queued or running;
+    beyond that requests keep retrieval order rather than queue behind
+    work whose results would arrive too late.
+
+    The model is loaded on first use, on the scoring thread (or by
+    warm-up), never on the event loop. Until it is loaded, or if loading
+    fails, requests fall back to retrieval order within their budget.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        batch_size: int = RERANK_BATCH_SIZE,
+        max_pending: int = RERANK_MAX_PENDING,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_pending = max(1, max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._model: Optional["CrossEncoder"] = None
+        self._load_lock = threading.Lock()
+        self._load_failed_at: Optional[float] = None
+
+    @property
+    def model(self) -> "CrossEncoder":
+        """
+        The cross-encoder, loaded once even if warm-up and a request ask
+        for it at the same time.
+
+        Raises:
+            RuntimeError: If loading fails, or failed less than
+                LOAD_RETRY_SECONDS ago
+        """
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    if (
+                        self._load_failed_at is not None
+                        and time.monotonic() - self._load_failed_at < LOAD_RETRY_SECONDS
+                    ):
+                        raise RuntimeError("Cross-encoder unavailable, its last load failed")
+                    try:
+                        self._model = self._load_model()
+                    except Exception:
+                        self._load_failed_at = time.monotonic()
+                        raise
+        return self._model
+
+    def _load_model(self) -> "CrossEncoder":
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        try:
+            logger.info(f"Loading cross-encoder '{self.model_name}'...")
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            model = CrossEncoder(self.model_name, device=device)
+            logger.info("Cross-encoder loaded successfully.")
+            return model
+        except Exception as e:
+            logger.error(f"Failed to load cross-encoder: {e}")
+            raise RuntimeError(f"Could not load cross-encoder: {e}")
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        return np.asarray(self.model.predict(
+            [(query, passage) for passage in passages],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        ))
+
+    def _score_job(self, loop, started: asyncio.Future, abandoned: threading.Event, query: str, passages: List[str]) -> Optional[np.ndarray]:
+        """
+        Runs on the scoring thread. Skips the work if the caller has
+        already given up, and signals the caller when scoring starts.
+        """
+        try:
+            if abandoned.is_set():
+                metrics.counter("rerank_abandoned").inc()
+                return None
+            loop.call_soon_threadsafe(lambda: started.done() or started.set_result(None))
+            return self.score(query, passages)
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    async def rerank(
+        self,
+        query: str,
+        chunks: List[Chunk],
+        top_k: int,
+        budget_ms: float = RERANK_BUDGET_MS,
+    ) -> List[Chunk]:
+        """
+        Return the ``top_k`` best chunks by cross-encoder score.
+
+        Falls back to the first ``top_k`` chunks in retrieval order if
+        scoring fails, takes longer than ``budget_ms`` once started, or
+        ``max_pending`` jobs are already waiting.
+        """
+        if len(chunks) <= 1:
+            return chunks[:top_k]
+
+        with self._pending_lock:
+            full = self._pending >= self.max_pending
+            if not full:
+                # Released by the scoring thread, not when we stop waiting
+                self._pending += 1
+        if full:
+            logger.warning(f"{self.max_pending} re-ranks pending, using retrieval order")
+            metrics.counter("rerank_skipped").inc()
+            return chunks[:top_k]
+
+        loop = asyncio.get_running_loop()
+        started = loop.create_future()
+        abandoned = threading.Event()
+        job = loop.run_in_executor(
+            self._executor, self._score_job, loop, started, abandoned, query, [c.content for c in chunks]
+        )
+        try:
+            await asyncio.wait({started, job}, return_when=asyncio.FIRST_COMPLETED)
+            scores = await asyncio.wait_for(asyncio.shield(job), budget_ms / 1000)
+        except asyncio.TimeoutError:
+            logger.warning(f"Re-ranking {len(chunks)} chunks exceeded {budget_ms:.0f}ms, using retrieval order")
+            metrics.counter("rerank_timeouts").inc()
+            return chunks[:top_k]
+        except Exception as e:
+            logger.error(f"Re-ranking failed, using retrieval order: {e}")
+            metrics.counter("rerank_errors").inc()
+            return chunks[:top_k]
+        finally:
+            # A job still queued when its caller leaves is skipped
+            abandoned.set()
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [chunks[i] for i in order]
+
+
+@lru_cache()
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    The process-wide re-ranker, or None when RERANK_ENABLED is off.
+    """
+    if not RERANK_ENABLED:
+        return None
+    return CrossEncoderReranker()
@@ -0,0 +1,323 @@
+import logging
+import math
+import re
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import (
+    VECTOR_INDEX_TYPE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    IVFFLAT_MIN_ROWS,
+    VECTOR_INDEX_REBUILD_GROWTH,
+    VECTOR_INDEX_CHECK_SECONDS,
+    VECTOR_INDEX_BUILD_MEMORY,
+)
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TABLE = "chunks"
+INDEX_NAME = "ix_chunks_embedding"
+# Must match the distance used by search (Chunk.embedding.cosine_distance)
+OPCLASS = "vector_cosine_ops"
+# Serializes index builds across API workers
+ADVISORY_LOCK_ID = 0x7665637478
+
+# pgvector limits
+MAX_EF_SEARCH = 1000
+DEFAULT_EF_SEARCH = 40
+
+
+class IndexState(NamedTuple):
+    kind: str
+    opclass_ok: bool
+    valid: bool
+    lists: Optional[int]
+    m: Optional[int]
+    ef_construction: Optional[int]
+    # Row count when the index was built (from the index comment)
+    built_rows: Optional[int]
+    size_bytes: int
+
+
+# Last state seen by this process; used to size per-query search parameters
+_state: Optional[IndexState] = None
+_checked_at = 0.0
+_maintain_lock = threading.Lock()
+_maintain_thread: Optional[threading.Thread] = None
+# Separate from _maintain_lock, which is held for a whole rebuild
+_thread_lock = threading.Lock()
+
+
+def ivfflat_lists(rows: int) -> int:
+    """
+    Number of IVFFlat lists for a table size (pgvector's guidance).
+    """
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def index_sql(kind: str, rows: int, table: str = TABLE, name: str = INDEX_NAME) -> str:
+    if kind == "hnsw":
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    elif kind == "ivfflat":
+        options = f"lists = {ivfflat_lists(rows)}"
+    else:
+        raise ValueError(f"Unknown vector index type '{kind}'")
+    return (
+        f"CREATE INDEX CONCURRENTLY {name} ON {table} "
+        f"USING {kind} (embedding {OPCLASS}) WITH ({options})"
+    )
+
+
+def read_index(conn: Connection, name: str = INDEX_NAME) -> Optional[IndexState]:
+    row = conn.execute(
+        text(
+            """
+            SELECT am.amname, pg_get_indexdef(c.oid), i.indisvalid, c.reloptions,
+                   obj_description(c.oid, 'pg_class'), pg_relation_size(c.oid)
+            FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE c.relname = :name
+            """
+        ),
+        {"name": name},
+    ).first()
+    if row is None:
+        return None
+
+    kind, definition, valid, reloptions, comment, size = row
+    options = dict(option.split("=", 1) for option in reloptions or [])
+    built = re.search(r"rows=(\d+)", comment or "")
+
+    def option(key):
+        return int(options[key]) if key in options else None
+
+    return IndexState(
+        kind=kind,
+        opclass_ok=OPCLASS in definition,
+        valid=valid,
+        lists=option("lists"),
+        m=option("m"),
+        ef_construction=option("ef_construction"),
+        built_rows=int(built.group(1)) if built else None,
+        size_bytes=size,
+    )
+
+
+def estimate_rows(conn: Connection, table: str = TABLE) -> int:
+    """
+    Planner row estimate, falling back to an exact count before the first ANALYZE.
+    """
+    estimate = conn.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {"table": table},
+    ).scalar()
+    if estimate is None or estimate < 0:
+        estimate = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+    return int(estimate)
+
+
+def plan_maintenance(state: Optional[IndexState], rows: int, kind: str = VECTOR_INDEX_TYPE) -> Optional[str]:
+    """
+    Decide what the index needs.
+
+    Returns None if it is fine, "drop" if an IVFFlat index exists but the
+    table is too small to cluster meaningfully (exact scans are fast at
+    that size), or a reason for (re)building it.
+    """
+    if kind == "ivfflat" and rows < IVFFLAT_MIN_ROWS:
+        if state is not None and (state.kind != "ivfflat" or (state.built_rows or 0) < IVFFLAT_MIN_ROWS):
+            return "drop"
+        return None
+
+    if state is None:
+        return "missing"
+    if not state.valid:
+        return "invalid"
+    if state.kind != kind or not state.opclass_ok:
+        return f"configured {kind} with {OPCLASS}, found {state.kind}"
+    if kind == "hnsw" and (state.m, state.ef_construction) != (HNSW_M, HNSW_EF_CONSTRUCTION):
+        return "hnsw parameters changed"
+    if kind == "ivfflat":
+        if not state.built_rows:
+            return "build size unknown"
+        if rows >= state.built_rows * VECTOR_INDEX_REBUILD_GROWTH:
+            return f"table grew from {state.built_rows} to {rows} rows"
+    return None
+
+
+def rebuild_index(conn: Connection, kind: str, rows: int) -> None:
+    """
+    Build a new index next to the current one, then swap it in.
+
+    Uses CREATE INDEX CONCURRENTLY so ingestion and search continue during
+    the build; ``conn`` must be in autocommit mode.
+    """
+    temp_name = f"{INDEX_NAME}_new"
+    started = time.perf_counter()
+
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {temp_name}"))
+    conn.execute(text("SELECT set_config('maintenance_work_mem', :mem, false)"), {"mem": VECTOR_INDEX_BUILD_MEMORY})
+    conn.execute(text(index_sql(kind, rows, name=temp_name)))
+    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+    conn.execute(text(f"ALTER INDEX {temp_name} RENAME TO {INDEX_NAME}"))
+    conn.execute(text(f"COMMENT ON INDEX {INDEX_NAME} IS 'rows={rows}'"))
+
+    elapsed = time.perf_counter() - started
+    metrics.histogram("vector_index_build_seconds", (1, 10, 60, 300, 1800, 3600)).observe(elapsed)
+    logger.info(f"Built {kind} index {INDEX_NAME} over {rows} rows in {elapsed:.1f}s")
+
+
+def maintain(engine: Engine, force: bool = False) -> Optional[str]:
+    """
+    Bring the vector index in line with the configuration and table size.
+
+    Only one process maintains the index at a time; others skip the check.
+
+    Returns:
+        The action taken ("built: <reason>", "dropped") or None
+    """
+    global _state, _checked_at
+
+    with _maintain_lock, engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID}).scalar():
+            return None
+        try:
+            state = read_index(conn)
+            rows = estimate_rows(conn)
+            reason = "forced" if force else plan_maintenance(state, rows)
+            action = None
+
+            if reason == "drop":
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+                logger.info(f"Dropped {INDEX_NAME}: {rows} rows is below IVFFLAT_MIN_ROWS")
+                action = "dropped"
+            elif reason:
+                logger.info(f"Rebuilding {INDEX_NAME} ({reason})")
+                rebuild_index(conn, VECTOR_INDEX_TYPE, rows)
+                action = f"built: {reason}"
+
+            _state = read_index(conn) if action else state
+            _checked_at = time.monotonic()
+            return action
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+def maybe_maintain(engine: Engine) -> None:
+    """
+    Run ``maintain`` at most once per VECTOR_INDEX_CHECK_SECONDS.
+    """
+    if time.monotonic() - _checked_at < VECTOR_INDEX_CHECK_SECONDS:
+        return
+    try:
+        maintain(engine)
+    except Exception as e:
+        logger.error(f"Vector index maintenance failed: {e}")
+
+
+def maintain_in_background(engine: Engine) -> None:
+    """
+    ``maybe_maintain`` on its own thread, so callers (ingestion workers)
+    are not held up by an index rebuild. At most one such thread runs.
+    """
+    global _maintain_thread
+    if time.monotonic() - _checked_at < VECTOR_INDEX_CHECK_SECONDS:
+        return
+    with _thread_lock:
+        if _maintain_thread is not None and _maintain_thread.is_alive():
+            return
+        _maintain_thread = threading.Thread(
+            target=maybe_maintain, args=(engine,), name="vector-index-maintenance", daemon=True
+        )
+        _maintain_thread.start()
+
+
+def refresh_state(engine: Engine) -> Optional[IndexState]:
+    global _state
+    with engine.connect() as conn:
+        _state = read_index(conn)
+    return _state
+
+
+def ivfflat_probes(lists: int, recall: float) -> int:
+    """
+    Lists to probe for a recall target.
+
+    Probing sqrt(lists) gives roughly 0.95 recall@10 on sentence embeddings;
+    the cost grows as the miss rate shrinks. Calibrate with
+    benchmarks/bench_vector_index.py.
+    """
+    if recall >= 1:
+        return lists
+    probes = math.ceil(math.sqrt(lists) * 0.05 / (1 - recall))
+    return max(1, min(lists, probes))
+
+
+def hnsw_ef_search(recall: float, limit: int) -> int:
+    """
+    HNSW candidate list size for a recall target (pgvector's default of 40
+    corresponds to roughly 0.95 recall@10). Never below ``limit``, since
+    HNSW returns at most ef_search rows.
+    """
+    ef = DEFAULT_EF_SEARCH if recall >= 1 else math.ceil(DEFAULT_EF_SEARCH * 0.05 / (1 - recall))
+    return min(MAX_EF_SEARCH, max(limit, ef))
+
+
+def search_settings(
+    recall: float,
+    limit: int,
+    state: Optional[IndexState] = None,
+    scale: float = 1.0,
+) -> Dict[str, str]:
+    """
+    Transaction-local planner settings for one vector query.
+
+    ``scale`` multiplies the search effort, for filtered queries where only
+    a fraction of the candidates the index returns survive the filter.
+    """
+    state = state or _state
+    if recall >= 1:
+        # Exact scan regardless of the index; bitmap scans on other
+        # indexes (e.g. document_id) stay available
+        return {"enable_indexscan": "off"}
+    ef = min(MAX_EF_SEARCH, math.ceil(hnsw_ef_search(recall, limit) * scale))
+    settings = {"hnsw.ef_search": str(ef)}
+    if state is not None and state.lists:
+        probes = min(state.lists, math.ceil(ivfflat_probes(state.lists, recall) * scale))
+        settings["ivfflat.probes"] = str(probes)
+    return settings
+
+
+def max_effort(settings: Dict[str, str], state: Optional[IndexState] = None) -> bool:
+    """
+    Whether ``settings`` already search as much of the index as possible.
+    """
+    state = state or _state
+    if state is not None and state.lists:
+        return int(settings.get("ivfflat.probes", 0)) >= state.lists
+    return int(settings.get("hnsw.ef_search", 0)) >= MAX_EF_SEARCH
+
+
+def settings_statement(settings: Dict[str, str]):
+    """
+    A single SELECT applying ``settings`` with set_config(..., is_local=true).
+    """
+    calls = ", ".join(f"set_config(:name{i}, :value{i}, true)" for i in range(len(settings)))
+    params = {}
+    for i, (name, value) in enumerate(settings.items()):
+        params[f"name{i}"] = name
+        params[f"value{i}"] = value
+    return text(f"SELECT {calls}"), params
+
+
+def get_state() -> Optional[IndexState]:
+    return _state
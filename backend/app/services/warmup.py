@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import STARTUP_WARMUP
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEXT = "warm up"
+# Backoff between failed warm-up attempts
+WARMUP_RETRY_INITIAL_SECONDS = 1.0
+WARMUP_RETRY_MAX_SECONDS = 60.0
+
+
+class Readiness:
+    """
+    Whether the models are loaded and warm, as reported by ``/ready``.
+    """
+
+    def __init__(self):
+        self._ready = threading.Event()
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark_ready(self, seconds: Optional[float] = None) -> None:
+        self.seconds = seconds
+        self.error = None
+        self._ready.set()
+
+    def mark_failed(self, error: str) -> None:
+        self.error = error
+
+    def model_loaded(self) -> None:
+        """
+        Called when a request loads the embedding model; recovers from a
+        failed warm-up without waiting for its next retry.
+        """
+        if not self.ready and self.error:
+            logger.info("Embedding model loaded on first use after a failed warm-up")
+            self.mark_ready()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> Dict:
+        if self.ready:
+            state = "ready"
+        elif self.error:
+            state = "failed"
+        else:
+            state = "warming"
+        return {"status": state, "warmup_seconds": self.seconds, "error": self.error}
+
+
+readiness = Readiness()
+
+
+def warm_up() -> bool:
+    """
+    Load the models and run one dummy pass through each, so the first
+    request does not pay for loading, lazy initialization or allocation.
+
+    Returns:
+        Whether the models are warm; on failure the error is recorded and
+        the app stays not ready
+    """
+    # Imported here so that importing this module stays cheap
+    from app.services import get_embedding_service, get_reranker
+
+    started = time.perf_counter()
+    try:
+        service = get_embedding_service()
+        # Same path as query embedding, without touching the query cache
+        service.encode([WARMUP_TEXT], use_cache=False, normalize=True)
+        # Chunking and prompt budgets count tokens in this process
+        service.tokenizer
+
+        reranker = get_reranker()
+        if reranker is not None:
+            reranker.score(WARMUP_TEXT, [WARMUP_TEXT])
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+        metrics.counter("startup_warmup_errors").inc()
+        readiness.mark_failed(str(e))
+        return False
+
+    elapsed = time.perf_counter() - started
+    metrics.histogram("startup_warmup_seconds", (1, 2.5, 5, 10, 30, 60, 120)).observe(elapsed)
+    logger.info(f"Models warm after {elapsed:.1f}s")
+    readiness.mark_ready(elapsed)
+    return True
+
+
+def warm_up_until_ready(
+    initial_delay: float = WARMUP_RETRY_INITIAL_SECONDS,
+    max_delay: float = WARMUP_RETRY_MAX_SECONDS,
+) -> None:
+    """
+    Retry ``warm_up`` with exponential backoff until it succeeds or a
+    request has loaded the model in the meantime.
+    """
+    delay = initial_delay
+    while not warm_up():
+        logger.info(f"Retrying model warm-up in {delay:.0f}s")
+        if readiness.wait(delay):
+            return
+        delay = min(delay * 2, max_delay)
+
+
+def start_warmup(mode: str = STARTUP_WARMUP) -> None:
+    """
+    Warm the models as configured by STARTUP_WARMUP.
+    """
+    if mode == "off":
+        readiness.mark_ready()
+    elif mode == "blocking":
+        if not warm_up():
+            # Serve (not ready) rather than fail startup; keep retrying
+            threading.Thread(target=warm_up_until_ready, name="model-warmup", daemon=True).start()
+    elif mode == "background":
+        threading.Thread(target=warm_up_until_ready, name="model-warmup", daemon=True).start()
+    else:
+        raise ValueError(f"Unknown STARTUP_WARMUP mode '{mode}', expected background, blocking or off")
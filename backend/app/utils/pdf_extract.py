@@ -0,0 +1,47 @@
+"""
+PDF page extraction helpers.
+
+Kept free of application imports so process-pool workers can import this
+module without loading the web app, database or embedding model.
+"""
+import time
+from typing import BinaryIO, Iterator, List, Tuple
+
+from app.utils.text import normalize_text
+
+
+def iter_pdf_pages(stream: BinaryIO, start: int = 0, end: int = None) -> Iterator[Tuple[int, str, float]]:
+    """
+    Yield (page number, normalized text, extraction seconds) for a page range.
+    """
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(stream)
+    end = len(reader.pages) if end is None else end
+
+    for number in range(start, end):
+        started = time.perf_counter()
+        page_text = reader.pages[number].extract_text() or ""
+        elapsed = time.perf_counter() - started
+        # PyPDF2 caches every parsed object (including decoded content
+        # streams); drop the cache so memory does not grow per page. The
+        # cache is private, so only clear it where this version has one
+        cache = getattr(reader, "resolved_objects", None)
+        if isinstance(cache, dict):
+            cache.clear()
+        yield number, normalize_text(page_text), elapsed
+
+
+def extract_page_range(path: str, start: int, end: int) -> List[Tuple[int, str, float]]:
+    """
+    Extract pages [start, end) of a PDF on disk. Runs in a worker process.
+    """
+    with open(path, "rb") as f:
+        return list(iter_pdf_pages(f, start, end))
+
+
+def count_pages(path: str) -> int:
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
@@ -0,0 +1,2 @@
+def normalize_text(text: str) -> str:
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
@@ -0,0 +1,86 @@
+"""
+Chat endpoint concurrency benchmark.
+
+Fires waves of concurrent ``POST /chat/`` requests against a running API and
+reports latency percentiles per concurrency level. With a blocking pipeline,
+p99 grows roughly linearly with the number of in-flight requests because they
+are served one at a time by the event loop; with the async pipeline it should
+stay close to the single-request latency until CPU or Gemini become the limit.
+
+Usage:
+    uv run python -m benchmarks.bench_chat_concurrency --url http://localhost:8000 \\
+        --levels 1 4 16 32 --requests 64 --message "What is the refund policy?"
+
+Set GEMINI_MIN_REQUEST_INTERVAL=0 on the server to measure the pipeline
+rather than the Gemini rate limiter.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_level(client: httpx.AsyncClient, url: str, payload: dict, concurrency: int, total: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(url, json=payload)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - wall_started
+
+    return {
+        "concurrency": concurrency,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies),
+        "rps": total / wall,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=64, help="requests per level")
+    parser.add_argument("--message", default="Summarize the document.")
+    parser.add_argument("--document-ids", type=int, nargs="*", default=None)
+    args = parser.parse_args()
+
+    payload = {"message": args.message, "document_ids": args.document_ids, "stream": False}
+    endpoint = f"{args.url.rstrip('/')}/chat/"
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        # Warm up the model and connection pools
+        await client.post(endpoint, json=payload)
+
+        print(f"{'conc':>5} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'req/s':>8} {'errors':>7}")
+        for level in args.levels:
+            r = await run_level(client, endpoint, payload, level, max(args.requests, level))
+            print(
+                f"{r['concurrency']:>5} {r['p50'] * 1000:>9.1f} {r['p99'] * 1000:>9.1f} "
+                f"{r['mean'] * 1000:>9.1f} {r['rps']:>8.1f} {r['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""
+Chunk insert throughput: ORM objects + bulk_save_objects vs binary COPY.
+
+Both paths insert the same synthetic chunks (text plus a 384-d float32
+vector) for a scratch document in the configured database, inside a
+transaction that is rolled back afterwards. Chunks are written in batches
+of INGESTION_EMBED_BATCH, as ingestion does.
+
+With --client-only no database is needed: it measures only the Python
+side of each path (building Chunk objects and compiling the INSERT
+parameters, against encoding the COPY stream).
+
+Usage:
+    uv run python -m benchmarks.bench_chunk_insert --rows 20000
+    uv run python -m benchmarks.bench_chunk_insert --rows 20000 --client-only
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+from sqlalchemy import insert
+
+from app.core.config import INGESTION_EMBED_BATCH
+from app.db.bulk import copy_chunks, encode_chunk_rows
+from app.models import Chunk, Document
+from app.services.document_service import compute_file_hash
+
+DIMENSIONS = 384
+
+
+def synthetic_chunks(rows: int):
+    rng = np.random.default_rng(0)
+    texts = [f"chunk {i} " + "lorem ipsum dolor sit amet " * 28 for i in range(rows)]
+    embeddings = rng.standard_normal((rows, DIMENSIONS)).astype(np.float32)
+    offsets = [(i * 650, i * 650 + 800) for i in range(rows)]
+    return texts, embeddings, offsets
+
+
+def create_chunk_objects(document_id: int, texts, embeddings, offsets, indices):
+    """
+    Chunk rows as the ORM path built them before ingestion moved to COPY.
+    """
+    return [
+        Chunk(
+            document_id=document_id,
+            content=text,
+            embedding=embedding,
+            chunk_index=index,
+            start_char=start_char,
+            end_char=end_char,
+            content_hash=compute_file_hash(text),
+        )
+        for index, text, embedding, (start_char, end_char) in zip(indices, texts, embeddings, offsets)
+    ]
+
+
+def batches(rows: int, size: int):
+    for start in range(0, rows, size):
+        yield slice(start, min(rows, start + size))
+
+
+def orm_client(texts, embeddings, offsets, batch):
+    """
+    Object construction plus parameter processing (pgvector's text
+    formatting), with the INSERT compiled once per batch like executemany.
+    """
+    dialect = postgresql.psycopg2.dialect()
+    columns = ("document_id", "content", "embedding", "chunk_index", "start_char", "end_char", "content_hash")
+    for part in batches(len(texts), batch):
+        objects = create_chunk_objects(
+            1, texts[part], embeddings[part].tolist(), offsets[part], range(part.start, part.stop),
+        )
+        compiled = insert(Chunk).values({column: None for column in columns}).compile(dialect=dialect)
+        processors = {column: compiled._bind_processors.get(column) for column in columns}
+        for chunk in objects:
+            for column in columns:
+                value = getattr(chunk, column)
+                if processors[column] is not None:
+                    processors[column](value)
+
+
+def copy_client(texts, embeddings, offsets, batch):
+    for part in batches(len(texts), batch):
+        encode_chunk_rows(
+            1, texts[part], embeddings[part], range(part.start, part.stop), offsets[part],
+            [compute_file_hash(text) for text in texts[part]],
+        )
+
+
+def with_scratch_document(fn):
+    from app.db.base import SessionLocal
+    db = SessionLocal()
+    try:
+        doc = Document(filename="bench.txt", content="", file_hash=compute_file_hash(str(time.time())))
+        db.add(doc)
+        db.flush()
+        started = time.perf_counter()
+        fn(db, doc.id)
+        db.flush()
+        return time.perf_counter() - started
+    finally:
+        db.rollback()
+        db.close()
+
+
+def orm_db(texts, embeddings, offsets, batch):
+    def run(db, document_id):
+        for part in batches(len(texts), batch):
+            db.bulk_save_objects(create_chunk_objects(
+                document_id, texts[part], embeddings[part].tolist(),
+                offsets[part], range(part.start, part.stop),
+            ))
+    return with_scratch_document(run)
+
+
+def copy_db(texts, embeddings, offsets, batch):
+    def run(db, document_id):
+        for part in batches(len(texts), batch):
+            copy_chunks(
+                db, document_id, texts[part], embeddings[part], range(part.start, part.stop),
+                offsets=offsets[part], hashes=[compute_file_hash(text) for text in texts[part]],
+            )
+    return with_scratch_document(run)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=INGESTION_EMBED_BATCH)
+    parser.add_argument("--client-only", action="store_true", help="Measure Python-side cost only")
+    args = parser.parse_args()
+
+    texts, embeddings, offsets = synthetic_chunks(args.rows)
+    if args.client_only:
+        paths = (("orm (client)", lambda: timed(orm_client, texts, embeddings, offsets, args.batch)),
+                 ("copy (client)", lambda: timed(copy_client, texts, embeddings, offsets, args.batch)))
+    else:
+        paths = (("orm", lambda: orm_db(texts, embeddings, offsets, args.batch)),
+                 ("copy", lambda: copy_db(texts, embeddings, offsets, args.batch)))
+
+    print(f"{args.rows} chunks of ~{np.mean([len(t) for t in texts]):.0f} chars, {DIMENSIONS}-d vectors, batch {args.batch}")
+    print(f"{'path':<14} {'seconds':>8} {'rows/s':>10}")
+    for name, run in paths:
+        seconds = run()
+        print(f"{name:<14} {seconds:>8.2f} {args.rows / seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
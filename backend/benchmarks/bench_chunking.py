@@ -0,0 +1,99 @@
+"""
+Chunking benchmark: throughput, model-limit overflow and retrieval quality.
+
+Builds a synthetic document of filler sentences with planted facts
+("The access code for project <name> is <code>."), chunks it with each
+chunker, embeds the chunks and asks one question per fact. Reports:
+
+- chunks/s and MB/s of chunking alone (tokenizer included)
+- share of chunks longer than the model's max sequence length, whose tail is
+  silently dropped at embedding time
+- recall@k: the fraction of questions whose fact lands in a top-k chunk
+
+Requires the all-MiniLM-L6-v2 weights (downloaded on first use).
+
+Usage:
+    uv run python -m benchmarks.bench_chunking --sentences 5000 --facts 100
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services import get_embedding_service
+from app.services.chunking import CharChunker, TokenChunker
+from app.core.config import CHUNK_OVERLAP_TOKENS
+from benchmarks.synthetic_pdf import WORDS
+
+
+def build_document(sentences: int, facts: int, seed: int = 0):
+    rng = random.Random(seed)
+    lines = []
+    planted = []
+    fact_every = max(1, sentences // facts)
+
+    for i in range(sentences):
+        if i % fact_every == fact_every // 2 and len(planted) < facts:
+            name = f"{rng.choice(WORDS)}{len(planted)}"
+            code = f"{rng.randint(0, 10 ** 6):06d}"
+            lines.append(f"The access code for project {name} is {code}.")
+            planted.append((f"What is the access code for project {name}?", code))
+        else:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+            lines.append(" ".join(words).capitalize() + ".")
+        # Roughly five sentences per paragraph
+        if rng.random() < 0.2:
+            lines[-1] += "\n"
+
+    return " ".join(lines).replace("\n ", "\n"), planted
+
+
+def run(name, chunker, text, planted, service, k):
+    started = time.perf_counter()
+    chunks = [c.content for c in chunker.iter_chunks([text], separator="")]
+    elapsed = time.perf_counter() - started
+
+    tokenizer = service.tokenizer
+    limit = service.max_seq_length
+    lengths = [len(ids) for ids in tokenizer(chunks, add_special_tokens=True)["input_ids"]]
+    overflow = sum(1 for n in lengths if n > limit) / len(chunks)
+
+    chunk_vectors = service.encode(chunks, use_cache=False)
+    query_vectors = service.encode([q for q, _ in planted], use_cache=False)
+    scores = query_vectors @ chunk_vectors.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    hits = sum(
+        any(code in chunks[j] for j in row)
+        for row, (_, code) in zip(top, planted)
+    )
+
+    print(
+        f"{name:<8} {len(chunks):>7} {len(chunks) / elapsed:>10.0f} "
+        f"{len(text) / elapsed / 1e6:>7.2f} {np.mean(lengths):>8.1f} "
+        f"{overflow:>9.1%} {hits / len(planted):>9.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=5000)
+    parser.add_argument("--facts", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    service = get_embedding_service()
+    text, planted = build_document(args.sentences, args.facts)
+    chunkers = (
+        ("char", CharChunker()),
+        ("token", TokenChunker(service.tokenizer, service.max_seq_length - 2, CHUNK_OVERLAP_TOKENS)),
+    )
+
+    print(f"{len(text) / 1e6:.2f} MB of text, {len(planted)} facts, model limit {service.max_seq_length} tokens")
+    print(f"{'chunker':<8} {'chunks':>7} {'chunks/s':>10} {'MB/s':>7} {'avg tok':>8} {'over lim':>9} {f'recall@{args.k}':>9}")
+    for name, chunker in chunkers:
+        run(name, chunker, text, planted, service, args.k)
+
+
+if __name__ == "__main__":
+    main()
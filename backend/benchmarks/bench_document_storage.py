@@ -0,0 +1,149 @@
+"""
+Document text in the row vs in the blob store: table size and latency.
+
+Loads the same synthetic documents into two scratch tables in the
+configured database, one with the text inline (documents.content) and one
+with only a blob reference (content_ref/content_size, text written to a
+temporary BlobStore), and compares:
+
+- total relation size (heap + TOAST + indexes)
+- listing a page of full rows (SELECT *, what db.query(Document) does)
+- listing a page of metadata
+- fetching one document's full text (row vs blob file)
+
+Usage:
+    uv run python -m benchmarks.bench_document_storage --documents 2000 --kb 200
+"""
+import argparse
+import hashlib
+import io
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.services.blob_store import BlobStore
+from benchmarks.synthetic_pdf import WORDS
+
+INLINE = "bench_documents_inline"
+OFFLOADED = "bench_documents_offloaded"
+
+
+def synthetic_text(rng: random.Random, kb: int) -> str:
+    words = []
+    size = 0
+    while size < kb * 1024:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def copy_rows(table: str, columns: str, rows) -> None:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(
+            "\\N" if value is None else str(value).replace("\\", "\\\\").replace("\t", " ")
+            for value in row
+        ) + "\n")
+    buffer.seek(0)
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def load(documents: int, kb: int, store: BlobStore) -> None:
+    with engine.begin() as conn:
+        for table in (INLINE, OFFLOADED):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text(
+            f"CREATE TABLE {INLINE} (id integer PRIMARY KEY, filename varchar(255), "
+            "file_hash varchar(64), created_at timestamp, content text)"
+        ))
+        conn.execute(text(
+            f"CREATE TABLE {OFFLOADED} (id integer PRIMARY KEY, filename varchar(255), "
+            "file_hash varchar(64), created_at timestamp, content text, "
+            "content_ref varchar(64), content_size integer)"
+        ))
+        for table in (INLINE, OFFLOADED):
+            conn.execute(text(f"CREATE INDEX ON {table} (created_at DESC, id DESC)"))
+
+    rng = random.Random(0)
+    for start in range(0, documents, 100):
+        inline, offloaded = [], []
+        for i in range(start, min(documents, start + 100)):
+            content = synthetic_text(rng, kb)
+            key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            created = datetime(2024, 1, 1) + timedelta(seconds=i)
+            inline.append((i, f"doc{i}.txt", key, created, content))
+            size = store.put(key, [content])
+            offloaded.append((i, f"doc{i}.txt", key, created, None, key, size))
+        copy_rows(INLINE, "id, filename, file_hash, created_at, content", inline)
+        copy_rows(OFFLOADED, "id, filename, file_hash, created_at, content, content_ref, content_size", offloaded)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in (INLINE, OFFLOADED):
+            conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+def timed(fn, repeats: int):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    latencies = np.asarray(latencies) * 1000
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--kb", type=int, default=200, help="Text size per document")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = BlobStore(directory)
+        print(f"Loading {args.documents} documents of {args.kb} KB...")
+        load(args.documents, args.kb, store)
+
+        try:
+            with engine.connect() as conn:
+                def query(sql, **params):
+                    return lambda: conn.execute(text(sql), params).fetchall()
+
+                def blob_text(document_id):
+                    key = conn.execute(text(f"SELECT content_ref FROM {OFFLOADED} WHERE id = :id"), {"id": document_id}).scalar()
+                    return store.read_text(key)
+
+                ids = random.Random(1).choices(range(args.documents), k=args.repeats)
+                print(f"{'storage':<10} {'size MB':>8} {'rows p50':>9} {'meta p50':>9} {'text p50':>9} {'text p95':>9}")
+                for table in (INLINE, OFFLOADED):
+                    size = conn.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar()
+                    rows, _ = timed(query(f"SELECT * FROM {table} ORDER BY created_at DESC, id DESC LIMIT :n", n=args.page), args.repeats)
+                    meta, _ = timed(query(f"SELECT id, filename, file_hash, created_at FROM {table} ORDER BY created_at DESC, id DESC LIMIT :n", n=args.page), args.repeats)
+                    pending = iter(ids)
+                    if table == INLINE:
+                        fetch = lambda: conn.execute(text(f"SELECT content FROM {INLINE} WHERE id = :id"), {"id": next(pending)}).scalar()
+                    else:
+                        fetch = lambda: blob_text(next(pending))
+                    text50, text95 = timed(fetch, args.repeats)
+                    label = "inline" if table == INLINE else "blob"
+                    print(f"{label:<10} {size / 1024 / 1024:>8.1f} {rows:>9.2f} {meta:>9.2f} {text50:>9.2f} {text95:>9.2f}")
+        finally:
+            with engine.begin() as conn:
+                for table in (INLINE, OFFLOADED):
+                    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+
+if __name__ == "__main__":
+    main()
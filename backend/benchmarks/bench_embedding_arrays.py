@@ -0,0 +1,98 @@
+"""
+Embeddings as float32 arrays vs lists of Python floats: memory and time.
+
+Starts from a (rows, 384) float32 array, as SentenceTransformer.encode
+returns it, and compares the two representations on what the app does
+with embeddings:
+
+- materialize: .tolist() (the old get_embeddings) vs keeping the array
+- pgvector bind: formatting the parameter for an INSERT/query
+- COPY encode: building the binary COPY stream for chunk inserts
+- similarity: scoring one query against all rows
+
+Memory is the tracemalloc peak while building each representation.
+With --model, the real model also encodes --texts synthetic sentences
+through both service APIs.
+
+Usage:
+    uv run python -m benchmarks.bench_embedding_arrays --rows 10000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects import postgresql
+
+from app.db.bulk import encode_chunk_rows
+
+DIMENSIONS = 384
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(name, seconds, peak=None):
+    memory = f"{peak / 1024 / 1024:>9.1f}" if peak is not None else f"{'':>9}"
+    print(f"{name:<34} {seconds * 1000:>10.1f} {memory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--model", action="store_true", help="Also time the embedding service")
+    parser.add_argument("--texts", type=int, default=256)
+    args = parser.parse_args()
+
+    array = np.random.default_rng(0).standard_normal((args.rows, DIMENSIONS)).astype(np.float32)
+    bind = Vector(DIMENSIONS).bind_processor(postgresql.psycopg2.dialect())
+
+    print(f"{args.rows} x {DIMENSIONS} embeddings ({array.nbytes / 1024 / 1024:.1f} MB as float32)")
+    print(f"{'step':<34} {'ms':>10} {'peak MB':>9}")
+
+    lists, seconds, peak = measure(array.tolist)
+    report("materialize: list of floats", seconds, peak)
+    copy, seconds, peak = measure(lambda: array.copy())
+    report("materialize: float32 array (copy)", seconds, peak)
+
+    _, seconds, peak = measure(lambda: [bind(row) for row in lists])
+    report("pgvector bind: lists", seconds, peak)
+    _, seconds, peak = measure(lambda: [bind(row) for row in copy])
+    report("pgvector bind: array rows", seconds, peak)
+
+    texts = ["chunk"] * args.rows
+    indices = range(args.rows)
+    offsets = [(None, None)] * args.rows
+    hashes = [None] * args.rows
+    _, seconds, peak = measure(lambda: encode_chunk_rows(1, texts, np.asarray(lists, dtype=np.float32), indices, offsets, hashes))
+    report("COPY encode: from lists", seconds, peak)
+    _, seconds, peak = measure(lambda: encode_chunk_rows(1, texts, copy, indices, offsets, hashes))
+    report("COPY encode: from array", seconds, peak)
+
+    query = copy[0]
+    _, seconds, _ = measure(lambda: [sum(a * b for a, b in zip(lists[0], row)) for row in lists])
+    report("similarity: Python lists", seconds)
+    _, seconds, _ = measure(lambda: copy @ query)
+    report("similarity: array matmul", seconds)
+
+    if args.model:
+        from app.services import get_embedding_service
+        service = get_embedding_service()
+        sentences = [f"Synthetic sentence number {i} about topic {i % 17}." for i in range(args.texts)]
+        service.encode(sentences[:8], use_cache=False)
+        _, seconds, peak = measure(lambda: service.get_embeddings(sentences, use_cache=False))
+        report(f"service: get_embeddings x{args.texts}", seconds, peak)
+        _, seconds, peak = measure(lambda: service.encode(sentences, use_cache=False))
+        report(f"service: encode x{args.texts}", seconds, peak)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Embedding backend benchmark: encode throughput and agreement with torch.
+
+Encodes synthetic query-sized and chunk-sized texts with each backend
+(torch, ONNX Runtime at full precision and dynamic int8) and reports:
+
+- texts/s at batch size 1 (a single query) and at --batch-size (ingestion)
+- cosine agreement of each backend's vectors with the torch backend's
+  (mean and minimum over the texts)
+
+Requires the all-MiniLM-L6-v2 weights and, for the onnx rows, the "onnx"
+extra (ONNX Runtime and Optimum).
+
+Usage:
+    uv run python -m benchmarks.bench_embedding_backends --threads 4 --quantization avx2 avx512_vnni
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.SentenceTransformerService import (
+    SentenceTransformerService,
+    backend_variant,
+    load_embedding_model,
+)
+from benchmarks.synthetic_pdf import WORDS
+
+
+def build_texts(count: int, words: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def throughput(model, texts, batch_size: int, rounds: int) -> float:
+    model.encode(texts[:batch_size], batch_size=batch_size)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    return rounds * len(texts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = all cores)")
+    parser.add_argument(
+        "--quantization", nargs="+", default=["none", "avx2"],
+        help="ONNX files to compare (keys of ONNX_FILES)",
+    )
+    args = parser.parse_args()
+
+    queries = build_texts(args.texts // 4, 12)
+    chunks = build_texts(args.texts, 200, seed=1)
+    configs = [("torch", None)] + [("onnx", q) for q in args.quantization]
+
+    reference = None
+    print(f"{'backend':<18} {'query/s (bs=1)':>15} {'chunk/s':>10} {'cos mean':>9} {'cos min':>9}")
+    for backend, quantization in configs:
+        try:
+            model = load_embedding_model(
+                backend, SentenceTransformerService.MODEL_NAME,
+                threads=args.threads, quantization=quantization,
+            )
+        except Exception as e:
+            print(f"{backend_variant(backend, quantization):<18} unavailable: {e}")
+            continue
+
+        query_rate = throughput(model, queries, 1, args.rounds)
+        chunk_rate = throughput(model, chunks, args.batch_size, args.rounds)
+        vectors = model.encode(chunks, batch_size=args.batch_size, normalize_embeddings=True)
+        if backend == "torch":
+            reference = vectors
+        if reference is not None:
+            agreement = np.sum(reference * vectors, axis=1)
+            cosine = f"{agreement.mean():>9.4f} {agreement.min():>9.4f}"
+        else:
+            cosine = f"{'-':>9} {'-':>9}"
+        print(f"{backend_variant(backend, quantization):<18} {query_rate:>15.1f} {chunk_rate:>10.1f} {cosine}")
+
+
+if __name__ == "__main__":
+    main()
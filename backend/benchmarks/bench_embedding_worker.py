@@ -0,0 +1,162 @@
+"""
+Per-worker models vs one shared embedding worker: memory and throughput.
+
+Starts --workers processes standing in for `uvicorn --workers N` API
+workers. Each embeds unique queries through the embedding batcher with
+--concurrency in-flight requests for --seconds, like concurrent chat
+requests. In "local" mode every process loads its own model; in "shared"
+mode an `app.cli embedding-worker` process holds the only model and the
+API processes are its clients.
+
+Memory is each process's proportional set size (PSS, shared pages split
+between the processes that map them; RSS where PSS is unavailable),
+summed over the node. Throughput is total queries/s.
+
+--footprint only compares the import footprint of an API process in
+each mode (torch and sentence_transformers imported vs the worker client),
+without the model weights.
+
+Usage:
+    uv run python -m benchmarks.bench_embedding_worker --workers 4 --concurrency 8
+    uv run python -m benchmarks.bench_embedding_worker --footprint
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+API_WORKER = """
+import asyncio, json, os, sys, time
+from benchmarks.bench_embedding_worker import memory_mb
+from app.services import get_embedding_batcher
+
+seconds, concurrency = float(sys.argv[1]), int(sys.argv[2])
+batcher = get_embedding_batcher()
+
+async def main():
+    await batcher.embed("warm up")
+    print("ready", flush=True)
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
+    deadline = time.perf_counter() + seconds
+    counts = [0] * concurrency
+
+    async def client(i):
+        while time.perf_counter() < deadline:
+            await batcher.embed(f"question {os.getpid()} {i} {counts[i]}")
+            counts[i] += 1
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    print(json.dumps({"queries": sum(counts), "memory": memory_mb(os.getpid())}), flush=True)
+
+asyncio.run(main())
+"""
+
+FOOTPRINT = {
+    "local": "import torch, sentence_transformers, app.main",
+    "shared": "import tokenizers, app.main\nfrom app.services import get_embedding_service\nget_embedding_service()",
+}
+
+
+def memory_mb(pid: int) -> float:
+    """
+    PSS of a process in MB, or RSS where smaps_rollup is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("Cannot read process memory (Linux only)")
+
+
+def environment(socket_path: str = "") -> dict:
+    env = os.environ.copy()
+    env["EMBEDDING_WORKER_SOCKET"] = socket_path
+    return env
+
+
+def run_api_workers(args, env) -> tuple:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", API_WORKER, str(args.seconds), str(args.concurrency)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env,
+        )
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        if process.stdout.readline().strip() != "ready":
+            raise RuntimeError("API worker failed to start")
+    for process in processes:
+        process.stdin.write("go\n")
+        process.stdin.flush()
+    results = [json.loads(process.stdout.readline()) for process in processes]
+    for process in processes:
+        process.wait()
+    queries = sum(r["queries"] for r in results)
+    return queries / args.seconds, sum(r["memory"] for r in results)
+
+
+def start_embedding_worker(socket_path: str, env) -> subprocess.Popen:
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "app.cli", "embedding-worker", "--socket", socket_path],
+        env=env, stderr=subprocess.DEVNULL,
+    )
+    while not os.path.exists(socket_path):
+        if worker.poll() is not None:
+            raise RuntimeError("Embedding worker exited during startup")
+        time.sleep(0.2)
+    return worker
+
+
+def footprint():
+    print(f"{'mode':<8} {'API process MB':>15}")
+    for mode, script in FOOTPRINT.items():
+        # The client only connects on first use, so no worker is needed
+        script += "\nimport os\nfrom benchmarks.bench_embedding_worker import memory_mb\nprint(memory_mb(os.getpid()))"
+        output = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            env=environment("/nonexistent.sock" if mode == "shared" else ""),
+        ).stdout
+        print(f"{mode:<8} {float(output.strip().splitlines()[-1]):>15.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8, help="In-flight queries per API worker")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--footprint", action="store_true")
+    args = parser.parse_args()
+
+    if args.footprint:
+        footprint()
+        return
+
+    print(f"{args.workers} API workers x {args.concurrency} concurrent queries, {args.seconds:.0f}s")
+    print(f"{'mode':<8} {'queries/s':>10} {'API MB':>8} {'worker MB':>10} {'node MB':>8}")
+
+    rate, api_memory = run_api_workers(args, environment())
+    print(f"{'local':<8} {rate:>10.1f} {api_memory:>8.0f} {'-':>10} {api_memory:>8.0f}")
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "embedding.sock")
+    worker = start_embedding_worker(socket_path, environment(socket_path))
+    try:
+        rate, api_memory = run_api_workers(args, environment(socket_path))
+        worker_memory = memory_mb(worker.pid)
+    finally:
+        worker.terminate()
+        worker.wait()
+    print(f"{'shared':<8} {rate:>10.1f} {api_memory:>8.0f} {worker_memory:>10.0f} {api_memory + worker_memory:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
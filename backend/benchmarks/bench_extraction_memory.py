@@ -0,0 +1,77 @@
+"""
+Peak-memory benchmark for document extraction and chunking.
+
+Compares the previous whole-document path (read all bytes, extract the full
+text, normalize, chunk into a list) with the streaming path used by the
+ingestion worker (page-by-page extraction into a generator chunker) on a
+large synthetic PDF. Memory is measured with tracemalloc, so it covers Python
+allocations only.
+
+Usage:
+    uv run python -m benchmarks.bench_extraction_memory --pages 300
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import PyPDF2
+
+from app.services.document_service import chunk_text, iter_chunks, iter_text_from_path, normalize_text
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+
+def whole_document(path: str) -> int:
+    with open(path, "rb") as f:
+        content = f.read()
+    reader = PyPDF2.PdfReader(BytesIO(content))
+    pages = [page.extract_text() for page in reader.pages]
+    text = normalize_text("\n".join(p for p in pages if p))
+    return len(chunk_text(text))
+
+
+def streaming(path: str) -> int:
+    count = 0
+    for _ in iter_chunks(iter_text_from_path(path, "bench.pdf")):
+        count += 1
+    return count
+
+
+def measure(fn, path: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = fn(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdf")
+        write_synthetic_pdf(path, args.pages)
+        file_mb = os.path.getsize(path) / 1024 / 1024
+
+        with open(path, "rb") as f:
+            page_text = PyPDF2.PdfReader(f).pages[0].extract_text()
+        page_kb = len(page_text.encode("utf-8")) / 1024
+
+        print(f"{args.pages} pages, {file_mb:.1f} MB on disk, ~{page_kb:.1f} KB text per page")
+        print(f"{'path':<16} {'chunks':>8} {'peak MB':>9} {'pages of text':>14} {'seconds':>8}")
+        for name, fn in (("whole-document", whole_document), ("streaming", streaming)):
+            chunks, peak, elapsed = measure(fn, path)
+            print(
+                f"{name:<16} {chunks:>8} {peak / 1024 / 1024:>9.2f} "
+                f"{peak / 1024 / page_kb:>14.1f} {elapsed:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
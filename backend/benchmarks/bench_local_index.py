@@ -0,0 +1,103 @@
+"""
+In-process memory-mapped index vs pgvector: per-query retrieval latency.
+
+For each corpus size, synthetic normalized 384-d vectors are loaded into a
+LocalVectorIndex in a temporary directory and searched one query at a time
+(the chat path) and in batches. With --pgvector the same vectors are loaded
+into a scratch table in the configured database (see bench_vector_index)
+and searched with an exact scan and with an HNSW index at the default
+recall target, including the client round trip.
+
+Usage:
+    uv run python -m benchmarks.bench_local_index --sizes 10000 100000 1000000 --pgvector
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.config import SEARCH_RECALL_TARGET
+from app.services import vector_index
+from app.services.local_index import LocalVectorIndex
+from benchmarks.bench_vector_index import (
+    DIMENSIONS,
+    INDEX,
+    build_index,
+    load_table,
+    run_queries,
+    synthetic_vectors,
+)
+from app.db.base import engine
+
+
+def percentiles(latencies):
+    latencies = np.asarray(latencies) * 1000
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def bench_local(vectors: np.ndarray, queries: np.ndarray, k: int, batch: int):
+    with tempfile.TemporaryDirectory() as directory:
+        index = LocalVectorIndex(directory)
+        ids = np.arange(1, len(vectors) + 1)
+        for start in range(0, len(vectors), 100000):
+            index.append(ids[start:start + 100000], ids[start:start + 100000] % 100, vectors[start:start + 100000])
+
+        truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :k] + 1
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = index.search(query, k)
+            latencies.append(time.perf_counter() - started)
+            recalls.append(len(set(found) & set(expected.tolist())) / k)
+
+        started = time.perf_counter()
+        for start in range(0, len(queries), batch):
+            index.search_many(queries[start:start + batch], k)
+        batched_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        scoped = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, k, document_ids=[1, 2, 3])
+            scoped.append(time.perf_counter() - started)
+
+    return float(np.mean(recalls)), percentiles(latencies), batched_ms, percentiles(scoped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 100000, 1000000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--pgvector", action="store_true", help="Also benchmark pgvector in the configured database")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'backend':<22} {f'recall@{args.k}':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for rows in args.sizes:
+        vectors = synthetic_vectors(rows, clusters=256)
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(0, rows, args.queries)] + 0.3 * rng.standard_normal((args.queries, DIMENSIONS)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        recall, (p50, p95), batched_ms, (s50, s95) = bench_local(vectors, queries, args.k, args.batch)
+        print(f"{rows:>9} {'local':<22} {recall:>9.3f} {p50:>8.2f} {p95:>8.2f}")
+        print(f"{rows:>9} {f'local batch={args.batch}':<22} {'':>9} {batched_ms:>8.2f} {'(per query)':>8}")
+        print(f"{rows:>9} {'local 3% scope':<22} {'':>9} {s50:>8.2f} {s95:>8.2f}")
+
+        if args.pgvector:
+            truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+            load_table(vectors)
+            recall, p50, p95 = run_queries(queries, truth, args.k, {"enable_indexscan": "off"})
+            print(f"{rows:>9} {'pgvector exact':<22} {recall:>9.3f} {p50:>8.2f} {p95:>8.2f}")
+            build_index("hnsw", rows)
+            with engine.connect() as conn:
+                state = vector_index.read_index(conn, name=INDEX)
+            settings = vector_index.search_settings(SEARCH_RECALL_TARGET, args.k, state)
+            recall, p50, p95 = run_queries(queries, truth, args.k, settings)
+            print(f"{rows:>9} {'pgvector hnsw':<22} {recall:>9.3f} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Serial vs process-pool PDF extraction benchmark.
+
+Usage:
+    uv run python -m benchmarks.bench_pdf_extraction --pages 300 --workers 1 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.core.metrics import metrics
+from app.services import document_service
+from app.utils.pdf_extract import count_pages
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+
+def run(path: str, workers: int) -> tuple:
+    started = time.perf_counter()
+    if workers <= 1:
+        with open(path, "rb") as f:
+            text = "\n".join(document_service.iter_text_from_stream(f, "bench.pdf"))
+    else:
+        text = "\n".join(document_service._iter_pdf_parallel(path, count_pages(path)))
+    return time.perf_counter() - started, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdf")
+        write_synthetic_pdf(path, args.pages)
+
+        baseline_text = None
+        baseline_time = None
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'same text':>10}")
+        for workers in args.workers:
+            document_service.PDF_EXTRACT_WORKERS = workers
+            document_service.get_pdf_executor.cache_clear()
+            if workers > 1:
+                # Exclude process start-up from the measurement
+                run(path, workers)
+            elapsed, text = run(path, workers)
+            if baseline_text is None:
+                baseline_text, baseline_time = text, elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {baseline_time / elapsed:>8.2f} {str(text == baseline_text):>10}")
+
+    pages = metrics.snapshot()["histograms"]["pdf_page_extract_seconds"]
+    print(f"\nper-page extraction: n={pages['count']} avg={pages['avg'] * 1000:.1f} ms")
+    for bound, count in pages["buckets"].items():
+        print(f"  <= {bound:>6}s: {count}")
+
+
+if __name__ == "__main__":
+    main()
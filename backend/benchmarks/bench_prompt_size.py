@@ -0,0 +1,83 @@
+"""
+Prompt size with and without context merging and the token budget.
+
+Samples chunks from the configured database and uses each one's stored
+embedding as the query, so retrieval runs over the real corpus without
+the embedding model. For each sample the top-k chunks are assembled into a
+prompt three ways:
+
+- naive:  every chunk in full (the original build_prompt)
+- merged: adjacent chunks merged without their overlap, duplicates dropped
+- budget: merged, then fitted to PROMPT_TOKEN_BUDGET
+
+Tokens are counted with the embedding model's tokenizer.
+
+Usage:
+    uv run python -m benchmarks.bench_prompt_size --samples 200 --k 5 20
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app.core.config import PROMPT_TOKEN_BUDGET
+from app.db.base import SessionLocal
+from app.models import Chunk
+from app.services import get_embedding_service
+from app.services.prompt_builder import assemble_prompt, count_tokens
+from app.services.rag_service import build_prompt
+
+
+def retrieve_neighbours(db, chunk: Chunk, k: int):
+    return db.execute(
+        select(Chunk)
+        .order_by(Chunk.embedding.cosine_distance(chunk.embedding))
+        .limit(k)
+    ).scalars().all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--k", nargs="+", type=int, default=[5, 20])
+    parser.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    tokenizer = get_embedding_service().tokenizer
+    db = SessionLocal()
+    try:
+        queries = db.execute(select(Chunk).order_by(func.random()).limit(args.samples)).scalars().all()
+        if not queries:
+            print("No chunks in the database; upload some documents first.")
+            return
+
+        print(f"{len(queries)} sampled queries, budget {args.budget} tokens")
+        print(f"{'k':>4} {'naive':>8} {'merged':>8} {'budget':>8} {'saved':>7} {'merges':>7} {'dropped':>8} {'ms':>6}")
+        for k in args.k:
+            naive, merged, budgeted, merges, dropped, elapsed = [], [], [], [], [], []
+            for query in queries:
+                chunks = retrieve_neighbours(db, query, k)
+                question = query.content[:200]
+                naive.append(count_tokens(tokenizer, build_prompt(question, chunks)))
+                merged.append(assemble_prompt(question, chunks, tokenizer, 0).usage.prompt_tokens)
+
+                started = time.perf_counter()
+                prompt = assemble_prompt(question, chunks, tokenizer, args.budget)
+                elapsed.append(time.perf_counter() - started)
+                budgeted.append(prompt.usage.prompt_tokens)
+                # Sources built from more than one retrieved chunk
+                merges.append(sum(len(s.chunks) > 1 for s in prompt.sources))
+                dropped.append(prompt.usage.sources_dropped)
+
+            saved = 1 - np.mean(budgeted) / np.mean(naive)
+            print(
+                f"{k:>4} {np.mean(naive):>8.0f} {np.mean(merged):>8.0f} {np.mean(budgeted):>8.0f} "
+                f"{saved:>7.1%} {np.mean(merges):>7.2f} {np.mean(dropped):>8.2f} {np.mean(elapsed) * 1000:>6.1f}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Startup benchmark: import time and cold-start latency.
+
+Each measurement runs in a fresh interpreter so nothing is already
+imported or loaded. Reports:
+
+- import: seconds to import app.main, and which heavy modules it pulled in
+- cold query: what the first user waits without warm-up (model load plus
+  the first encode of a query)
+- warm-up: seconds the background warm-up takes, and the latency of the
+  first query encoded after it
+
+Requires the embedding model weights for the cold-start rows (skip them
+with --import-only). Honors EMBEDDING_BACKEND and the other settings in
+the environment.
+
+Usage:
+    uv run python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "google.generativeai", "PyPDF2", "docx")
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"import": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+COLD_SCRIPT = """
+import json, time
+import app.main
+from app.services import get_embedding_service
+started = time.perf_counter()
+get_embedding_service().encode(["how do refunds work?"], use_cache=False, normalize=True)
+print(json.dumps({"cold_query": time.perf_counter() - started}))
+"""
+
+WARM_SCRIPT = """
+import json, time
+import app.main
+from app.services import get_embedding_service
+from app.services.warmup import warm_up
+started = time.perf_counter()
+warm_up()
+warmup = time.perf_counter() - started
+started = time.perf_counter()
+get_embedding_service().encode(["how do refunds work?"], use_cache=False, normalize=True)
+print(json.dumps({"warmup": warmup, "warm_query": time.perf_counter() - started}))
+"""
+
+
+def run(script: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(results, key):
+    return statistics.median(result[key] for result in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--import-only", action="store_true")
+    args = parser.parse_args()
+
+    imports = [run(IMPORT_SCRIPT) for _ in range(args.runs)]
+    print(f"import app.main          {median(imports, 'import'):>8.2f}s")
+    print(f"heavy modules imported   {', '.join(imports[0]['loaded']) or 'none'}")
+    if args.import_only:
+        return
+
+    cold = [run(COLD_SCRIPT) for _ in range(args.runs)]
+    warm = [run(WARM_SCRIPT) for _ in range(args.runs)]
+    print(f"first query, no warm-up  {median(cold, 'cold_query'):>8.2f}s")
+    print(f"background warm-up       {median(warm, 'warmup'):>8.2f}s")
+    print(f"first query after warm   {median(warm, 'warm_query') * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
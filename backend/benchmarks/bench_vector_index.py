@@ -0,0 +1,136 @@
+"""
+Recall@k vs latency of the pgvector ANN index against an exact scan.
+
+Loads synthetic clustered, normalized 384-d vectors into a scratch table
+(bench_vectors) in the configured database, builds the index exactly as
+app.services.vector_index does for chunks, and runs the same queries at
+several recall targets. Ground truth is an exact cosine top-k computed in
+NumPy; the "exact" row is Postgres with index scans disabled.
+
+Usage:
+    uv run python -m benchmarks.bench_vector_index --rows 100000 --kind hnsw ivfflat
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db.base import engine
+from app.services import vector_index
+
+TABLE = "bench_vectors"
+INDEX = "ix_bench_vectors"
+DIMENSIONS = 384
+
+
+def synthetic_vectors(rows: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSIONS)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def load_table(vectors: np.ndarray) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, embedding vector({DIMENSIONS}))"))
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for start in range(0, len(vectors), 10000):
+            buffer = io.StringIO()
+            for i, vector in enumerate(vectors[start:start + 10000], start=start):
+                buffer.write(f"{i}\t{vector_literal(vector)}\n")
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {TABLE} (id, embedding) FROM STDIN", buffer)
+        raw.commit()
+    finally:
+        raw.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def build_index(kind: str, rows: int) -> float:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {INDEX}"))
+        conn.execute(text("SELECT set_config('maintenance_work_mem', :mem, false)"), {"mem": vector_index.VECTOR_INDEX_BUILD_MEMORY})
+        started = time.perf_counter()
+        conn.execute(text(vector_index.index_sql(kind, rows, table=TABLE, name=INDEX)))
+        return time.perf_counter() - started
+
+
+def run_queries(queries: np.ndarray, truth: np.ndarray, k: int, settings: dict):
+    statement = text(
+        f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    )
+    latencies, recalls = [], []
+
+    with engine.connect() as conn:
+        for query, expected in zip(queries, truth):
+            literal = vector_literal(query)
+            with conn.begin():
+                if settings:
+                    conn.execute(*vector_index.settings_statement(settings))
+                started = time.perf_counter()
+                ids = [row[0] for row in conn.execute(statement, {"q": literal, "k": k})]
+                latencies.append(time.perf_counter() - started)
+            recalls.append(len(set(ids) & set(expected.tolist())) / k)
+
+    latencies = np.asarray(latencies) * 1000
+    return float(np.mean(recalls)), float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--kind", nargs="+", default=["hnsw", "ivfflat"], choices=["hnsw", "ivfflat"])
+    parser.add_argument("--recall", nargs="+", type=float, default=[0.8, 0.9, 0.95, 0.99])
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, args.rows, args.queries)] + 0.3 * rng.standard_normal((args.queries, DIMENSIONS)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    print(f"Loading {args.rows} vectors...")
+    load_table(vectors)
+
+    try:
+        print(f"{'index':<9} {'target':>7} {'settings':<40} {f'recall@{args.k}':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        recall, p50, p95 = run_queries(queries, truth, args.k, {"enable_indexscan": "off"})
+        print(f"{'exact':<9} {'':>7} {'enable_indexscan=off':<40} {recall:>9.3f} {p50:>8.2f} {p95:>8.2f}")
+
+        for kind in args.kind:
+            seconds = build_index(kind, args.rows)
+            with engine.connect() as conn:
+                state = vector_index.read_index(conn, name=INDEX)
+            print(f"-- {kind} built in {seconds:.1f}s, {state.size_bytes / 1024 / 1024:.0f} MB")
+
+            for target in args.recall:
+                settings = vector_index.search_settings(target, args.k, state)
+                if kind == "hnsw":
+                    settings.pop("ivfflat.probes", None)
+                recall, p50, p95 = run_queries(queries, truth, args.k, settings)
+                described = ", ".join(f"{name}={value}" for name, value in settings.items())
+                print(f"{kind:<9} {target:>7.2f} {described:<40} {recall:>9.3f} {p50:>8.2f} {p95:>8.2f}")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Minimal multi-page PDF writer for benchmarks.
+
+Produces a valid PDF with one Helvetica text stream per page, without any
+third-party PDF library.
+"""
+import random
+from typing import Optional
+
+WORDS = (
+    "policy refund customer account invoice shipping warranty return product "
+    "service contract payment order support request error code section clause "
+    "agreement delivery period notice terms liability data privacy security"
+).split()
+
+
+def _page_lines(rng: random.Random, lines: int, words_per_line: int):
+    for _ in range(lines):
+        yield " ".join(rng.choice(WORDS) for _ in range(words_per_line))
+
+
+def write_synthetic_pdf(
+    path: str,
+    pages: int,
+    lines_per_page: int = 45,
+    words_per_line: int = 12,
+    seed: Optional[int] = 0,
+) -> None:
+    rng = random.Random(seed)
+    # Object numbering: 1 catalog, 2 pages, 3 font, then (page, content) pairs
+    offsets = []
+    out = bytearray(b"%PDF-1.4\n")
+
+    def add_object(number: int, body: bytes) -> None:
+        offsets.append((number, len(out)))
+        out.extend(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    page_numbers = [4 + 2 * i for i in range(pages)]
+    kids = " ".join(f"{n} 0 R" for n in page_numbers)
+
+    add_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    add_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    add_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page_number in page_numbers:
+        content = ["BT", "/F1 10 Tf", "12 TL", "40 800 Td"]
+        for line in _page_lines(rng, lines_per_page, words_per_line):
+            content.append(f"({line}) Tj T*")
+        content.append("ET")
+        stream = "\n".join(content).encode()
+
+        add_object(
+            page_number,
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>"
+            ).encode(),
+        )
+        add_object(
+            page_number + 1,
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream",
+        )
+
+    xref_offset = len(out)
+    total = 3 + 2 * pages
+    out.extend(f"xref\n0 {total + 1}\n0000000000 65535 f \n".encode())
+    for _, offset in sorted(offsets):
+        out.extend(f"{offset:010d} 00000 n \n".encode())
+    out.extend(f"trailer\n<< /Size {total + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+    with open(path, "wb") as f:
+        f.write(out)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services.answer_cache import AnswerCache
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(threshold=0.95, max_entries=3, max_bytes=1024 * 1024, ttl_seconds=60)
+
+
+def test_similar_query_same_chunks_hits(cache):
+    cache.put([1.0, 0.0, 0.0], [1], [10, 11], "answer")
+
+    assert cache.get([0.99, 0.05, 0.0], [1], [11, 10]) == "answer"
+
+
+def test_dissimilar_query_misses(cache):
+    cache.put([1.0, 0.0, 0.0], [1], [10], "answer")
+
+    assert cache.get([0.0, 1.0, 0.0], [1], [10]) is None
+
+
+def test_different_scope_or_chunks_misses(cache):
+    cache.put([1.0, 0.0], [1], [10], "answer")
+
+    assert cache.get([1.0, 0.0], [2], [10]) is None
+    assert cache.get([1.0, 0.0], None, [10]) is None
+    assert cache.get([1.0, 0.0], [1], [10, 12]) is None
+
+
+def test_lru_eviction(cache):
+    for i in range(3):
+        cache.put(np.eye(4)[i], [1], [i], f"answer {i}")
+
+    # Touch the oldest entry so the second one becomes least recently used
+    assert cache.get(np.eye(4)[0], [1], [0]) == "answer 0"
+    cache.put(np.eye(4)[3], [1], [3], "answer 3")
+
+    assert cache.get(np.eye(4)[1], [1], [1]) is None
+    assert cache.get(np.eye(4)[0], [1], [0]) == "answer 0"
+
+
+def test_byte_limit_evicts():
+    small = AnswerCache(max_entries=100, max_bytes=400, ttl_seconds=0)
+    small.put([1.0, 0.0], [1], [1], "x" * 200)
+    small.put([0.0, 1.0], [1], [2], "y" * 200)
+
+    assert small.stats()["entries"] == 1
+    assert small.get([0.0, 1.0], [1], [2]) == "y" * 200
+
+
+def test_ttl_expiry(cache):
+    with patch("app.services.answer_cache.time.monotonic", return_value=0.0):
+        cache.put([1.0, 0.0], [1], [10], "answer")
+    with patch("app.services.answer_cache.time.monotonic", return_value=61.0):
+        assert cache.get([1.0, 0.0], [1], [10]) is None
+
+
+def test_invalidation_by_document(cache):
+    cache.put([1.0, 0.0], [1, 2], [10], "scoped")
+    cache.put([1.0, 0.0], [3], [30], "other")
+    cache.put([1.0, 0.0], None, [10], "global")
+
+    assert cache.invalidate_documents([2]) == 2
+    assert cache.get([1.0, 0.0], [3], [30]) == "other"
+    assert cache.get([1.0, 0.0], [1, 2], [10]) is None
+    assert cache.get([1.0, 0.0], None, [10]) is None
+
+
+def test_best_of_many_candidates_hits():
+    large = AnswerCache(threshold=0.9, max_entries=1000, max_bytes=64 * 1024 * 1024, ttl_seconds=60)
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((500, 32))
+    for i, embedding in enumerate(embeddings):
+        large.put(embedding, [1], [10], f"answer {i}")
+    large.put(embeddings[7], [2], [10], "other scope")
+
+    query = embeddings[123] + 0.01 * rng.standard_normal(32)
+    assert large.get(query, [1], [10]) == "answer 123"
+    assert large.get(query, [1], [11]) is None
+
+    large.invalidate_documents([1])
+    assert large.get(embeddings[7], [1], [10]) is None
+    assert large.get(embeddings[7], [2], [10]) == "other scope"
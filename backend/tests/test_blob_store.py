@@ -0,0 +1,66 @@
+import os
+import re
+
+import pytest
+
+from app.models import Chunk
+from app.services.blob_store import BlobStore
+from app.services.chunking import CharChunker, TokenChunker
+from app.services.prompt_builder import stitch_chunks
+
+
+def test_put_is_atomic_and_content_addressed(tmp_path):
+    store = BlobStore(str(tmp_path))
+    key = "f" * 64
+
+    size = store.put(key, ["naïve ", "text\n", "more"])
+    again = store.put(key, iter(()))
+
+    assert size == again == len("naïve text\nmore".encode("utf-8"))
+    assert store.path(key) == os.path.join(str(tmp_path), "ff", key)
+    assert store.read_text(key) == "naïve text\nmore"
+    assert "".join(store.iter_text(key, block_chars=3)) == "naïve text\nmore"
+    # No temporary files are left behind
+    assert os.listdir(os.path.dirname(store.path(key))) == [key]
+
+
+def test_failed_put_leaves_nothing(tmp_path):
+    store = BlobStore(str(tmp_path))
+
+    def pieces():
+        yield "partial"
+        raise IOError("disk full")
+
+    try:
+        store.put("a" * 64, pieces())
+    except IOError:
+        pass
+
+    assert not store.exists("a" * 64)
+    assert os.listdir(os.path.dirname(store.path("a" * 64))) == []
+
+
+def test_reconstruct_from_chunk_offsets():
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = [
+        Chunk(chunk_index=i, content=c.content, start_char=c.start_char, end_char=c.end_char)
+        for i, c in enumerate(CharChunker().iter_chunks([text], separator=""))
+    ]
+
+    assert stitch_chunks(chunks) == text
+
+
+class WordTokenizer:
+    """Stand-in for a HuggingFace fast tokenizer: one token per word."""
+
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+
+@pytest.mark.parametrize("overlap_tokens", [0, 8])
+def test_token_chunks_stitch_back_to_the_text(overlap_tokens):
+    text = " ".join(" ".join(f"s{i}w{j}" for j in range(7)) + "." for i in range(60))
+    chunks = TokenChunker(WordTokenizer(), max_tokens=30, overlap_tokens=overlap_tokens).chunk(text)
+
+    assert len(chunks) > 1
+    assert stitch_chunks(chunks) == text
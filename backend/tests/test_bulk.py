@@ -0,0 +1,67 @@
+import io
+import struct
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from app.db.bulk import CHUNK_COLUMNS, COPY_HEADER, copy_chunks, encode_chunk_rows
+
+
+def decode(data: bytes):
+    """Parse a binary COPY stream into rows of raw field bytes."""
+    assert data.startswith(COPY_HEADER)
+    stream = io.BytesIO(data[len(COPY_HEADER):])
+    rows = []
+    while True:
+        (fields,) = struct.unpack("!h", stream.read(2))
+        if fields == -1:
+            assert stream.read() == b""
+            return rows
+        row = []
+        for _ in range(fields):
+            (length,) = struct.unpack("!i", stream.read(4))
+            row.append(None if length == -1 else stream.read(length))
+        rows.append(row)
+
+
+def decode_vector(field: bytes) -> np.ndarray:
+    dimensions, unused = struct.unpack("!hh", field[:4])
+    assert unused == 0 and len(field) == 4 + 4 * dimensions
+    return np.frombuffer(field[4:], dtype=">f4")
+
+
+def test_rows_round_trip():
+    embeddings = np.random.default_rng(0).standard_normal((3, 384)).astype(np.float32)
+    texts = ["first chunk", "zweiter Abschnitt: größer", "third"]
+
+    rows = decode(encode_chunk_rows(
+        7, texts, embeddings, [0, 1, 2],
+        [(0, 11), (8, 33), (None, None)],
+        ["a" * 64, "b" * 64, None],
+    ))
+
+    assert len(rows) == 3 and all(len(row) == len(CHUNK_COLUMNS) for row in rows)
+    document_id, content, vector, index, start, end, content_hash = rows[1]
+    assert struct.unpack("!i", document_id)[0] == 7
+    assert content.decode("utf-8") == texts[1]
+    np.testing.assert_array_equal(decode_vector(vector), embeddings[1])
+    assert struct.unpack("!i", index)[0] == 1
+    assert (struct.unpack("!i", start)[0], struct.unpack("!i", end)[0]) == (8, 33)
+    assert content_hash == b"b" * 64
+    assert rows[2][4:] == [None, None, None]
+
+
+def test_copy_is_batched_on_the_session_connection():
+    db = MagicMock()
+    cursor = db.connection.return_value.connection.cursor.return_value
+    embeddings = [[0.5] * 4 for _ in range(5)]
+
+    copy_chunks(db, 1, [f"chunk {i}" for i in range(5)], embeddings, range(5), batch_rows=2)
+
+    statements = [call.args[0] for call in cursor.copy_expert.call_args_list]
+    assert len(statements) == 3
+    assert statements[0].startswith("COPY chunks (document_id, content, embedding")
+    assert "FORMAT binary" in statements[0]
+    batches = [decode(call.args[1].getvalue()) for call in cursor.copy_expert.call_args_list]
+    assert [len(rows) for rows in batches] == [2, 2, 1]
+    cursor.close.assert_called_once()
@@ -0,0 +1,71 @@
+import re
+import pytest
+from fastapi import HTTPException
+from app.services.chunking import CharChunker, TokenChunker, get_chunker
+from app.services.document_service import chunk_text
+
+
+class WordTokenizer:
+    """Stand-in for a HuggingFace fast tokenizer: one token per word."""
+
+    def __call__(self, text, **kwargs):
+        assert kwargs["return_offsets_mapping"]
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+
+def make_text(sentences: int, words: int = 7) -> str:
+    return " ".join(
+        " ".join(f"s{i}w{j}" for j in range(words)) + "." for i in range(sentences)
+    )
+
+
+def test_char_chunker_offsets_match_chunk_text():
+    text = "abcdefghij" * 200
+    chunks = list(CharChunker().iter_chunks([text], separator=""))
+
+    assert [c.content for c in chunks] == chunk_text(text)
+    assert all(text[c.start_char:c.end_char] == c.content for c in chunks)
+
+
+def test_token_chunks_fit_budget_and_keep_sentences():
+    text = make_text(60)
+    chunker = TokenChunker(WordTokenizer(), max_tokens=30, overlap_tokens=8)
+    chunks = chunker.chunk(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk.content.split()) <= 30
+        assert chunk.content.endswith(".")
+        assert text[chunk.start_char:chunk.end_char] == chunk.content
+
+    # Every sentence is covered and neighbours share a trailing sentence
+    assert chunks[0].start_char == 0 and chunks[-1].end_char == len(text)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start_char < prev.end_char
+
+
+def test_long_sentence_is_split_at_tokens():
+    text = " ".join(f"w{i}" for i in range(100))
+    chunks = TokenChunker(WordTokenizer(), max_tokens=40, overlap_tokens=10).chunk(text)
+
+    assert all(len(c.content.split()) <= 40 for c in chunks)
+    assert chunks[-1].content.endswith("w99")
+
+
+def test_streaming_windows_match_single_pass():
+    text = make_text(400)
+    pieces = [text[i:i + 97] for i in range(0, len(text), 97)]
+    whole = TokenChunker(WordTokenizer(), 30, 8, window_chars=10 ** 9).chunk(text)
+    streamed = list(TokenChunker(WordTokenizer(), 30, 8, window_chars=500).iter_chunks(pieces, separator=""))
+
+    assert streamed == whole
+
+
+def test_empty_text_yields_nothing():
+    assert TokenChunker(WordTokenizer(), 30, 8).chunk("   ") == []
+
+
+def test_unknown_chunker_rejected():
+    with pytest.raises(HTTPException) as exc:
+        get_chunker("bogus")
+    assert exc.value.status_code == 400
@@ -0,0 +1,138 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from app.services import document_service
+from app.services.document_service import (
+    chunk_text,
+    compute_file_hash,
+    extract_text_from_bytes,
+    iter_chunks,
+    iter_text_from_path,
+    iter_text_from_stream,
+    normalize_text,
+)
+from app.utils.pdf_extract import extract_page_range, iter_pdf_pages
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+
+
+def test_chunk_text_windows_and_overlap():
+    chunks = chunk_text("a" * 1000, chunk_size=800, overlap=150)
+
+    assert [len(c) for c in chunks] == [800, 350]
+
+
+def test_chunk_text_rejects_bad_overlap():
+    with pytest.raises(ValueError):
+        chunk_text("text", chunk_size=10, overlap=10)
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(800, 150), (10, 3), (7, 0)])
+def test_iter_chunks_matches_chunk_text(chunk_size, overlap):
+    pieces = ["first page " * 40, "second", "third page " * 90]
+
+    streamed = list(iter_chunks(pieces, chunk_size=chunk_size, overlap=overlap))
+
+    assert streamed == chunk_text("\n".join(pieces), chunk_size=chunk_size, overlap=overlap)
+
+
+def test_streamed_text_matches_whole_document_normalization():
+    raw = "  line one \n\n\tline two\r\n" * 5000
+
+    pieces = list(iter_text_from_stream(io.BytesIO(raw.encode("utf-8")), "notes.txt"))
+
+    assert len(pieces) > 1
+    assert "\n".join(pieces) == normalize_text(raw)
+    assert compute_file_hash(extract_text_from_bytes(raw.encode("utf-8"), "notes.md")) == compute_file_hash(normalize_text(raw))
+
+
+def test_stream_left_open_for_caller():
+    stream = io.BytesIO(b"hello")
+
+    list(iter_text_from_stream(stream, "a.txt"))
+
+    assert not stream.closed
+
+
+PDF_PAGES = 7
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "report.pdf"
+    write_synthetic_pdf(str(path), pages=PDF_PAGES, lines_per_page=5, words_per_line=6, seed=3)
+    return str(path)
+
+
+@pytest.fixture
+def parallel_pdf(monkeypatch):
+    # Two pages per task and two workers: four tasks, more than are in flight
+    monkeypatch.setattr(document_service, "PDF_EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(document_service, "PDF_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(document_service, "PDF_PARALLEL_MIN_PAGES", 4)
+
+
+def _serial_pages(path):
+    with open(path, "rb") as f:
+        return list(iter_pdf_pages(f))
+
+
+def test_pdf_pages_are_read_in_order(pdf_path):
+    pages = _serial_pages(pdf_path)
+
+    assert [number for number, _, _ in pages] == list(range(PDF_PAGES))
+    texts = [text for _, text, _ in pages]
+    assert all(texts) and len(set(texts)) == PDF_PAGES
+    assert [text for _, text, _ in extract_page_range(pdf_path, 2, 5)] == texts[2:5]
+
+
+def test_parallel_pdf_extraction_matches_serial(pdf_path, parallel_pdf, monkeypatch):
+    executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+    monkeypatch.setattr(document_service, "get_pdf_executor", lambda: executor)
+    try:
+        parallel = list(iter_text_from_path(pdf_path, "report.pdf"))
+    finally:
+        executor.shutdown()
+
+    with open(pdf_path, "rb") as f:
+        serial = list(iter_text_from_stream(f, "report.pdf"))
+    assert parallel == serial == [text for _, text, _ in _serial_pages(pdf_path)]
+
+
+def test_short_pdf_is_extracted_without_the_pool(pdf_path, parallel_pdf, monkeypatch):
+    monkeypatch.setattr(document_service, "PDF_PARALLEL_MIN_PAGES", PDF_PAGES + 1)
+    monkeypatch.setattr(document_service, "get_pdf_executor", pytest.fail)
+
+    assert list(iter_text_from_path(pdf_path, "report.pdf")) == [text for _, text, _ in _serial_pages(pdf_path)]
+
+
+def test_failed_page_range_stops_extraction(pdf_path, parallel_pdf, monkeypatch):
+    monkeypatch.setattr(document_service, "PDF_PAGES_PER_TASK", 1)
+    submitted = []
+
+    def extract(path, start, end):
+        submitted.append(start)
+        if start == 2:
+            raise ValueError("corrupt page")
+        return extract_page_range(path, start, end)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(document_service, "get_pdf_executor", lambda: executor)
+    monkeypatch.setattr(document_service, "extract_page_range", extract)
+    expected = [text for _, text, _ in _serial_pages(pdf_path)]
+
+    texts = iter_text_from_path(pdf_path, "report.pdf")
+    try:
+        assert [next(texts), next(texts)] == expected[:2]
+        with pytest.raises(ValueError, match="corrupt page"):
+            next(texts)
+    finally:
+        executor.shutdown()
+
+    # Nothing after the failure is yielded, and the last range, which only
+    # a third completed range would have submitted, is never queued
+    assert list(texts) == []
+    assert submitted[:3] == [0, 1, 2]
+    assert PDF_PAGES - 1 not in submitted
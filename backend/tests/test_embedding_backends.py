@@ -0,0 +1,80 @@
+import sys
+
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.services.SentenceTransformerService import (
+    SentenceTransformerService,
+    load_embedding_model,
+)
+
+# Sentences for the parity check: short queries and passage-like text
+PARITY_TEXTS = [
+    "How do I reset my password?",
+    "What is the refund policy for annual plans?",
+    "The invoice is sent on the first business day of each month.",
+    "Error E-4021 means the upload exceeded the size limit.",
+    "Embeddings map text to vectors so similar meanings are close together.",
+    "Der Vertrag kann mit einer Frist von drei Monaten gekündigt werden.",
+    "Q3 revenue grew 12% year over year, driven by enterprise renewals.",
+    "ok",
+]
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        load_embedding_model("tensorrt", "model")
+
+
+def test_torch_backend_applies_thread_count(monkeypatch):
+    torch = pytest.importorskip("torch")
+    set_threads = MagicMock()
+    model_cls = MagicMock()
+    monkeypatch.setattr(torch, "set_num_threads", set_threads)
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(SentenceTransformer=model_cls))
+
+    model = load_embedding_model("torch", "model", threads=2)
+
+    set_threads.assert_called_once_with(2)
+    assert model is model_cls.return_value
+
+
+def test_quantized_vectors_are_cached_separately(monkeypatch):
+    service = object.__new__(SentenceTransformerService)
+    assert service.model_id == "all-MiniLM-L6-v2"
+
+    monkeypatch.setattr(SentenceTransformerService, "BACKEND", "onnx")
+    monkeypatch.setattr(SentenceTransformerService, "QUANTIZATION", "avx512_vnni")
+    assert service.model_id == "all-MiniLM-L6-v2@onnx-avx512_vnni"
+
+
+@pytest.fixture(scope="module")
+def backends():
+    """
+    The torch and int8 ONNX models. Skipped without ONNX Runtime or when
+    the model cannot be downloaded.
+    """
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("optimum.onnxruntime")
+    name = SentenceTransformerService.MODEL_NAME
+    try:
+        return load_embedding_model("torch", name), load_embedding_model("onnx", name, quantization="avx2")
+    except OSError as e:
+        pytest.skip(f"Model unavailable: {e}")
+
+
+def test_int8_onnx_matches_torch(backends):
+    torch_model, onnx_model = backends
+    expected = torch_model.encode(PARITY_TEXTS, normalize_embeddings=True)
+    actual = onnx_model.encode(PARITY_TEXTS, normalize_embeddings=True)
+
+    agreement = np.sum(expected * actual, axis=1)
+    assert agreement.min() > 0.98
+
+    # Nearest neighbours within the set are unchanged
+    expected_scores = expected @ expected.T
+    actual_scores = actual @ actual.T
+    np.fill_diagonal(expected_scores, -1)
+    np.fill_diagonal(actual_scores, -1)
+    assert (expected_scores.argmax(axis=1) == actual_scores.argmax(axis=1)).all()
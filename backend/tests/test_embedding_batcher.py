@@ -0,0 +1,52 @@
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+@pytest.fixture
+def mock_service():
+    service = MagicMock()
+    service.encode.side_effect = lambda texts, normalize: np.array([[float(len(t))] for t in texts], dtype=np.float32)
+    return service
+
+
+def test_concurrent_requests_share_one_batch(mock_service):
+    batcher = EmbeddingBatcher(service=mock_service, window_ms=50, max_batch_size=8)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed("x" * n) for n in range(1, 5)))
+
+    results = asyncio.run(run())
+
+    assert [r.tolist() for r in results] == [[1.0], [2.0], [3.0], [4.0]]
+    assert mock_service.encode.call_count == 1
+
+
+def test_batch_is_capped_at_max_size(mock_service):
+    batcher = EmbeddingBatcher(service=mock_service, window_ms=50, max_batch_size=2)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed("text") for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert len(results) == 5
+    batch_sizes = [len(call.args[0]) for call in mock_service.encode.call_args_list]
+    assert max(batch_sizes) == 2
+
+
+def test_encode_failure_propagates_to_callers(mock_service):
+    mock_service.encode.side_effect = RuntimeError("encode failed")
+    batcher = EmbeddingBatcher(service=mock_service, window_ms=1)
+
+    with pytest.raises(RuntimeError, match="encode failed"):
+        asyncio.run(batcher.embed("text"))
+
+
+def test_empty_text_rejected(mock_service):
+    batcher = EmbeddingBatcher(service=mock_service)
+
+    with pytest.raises(ValueError, match="Cannot embed empty text"):
+        asyncio.run(batcher.embed("  "))
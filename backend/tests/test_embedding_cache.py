@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app.services.embedding_cache import EmbeddingCache, SqliteEmbeddingStore, normalize_cache_key
+from app.services.SentenceTransformerService import SentenceTransformerService
+
+
+@pytest.fixture
+def fresh_service():
+    with patch("app.services.SentenceTransformerService.load_embedding_model") as mock:
+        SentenceTransformerService._instance = None
+        SentenceTransformerService._model = None
+        SentenceTransformerService._cache = None
+        yield SentenceTransformerService(), mock.return_value
+    SentenceTransformerService._instance = None
+    SentenceTransformerService._model = None
+    SentenceTransformerService._cache = None
+
+
+def test_normalize_collapses_whitespace():
+    assert normalize_cache_key("  what   is\nRAG? ") == "what is RAG?"
+
+
+def test_vectors_stored_as_float32():
+    cache = EmbeddingCache("model", max_entries=10, max_bytes=1024)
+    cache.put_many({"hello": [0.1, 0.2]})
+
+    vector = cache.get_many(["hello"])["hello"]
+    assert vector.dtype == np.float32
+
+
+def test_entry_and_byte_limits():
+    cache = EmbeddingCache("model", max_entries=2, max_bytes=1024)
+    for i in range(3):
+        cache.put_many({f"t{i}": np.zeros(4, dtype=np.float32)})
+    assert cache.stats()["entries"] == 2
+    assert "t0" not in cache.get_many(["t0"])
+
+    tight = EmbeddingCache("model", max_entries=100, max_bytes=40)
+    tight.put_many({"a": np.zeros(8, dtype=np.float32), "b": np.zeros(8, dtype=np.float32)})
+    assert tight.stats()["bytes"] <= 40
+
+
+def test_hit_rate():
+    cache = EmbeddingCache("model", max_entries=10, max_bytes=1024)
+    cache.put_many({"a": [1.0]})
+    cache.get_many(["a", "b"])
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_shared_store_between_caches(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    writer = EmbeddingCache("model", 10, 1024, store=SqliteEmbeddingStore(path))
+    reader = EmbeddingCache("model", 10, 1024, store=SqliteEmbeddingStore(path))
+    other_model = EmbeddingCache("other", 10, 1024, store=SqliteEmbeddingStore(path))
+
+    writer.put_many({"shared text": [1.0, 2.0]})
+
+    assert reader.get_many(["shared  text"])["shared text"].tolist() == [1.0, 2.0]
+    assert other_model.get_many(["shared text"]) == {}
+
+
+def test_get_embedding_uses_cache(fresh_service):
+    service, model = fresh_service
+    model.encode.return_value = np.array([0.5, 0.25], dtype=np.float32)
+
+    assert service.get_embedding("query") == [0.5, 0.25]
+    assert service.get_embedding(" query ") == [0.5, 0.25]
+    assert model.encode.call_count == 1
+
+
+def test_get_embeddings_encodes_only_misses(fresh_service):
+    service, model = fresh_service
+    model.encode.return_value = np.array([0.5], dtype=np.float32)
+    service.get_embedding("cached")
+
+    model.encode.return_value = np.array([[1.0], [2.0]], dtype=np.float32)
+    result = service.get_embeddings(["new one", "cached", "new two", "new one"])
+
+    assert result == [[1.0], [0.5], [2.0], [1.0]]
+    assert model.encode.call_args.args[0] == ["new one", "new two"]
+
+
+def test_encode_returns_float32_rows(fresh_service):
+    service, model = fresh_service
+    model.encode.return_value = np.array([[3.0, 4.0], [0.0, 2.0]], dtype=np.float64)
+
+    result = service.encode(["a", "", "b"], normalize=True)
+
+    assert result.dtype == np.float32 and result.shape == (2, 2)
+    np.testing.assert_allclose(result, [[0.6, 0.8], [0.0, 1.0]])
+    # The cache keeps the raw vectors
+    np.testing.assert_array_equal(service.encode(["a"]), [[3.0, 4.0]])
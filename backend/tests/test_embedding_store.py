@@ -0,0 +1,51 @@
+from unittest.mock import MagicMock
+import numpy as np
+import pytest
+from app.services import embedding_store
+from app.services.embedding_store import embed_with_store, embedding_key
+
+
+@pytest.fixture
+def store(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(
+        embedding_store, "lookup_embeddings",
+        lambda db, keys: {key: stored[key] for key in keys if key in stored},
+    )
+    monkeypatch.setattr(
+        embedding_store, "save_embeddings",
+        lambda db, model, vectors: stored.update(vectors),
+    )
+    return stored
+
+
+@pytest.fixture
+def service():
+    service = MagicMock()
+    service.model_id = "model"
+    service.encode.side_effect = lambda texts, use_cache: np.array([[float(len(t))] for t in texts], dtype=np.float32)
+    return service
+
+
+def test_key_normalizes_whitespace_and_includes_model():
+    assert embedding_key("Terms  and\nconditions", "m") == embedding_key("Terms and conditions", "m")
+    assert embedding_key("Terms and conditions", "m") != embedding_key("Terms and conditions", "other")
+
+
+def test_only_misses_are_encoded(store, service):
+    store[embedding_key("disclaimer", "model")] = [42.0]
+
+    vectors, reused = embed_with_store(MagicMock(), ["disclaimer", "body", "body", "appendix"], service)
+
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[42.0], [4.0], [4.0], [8.0]]
+    assert reused == 2
+    assert service.encode.call_args.args[0] == ["body", "appendix"]
+
+
+def test_new_vectors_are_stored(store, service):
+    embed_with_store(MagicMock(), ["header"], service)
+    _, reused = embed_with_store(MagicMock(), ["header"], service)
+
+    assert reused == 1
+    assert service.encode.call_count == 1
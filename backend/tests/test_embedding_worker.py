@@ -0,0 +1,120 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.embedding_worker import EmbeddingWorker, LightTokenizer, RemoteEmbeddingService
+
+
+class FakeService:
+    """Embeds a text as [len(text), normalize, 1] and records each encode call."""
+
+    model_id = "model"
+    dimensions = 3
+    max_seq_length = 256
+    tokenizer = SimpleNamespace(name_or_path="tokenizer")
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, use_cache=True, normalize=False):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        if "boom" in texts:
+            raise ValueError("cannot embed boom")
+        return np.array([[len(t), float(normalize), 1.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def worker():
+    service = FakeService(delay=0.02)
+    # Unix socket paths are limited to ~100 characters
+    path = os.path.join(tempfile.mkdtemp(), "embed.sock")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    serving = asyncio.run_coroutine_threadsafe(EmbeddingWorker(service).serve(path), loop)
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    yield service, path
+
+    async def shutdown():
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    serving.cancel()
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def test_encode_round_trip(worker):
+    _, path = worker
+    client = RemoteEmbeddingService(path)
+
+    vectors = client.encode(["a", "bbb"], use_cache=False)
+
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[1.0, 0.0, 1.0], [3.0, 0.0, 1.0]]
+    assert client.dimensions == 3 and client.model_id == "model"
+
+
+def test_queries_from_many_workers_share_a_batch(worker):
+    service, path = worker
+    texts = [f"query {'x' * i}" for i in range(8)]
+    results = {}
+
+    def query(text):
+        # Each thread stands in for an API worker with its own connection
+        results[text] = RemoteEmbeddingService(path).encode([text], normalize=True)[0]
+
+    threads = [threading.Thread(target=query, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {text: vector[0] for text, vector in results.items()} == {text: len(text) for text in texts}
+    assert len(service.calls) < len(texts)
+
+
+def test_worker_errors_are_raised_and_connection_survives(worker):
+    _, path = worker
+    client = RemoteEmbeddingService(path)
+
+    with pytest.raises(RuntimeError, match="cannot embed boom"):
+        client.encode(["boom"], use_cache=False)
+    assert client.encode(["ok"], use_cache=False).shape == (1, 3)
+
+
+def test_missing_worker_times_out():
+    client = RemoteEmbeddingService(os.path.join(tempfile.mkdtemp(), "missing.sock"), connect_timeout=0)
+
+    with pytest.raises(RuntimeError, match="not reachable"):
+        client.encode(["a"])
+
+
+def test_light_tokenizer_matches_call_interface():
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    vocab = {"[UNK]": 0, "refunds": 1, "take": 2, "30": 3, "days": 4}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    backend.enable_truncation(2)
+    tokenizer = LightTokenizer(backend, "words")
+
+    text = "refunds take 30 days"
+    encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+
+    # Truncation configured in tokenizer.json is ignored
+    assert encoded["input_ids"] == [1, 2, 3, 4]
+    assert [text[start:end] for start, end in encoded["offset_mapping"]] == text.split()
+    assert tokenizer([text, "days"])["input_ids"] == [[1, 2, 3, 4], [4]]
@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+import pytest
+from google.api_core import exceptions
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.services import gemini_service
+from app.services.gemini_service import AsyncRateLimiter, generate_response_stream
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(gemini_service, "_rate_limiter", AsyncRateLimiter(0))
+
+
+def fake_stream(texts, pulled, on_open=None):
+    def chunks():
+        for text in texts:
+            pulled.append(text)
+            yield SimpleNamespace(text=text)
+
+    response = MagicMock()
+    if on_open is not None:
+        on_open(response)
+    iterator = chunks()
+    first = next(iterator)
+    return response, iterator, first
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = AsyncRateLimiter(0.05)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.1
+
+
+def test_rate_limiter_waits_without_blocking_the_loop():
+    limiter = AsyncRateLimiter(0.2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def acquire():
+        await limiter.acquire()
+        return time.monotonic()
+
+    async def run():
+        started = time.monotonic()
+        first = await acquire()
+        second, _ = await asyncio.gather(acquire(), ticker())
+        return started, first, second
+
+    started, first, second = asyncio.run(run())
+    # The first caller is not delayed; the second waits for its slot while
+    # other tasks keep running
+    assert first - started < 0.05
+    assert second - started >= 0.2
+    assert len(ticks) == 5 and ticks[-1] < second
+
+
+def test_stream_yields_all_tokens(monkeypatch):
+    pulled = []
+    monkeypatch.setattr(gemini_service, "_open_stream", lambda prompt, cancelled, on_open: fake_stream(["a", "b", "c"], pulled))
+
+    async def run():
+        return [text async for text in generate_response_stream("prompt")]
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+
+
+def test_stream_stops_reading_when_consumer_leaves(monkeypatch):
+    pulled = []
+    texts = [str(i) for i in range(100)]
+    monkeypatch.setattr(gemini_service, "_open_stream", lambda prompt, cancelled, on_open: fake_stream(texts, pulled))
+
+    async def run():
+        stream = generate_response_stream("prompt", max_buffered=2)
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.3)
+        return first
+
+    assert asyncio.run(run()) == "0"
+    # Backpressure plus cancellation keep the pump from draining the upstream
+    assert len(pulled) < len(texts)
+
+
+def test_stream_raises_generation_errors(monkeypatch):
+    def failing(prompt, cancelled, on_open):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(gemini_service, "_open_stream", failing)
+
+    async def run():
+        return [text async for text in generate_response_stream("prompt")]
+
+    with pytest.raises(RuntimeError, match="Generation failed"):
+        asyncio.run(run())
+
+
+def test_consumer_leaving_cancels_upstream_immediately(monkeypatch):
+    release = threading.Event()
+    opened = []
+
+    def slow_stream(prompt, cancelled, on_open):
+        def chunks():
+            yield SimpleNamespace(text="a")
+            # Upstream is slow to produce the next chunk
+            release.wait(5)
+            yield SimpleNamespace(text="b")
+
+        response = MagicMock()
+        on_open(response)
+        opened.append(response)
+        iterator = chunks()
+        return response, iterator, next(iterator)
+
+    monkeypatch.setattr(gemini_service, "_open_stream", slow_stream)
+
+    async def run():
+        stream = generate_response_stream("prompt")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    try:
+        assert asyncio.run(run()) == "a"
+        # Cancelled by the consumer, without waiting for the pump's next chunk
+        opened[0]._iterator.cancel.assert_called()
+    finally:
+        release.set()
+
+
+def test_open_stream_stops_retrying_once_cancelled(monkeypatch):
+    model = MagicMock()
+    model.generate_content.side_effect = exceptions.ServiceUnavailable("busy")
+    monkeypatch.setattr(gemini_service, "get_chat_model", lambda: model)
+    cancelled = threading.Event()
+    threading.Timer(0.1, cancelled.set).start()
+
+    started = time.monotonic()
+    assert gemini_service._open_stream("prompt", cancelled) is None
+
+    # The 4s backoff is cut short and no further attempt is made
+    assert time.monotonic() - started < 2
+    assert model.generate_content.call_count == 1
+
+
+class FakeGrpcCall:
+    """A server-streaming gRPC call: iterates responses and can be cancelled."""
+
+    def __init__(self, responses):
+        self._responses = iter(responses)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._responses)
+
+    def cancel(self):
+        self.cancelled = True
+        return True
+
+
+def test_pinned_sdk_stream_can_be_cancelled():
+    # Fails if an SDK upgrade stops exposing the gRPC call as _iterator
+    import google.generativeai as genai
+    from google.api_core import grpc_helpers
+    from google.generativeai import protos
+
+    call = FakeGrpcCall([protos.GenerateContentResponse(), protos.GenerateContentResponse()])
+    client = MagicMock()
+    client.stream_generate_content.return_value = grpc_helpers._StreamingResponseIterator(call)
+    model = genai.GenerativeModel("gemini-flash-latest")
+    model._client = client
+    warnings = gemini_service.metrics.counter("gemini_stream_cancel_unsupported").value
+
+    gemini_service._cancel_upstream(model.generate_content("prompt", stream=True))
+
+    assert call.cancelled
+    assert gemini_service.metrics.counter("gemini_stream_cancel_unsupported").value == warnings
+
+
+def test_uncancellable_stream_is_reported_once(monkeypatch, caplog):
+    monkeypatch.setattr(gemini_service, "_cancel_unsupported_logged", False)
+
+    with caplog.at_level("WARNING", logger=gemini_service.logger.name):
+        gemini_service._cancel_upstream(SimpleNamespace())
+        gemini_service._cancel_upstream(SimpleNamespace())
+
+    assert len([r for r in caplog.records if "Cannot cancel Gemini streams" in r.message]) == 1
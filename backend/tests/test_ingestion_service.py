@@ -0,0 +1,151 @@
+import io
+from collections import defaultdict
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models import IngestionJob
+from app.services import ingestion_service
+from app.services.chunking import TokenChunker
+from app.services.document_service import compute_file_hash
+from tests.test_chunking import WordTokenizer, make_text
+
+
+@pytest.fixture
+def reindex(monkeypatch):
+    chunker = TokenChunker(WordTokenizer(), max_tokens=30, overlap_tokens=8)
+    embedder = MagicMock()
+    embedder.encode.side_effect = lambda texts, use_cache: np.zeros((len(texts), 1), dtype=np.float32)
+    monkeypatch.setattr(ingestion_service, "get_chunker", lambda name: chunker)
+    monkeypatch.setattr(ingestion_service, "get_embedding_service", lambda: embedder)
+    monkeypatch.setattr(ingestion_service, "_report_progress", lambda job_id, progress: None)
+    monkeypatch.setattr(ingestion_service, "check_duplicate_document", lambda *args, **kwargs: None)
+
+    def run(old_text, new_text, previous_ref=None):
+        by_hash = defaultdict(list)
+        for i, chunk in enumerate(chunker.chunk(old_text)):
+            by_hash[compute_file_hash(chunk.content)].append(i)
+        monkeypatch.setattr(ingestion_service, "_existing_chunks_by_hash", lambda db, doc_id: by_hash)
+
+        db = MagicMock()
+        doc = db.get.return_value
+        doc.content_ref = previous_ref
+        job = MagicMock(id=1, document_id=3, chunker="token", filename="policy.txt")
+        ingestion_service._reindex_document(db, job, io.StringIO(new_text), "hash", len(new_text))
+        return db, doc, embedder
+
+    return run
+
+
+def test_reindex_embeds_only_changed_chunks(reindex):
+    old_text = make_text(300)
+    new_text = old_text.replace("s150w3", "changed")
+
+    db, doc, embedder = reindex(old_text, new_text)
+
+    total = len(TokenChunker(WordTokenizer(), 30, 8).chunk(new_text))
+    embedded = sum(len(call.args[0]) for call in embedder.encode.call_args_list)
+    assert 0 < embedded <= 3 < total
+    assert doc.content == new_text
+    assert doc.file_hash == "hash"
+    db.commit.assert_called_once()
+
+
+def test_reindex_deletes_removed_chunks(reindex):
+    old_text = make_text(300)
+    new_text = make_text(150)
+
+    db, _, embedder = reindex(old_text, new_text)
+
+    # Only the new final chunk can differ from the old text's chunks
+    assert embedder.encode.call_count <= 1
+    db.query.return_value.filter.return_value.delete.assert_called_once()
+
+
+def test_reindex_missing_document(reindex, monkeypatch):
+    db = MagicMock()
+    db.get.return_value = None
+    job = MagicMock(document_id=3)
+
+    with pytest.raises(Exception) as exc:
+        ingestion_service._reindex_document(db, job, io.StringIO("x"), "hash", 1)
+    assert exc.value.status_code == 404
+
+
+def test_reindex_offloads_text_and_drops_old_blob(reindex, monkeypatch, tmp_path):
+    from app.services.blob_store import BlobStore
+    store = BlobStore(str(tmp_path))
+    old_text = make_text(100)
+    new_text = old_text.replace("s50w3", "changed")
+    store.put("old" * 21 + "x", [old_text])
+    monkeypatch.setattr(ingestion_service, "get_blob_store", lambda: store)
+    monkeypatch.setattr(ingestion_service, "offload_enabled", lambda: True)
+
+    _, doc, _ = reindex(old_text, new_text, previous_ref="old" * 21 + "x")
+
+    assert doc.content is None
+    assert doc.content_ref == "hash"
+    assert store.read_text("hash") == new_text
+    assert doc.content_size == len(new_text.encode("utf-8"))
+    assert not store.exists("old" * 21 + "x")
+
+
+@pytest.fixture
+def job_db():
+    engine = create_engine("sqlite://")
+    IngestionJob.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    yield Session
+    engine.dispose()
+
+
+def add_job(db, status, minutes_ago, attempts=1):
+    updated = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    job = IngestionJob(
+        filename="a.txt", file_path="/tmp/a.txt", tenant="t", status=status,
+        attempts=attempts, created_at=updated, updated_at=updated,
+    )
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_resume_requeues_jobs_orphaned_while_running(job_db, monkeypatch):
+    db = job_db()
+    queued = add_job(db, "queued", minutes_ago=60)
+    orphaned = add_job(db, "running", minutes_ago=60)
+    exhausted = add_job(db, "running", minutes_ago=60, attempts=ingestion_service.INGESTION_MAX_ATTEMPTS)
+    live = add_job(db, "running", minutes_ago=1)
+    done = add_job(db, "succeeded", minutes_ago=60)
+    db.close()
+
+    queue = MagicMock()
+    monkeypatch.setattr(ingestion_service, "SessionLocal", job_db)
+    monkeypatch.setattr(ingestion_service, "get_ingestion_queue", lambda: queue)
+    monkeypatch.setattr(ingestion_service, "INGESTION_STALE_JOB_SECONDS", 15 * 60)
+
+    ingestion_service.resume_queued_jobs()
+
+    (resumed,), _ = queue.resume.call_args
+    assert sorted(resumed) == sorted([queued, orphaned])
+    db = job_db()
+    status = {job.id: job.status for job in db.query(IngestionJob)}
+    assert status == {queued: "queued", orphaned: "queued", exhausted: "failed", live: "running", done: "succeeded"}
+    assert db.get(IngestionJob, exhausted).error
+    db.close()
+
+
+def test_long_extraction_sends_heartbeats(monkeypatch):
+    beats = []
+    clock = iter(range(0, 1000, 40))
+    monkeypatch.setattr(ingestion_service.time, "monotonic", lambda: next(clock))
+    monkeypatch.setattr(ingestion_service, "iter_text_from_path", lambda path, name: iter(["page"] * 4))
+    monkeypatch.setattr(ingestion_service, "_report_progress", lambda job_id, progress: beats.append(job_id))
+
+    job = MagicMock(id=7, file_path="a.pdf", filename="a.pdf")
+    _, length = ingestion_service._extract_to_spool(job, io.StringIO())
+
+    assert length == len("\n".join(["page"] * 4))
+    assert beats and set(beats) == {7}
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from app.services import local_index
+from app.services.local_index import LocalVectorIndex
+
+DIM = 8
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, DIM)).astype(np.float32)
+    ids = np.arange(1000, 1500)
+    docs = np.arange(500) % 10
+    return ids, docs, vectors
+
+
+@pytest.fixture
+def index(tmp_path, data):
+    index = LocalVectorIndex(str(tmp_path), dimensions=DIM)
+    ids, docs, vectors = data
+    index.append(ids[:300], docs[:300], vectors[:300])
+    index.append(ids[300:], docs[300:], vectors[300:])
+    return index
+
+
+def brute_force(data, query, k, mask=None):
+    ids, _, vectors = data
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    if mask is not None:
+        scores[~mask] = -np.inf
+    return ids[np.argsort(-scores)[:k]].tolist()
+
+
+def test_matches_exact_search_across_blocks(index, data, monkeypatch):
+    monkeypatch.setattr(local_index, "BLOCK_ROWS", 64)
+    queries = np.random.default_rng(1).standard_normal((4, DIM))
+
+    ids, scores = index.search_many(queries, 10)
+
+    for query, row in zip(queries, ids):
+        assert row.tolist() == brute_force(data, query, 10)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_scoped_search(index, data):
+    query = np.ones(DIM)
+    _, docs, _ = data
+
+    result = index.search(query, 5, document_ids=[3, 7])
+
+    assert result == brute_force(data, query, 5, mask=np.isin(docs, [3, 7]))
+
+
+def test_tombstones_are_skipped(index, data):
+    query = np.ones(DIM)
+    top = index.search(query, 3)
+
+    index.remove_chunks([top[0]])
+    assert top[0] not in index.search(query, 3)
+
+    index.remove_documents(range(10))
+    assert index.search(query, 3) == []
+    assert index.stats()["live"] == 0
+
+
+def test_other_processes_see_appends_and_rebuilds(index, tmp_path, data):
+    reader = LocalVectorIndex(str(tmp_path), dimensions=DIM)
+    ids, docs, vectors = data
+    assert reader.fingerprint() == (500, 1499, int(ids.sum()))
+
+    index.append([9999], [42], [np.ones(DIM)])
+    assert reader.search(np.ones(DIM), 1, document_ids=[42]) == [9999]
+
+    index.rebuild([(ids[:10], docs[:10], vectors[:10])])
+    assert reader.stats() == {"generation": 1, "rows": 10, "live": 10}
+    assert reader.document_chunk_ids(0).tolist() == [1000]
+
+
+class FakeChunkQuery:
+    """The two chunk queries sync_local_index runs, over fixed rows."""
+
+    def __init__(self, rows, delay):
+        self.rows, self.delay = rows, delay
+
+    def filter(self, *criteria):
+        return self
+
+    def __iter__(self):
+        return iter([(chunk_id,) for chunk_id, _ in self.rows])
+
+    def all(self):
+        # Slow enough for a concurrent sync to diff against the index meanwhile
+        time.sleep(self.delay)
+        return list(self.rows)
+
+
+class FakeSession:
+    def __init__(self, rows, delay=0.05):
+        self.rows, self.delay = rows, delay
+
+    def query(self, *columns):
+        return FakeChunkQuery(self.rows, self.delay)
+
+
+def test_concurrent_syncs_of_a_document_append_once(tmp_path, monkeypatch):
+    index = LocalVectorIndex(str(tmp_path), dimensions=DIM)
+    monkeypatch.setattr(local_index, "get_local_index", lambda: index)
+    rows = [(chunk_id, np.ones(DIM)) for chunk_id in (1, 2, 3)]
+
+    syncs = [
+        threading.Thread(target=local_index.sync_local_index, args=(FakeSession(rows), [5]))
+        for _ in range(2)
+    ]
+    for sync in syncs:
+        sync.start()
+    for sync in syncs:
+        sync.join()
+
+    assert sorted(index.document_chunk_ids(5).tolist()) == [1, 2, 3]
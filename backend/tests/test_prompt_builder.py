@@ -0,0 +1,107 @@
+import re
+
+from app.models import Chunk
+from app.services.chunking import CharChunker
+from app.services.document_service import compute_file_hash
+from app.services.prompt_builder import (
+    assemble_prompt,
+    count_tokens,
+    merge_chunks,
+    render_prompt,
+)
+from app.services.rag_service import build_prompt
+
+
+class WordTokenizer:
+    """Stand-in for a HuggingFace fast tokenizer: one token per word."""
+
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+
+def make_chunks(text, document_id=1, offsets=True, first_id=1):
+    chunker = CharChunker(chunk_size=200, overlap=50)
+    return [
+        Chunk(
+            id=first_id + i,
+            document_id=document_id,
+            chunk_index=i,
+            content=c.content,
+            start_char=c.start_char if offsets else None,
+            end_char=c.end_char if offsets else None,
+            content_hash=compute_file_hash(c.content),
+        )
+        for i, c in enumerate(chunker.iter_chunks([text], separator=""))
+    ]
+
+
+def document(words, prefix="w"):
+    return " ".join(f"{prefix}{i}" for i in range(words))
+
+
+def test_adjacent_chunks_merge_without_overlap():
+    text = document(100)
+    chunks = make_chunks(text)
+
+    sources = merge_chunks([chunks[2], chunks[0], chunks[1]])
+
+    assert len(sources) == 1
+    assert sources[0].content == text[:chunks[2].end_char].strip()
+    assert [c.chunk_index for c in sources[0].chunks] == [0, 1, 2]
+    assert sources[0].rank == 0
+
+
+def test_overlap_is_found_without_offsets():
+    text = document(100)
+    chunks = make_chunks(text, offsets=False)
+    end = make_chunks(text)[2].end_char
+
+    sources = merge_chunks(chunks[:3])
+
+    assert sources[0].content == text[:end].strip()
+
+
+def test_sources_are_ordered_by_best_rank_and_duplicates_dropped():
+    a = make_chunks(document(300, "a"), document_id=1)
+    b = make_chunks(document(300, "b"), document_id=2, first_id=100)
+    copy = Chunk(id=500, document_id=3, chunk_index=0, content=b[4].content, content_hash=b[4].content_hash)
+
+    sources = merge_chunks([b[4], a[0], copy, a[5], a[1]])
+
+    assert [(s.document_id, [c.chunk_index for c in s.chunks]) for s in sources] == [
+        (2, [4]),
+        (1, [0, 1]),
+        (1, [5]),
+    ]
+
+
+def test_budget_truncates_then_drops_lowest_ranked():
+    tokenizer = WordTokenizer()
+    query = "what is w1"
+    chunks = make_chunks(document(300))
+    picked = [chunks[0], chunks[4], chunks[8]]
+    base = count_tokens(tokenizer, render_prompt(query, []))
+    first = count_tokens(tokenizer, "[Source 1]") + count_tokens(tokenizer, chunks[0].content)
+
+    prompt = assemble_prompt(query, picked, tokenizer, max_tokens=base + first + 40)
+
+    assert [s.chunks[0].chunk_index for s in prompt.sources] == [0, 4]
+    assert prompt.sources[1].truncated
+    assert prompt.usage.prompt_tokens <= base + first + 40
+    assert prompt.usage.sources == 2 and prompt.usage.sources_dropped == 1
+    assert prompt.usage.prompt_tokens == count_tokens(tokenizer, prompt.text)
+
+
+def test_unlimited_budget_only_removes_redundancy():
+    tokenizer = WordTokenizer()
+    text = document(100)
+    chunks = make_chunks(text)
+
+    prompt = assemble_prompt("q", chunks, tokenizer, max_tokens=0)
+    naive = build_prompt("q", chunks)
+
+    assert prompt.usage.sources == 1 and prompt.usage.sources_dropped == 0
+    assert prompt.usage.context_tokens < prompt.usage.retrieved_tokens
+    assert prompt.usage.prompt_tokens < count_tokens(tokenizer, naive)
+    # All retrieved text is still in the prompt
+    assert text[:chunks[-1].end_char].strip() in prompt.text
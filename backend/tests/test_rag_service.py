@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy.dialects.postgresql.asyncpg import dialect as asyncpg_dialect
+from app.services import rag_service, vector_index
+from app.services.vector_index import IndexState
+
+HNSW = IndexState("hnsw", True, True, None, 16, 64, None, 0)
+
+
+class FakeSession:
+    """Answers the scope count, records set_config calls, returns canned rows."""
+
+    def __init__(self, scoped, total, batches):
+        self.scoped, self.total = scoped, total
+        self.batches = list(batches)
+        self.settings = []
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        result = MagicMock()
+        self.statements.append(stmt)
+        sql = str(stmt)
+        if "set_config" in sql:
+            self.settings.append({params[f"name{i}"]: params[f"value{i}"] for i in range(len(params) // 2)})
+        elif "count" in sql:
+            result.one.return_value = (self.scoped, self.total)
+        else:
+            result.scalars.return_value.all.return_value = self.batches.pop(0)
+        return result
+
+
+def search(db, document_ids, limit=5):
+    return asyncio.run(rag_service.search_similar_chunks(
+        db, "query", document_ids=document_ids, limit=limit, query_embedding=[0.0] * 384,
+    ))
+
+
+@pytest.fixture
+def hnsw_index(monkeypatch):
+    monkeypatch.setattr(vector_index, "_state", HNSW)
+
+
+def test_small_scope_scans_exactly(hnsw_index):
+    db = FakeSession(scoped=300, total=1_000_000, batches=[[1, 2, 3]])
+
+    assert search(db, [1]) == [1, 2, 3]
+    assert db.settings == [{"enable_indexscan": "off"}]
+
+
+def test_large_scope_searches_deeper_until_limit(hnsw_index):
+    db = FakeSession(scoped=50_000, total=1_000_000, batches=[[1, 2], list(range(5))])
+
+    assert len(search(db, [1, 2])) == 5
+    ef = [int(s["hnsw.ef_search"]) for s in db.settings]
+    # Effort is scaled by total/scoped (20x) and doubled on the retry
+    assert ef == [800, 1000]
+
+
+def test_large_scope_falls_back_to_exact(hnsw_index, monkeypatch):
+    monkeypatch.setattr(rag_service, "FILTERED_SEARCH_MAX_ATTEMPTS", 2)
+    db = FakeSession(scoped=500_000, total=1_000_000, batches=[[1], [1], [1, 2, 3, 4, 5]])
+
+    assert len(search(db, [1])) == 5
+    assert db.settings[-1] == {"enable_indexscan": "off"}
+
+
+def test_unscoped_search_uses_index(hnsw_index):
+    db = FakeSession(scoped=0, total=0, batches=[[7]])
+
+    assert search(db, None) == [7]
+    assert db.settings == [{"hnsw.ef_search": "40"}]
+
+
+def test_no_index_scans_exactly(monkeypatch):
+    monkeypatch.setattr(vector_index, "_state", None)
+    db = FakeSession(scoped=500_000, total=1_000_000, batches=[[1]])
+
+    search(db, [1])
+    assert db.settings == [{"enable_indexscan": "off"}]
+
+
+def test_search_binds_the_query_vector_with_a_cast(hnsw_index):
+    db = FakeSession(scoped=0, total=0, batches=[[7]])
+    search(db, None)
+
+    compiled = db.statements[-1].compile(dialect=asyncpg_dialect())
+    assert "ORDER BY chunks.embedding <=> CAST($1 AS VECTOR(384))" in str(compiled)
+    vector_type = compiled.binds[compiled.positiontup[0]].type
+    # Sent to asyncpg as pgvector's text format
+    assert vector_type.bind_processor(compiled.dialect)([0.5, 1.0]) == "[0.5,1.0]"
+
+
+def chunk(chunk_id):
+    return MagicMock(id=chunk_id)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c, d = chunk(1), chunk(2), chunk(3), chunk(4)
+
+    fused = rag_service.reciprocal_rank_fusion([[a, b, c], [c, d]])
+
+    # c is in both lists; b and d tie and the first list wins
+    assert [x.id for x in fused] == [3, 1, 2, 4]
+
+
+@pytest.fixture
+def legs(monkeypatch):
+    vector = [chunk(1), chunk(2), chunk(3)]
+
+    async def fake_vector(db, query, document_ids=None, limit=5, query_embedding=None):
+        return vector[:limit]
+
+    monkeypatch.setattr(rag_service, "search_similar_chunks", fake_vector)
+
+    def set_lexical(fn):
+        monkeypatch.setattr(rag_service, "lexical_search", fn)
+
+    return set_lexical
+
+
+def test_hybrid_merges_lexical_hits(legs):
+    async def lexical(query, document_ids, limit, timeout_ms):
+        return [chunk(9), chunk(3)]
+    legs(lexical)
+
+    result = asyncio.run(rag_service.hybrid_search(None, "error E-4021", limit=3, query_embedding=[0.0]))
+
+    assert [c.id for c in result] == [3, 1, 9]
+
+
+def test_hybrid_drops_slow_lexical_leg(legs):
+    async def lexical(query, document_ids, limit, timeout_ms):
+        await asyncio.sleep(1)
+        return [chunk(9)]
+    legs(lexical)
+
+    result = asyncio.run(rag_service.hybrid_search(None, "q", limit=2, query_embedding=[0.0], budget_ms=20))
+
+    assert [c.id for c in result] == [1, 2]
+
+
+def test_hybrid_drops_failed_lexical_leg(legs):
+    async def lexical(query, document_ids, limit, timeout_ms):
+        raise RuntimeError("canceling statement due to statement timeout")
+    legs(lexical)
+
+    result = asyncio.run(rag_service.hybrid_search(None, "q", limit=2, query_embedding=[0.0]))
+
+    assert [c.id for c in result] == [1, 2]
@@ -0,0 +1,181 @@
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.metrics import StageTimer, metrics
+from app.services.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a passage by how many query words it contains."""
+
+    def __init__(self, model_name, device=None, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append((len(pairs), batch_size))
+        time.sleep(self.delay)
+        return np.array([
+            float(sum(word in passage.split() for word in query.split()))
+            for query, passage in pairs
+        ])
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(CrossEncoder=FakeCrossEncoder))
+    reranker = CrossEncoderReranker("fake", batch_size=8)
+    # Loaded up front so tests can tune the fake model
+    reranker.model
+    return reranker
+
+
+def chunks(*contents):
+    return [SimpleNamespace(id=i, content=content) for i, content in enumerate(contents)]
+
+
+def test_rerank_orders_by_score_and_keeps_top_k(reranker):
+    candidates = chunks("unrelated text", "blue whale size", "whale", "blue whale")
+
+    result = asyncio.run(reranker.rerank("blue whale size", candidates, top_k=2))
+
+    assert [c.id for c in result] == [1, 3]
+    # All candidates are scored in a single batched call
+    assert reranker.model.calls == [(4, 8)]
+
+
+def test_rerank_ties_keep_retrieval_order(reranker):
+    candidates = chunks("a", "b", "c")
+
+    result = asyncio.run(reranker.rerank("z", candidates, top_k=3))
+
+    assert [c.id for c in result] == [0, 1, 2]
+
+
+def test_rerank_falls_back_to_retrieval_order_on_timeout(reranker):
+    reranker.model.delay = 0.2
+    candidates = chunks("x", "y", "query")
+    before = metrics.counter("rerank_timeouts").value
+
+    result = asyncio.run(reranker.rerank("query", candidates, top_k=2, budget_ms=10))
+
+    assert [c.id for c in result] == [0, 1]
+    assert metrics.counter("rerank_timeouts").value == before + 1
+
+
+def test_stage_timer_reports_server_timing():
+    timer = StageTimer("test")
+    with timer.stage("embed"):
+        pass
+    with timer.stage("retrieve"):
+        time.sleep(0.01)
+
+    header = timer.server_timing()
+
+    assert header.startswith("embed;dur=")
+    assert ", retrieve;dur=" in header
+    assert timer.stages["retrieve"] >= 0.01
+
+
+def test_budget_counts_from_start_of_scoring(reranker):
+    # Each call scores in 0.1s; the second waits 0.1s for the first and
+    # still fits its own 0.15s budget
+    reranker.model.delay = 0.1
+    candidates = chunks("x", "query")
+
+    async def run():
+        return await asyncio.gather(*(reranker.rerank("query", candidates, top_k=1, budget_ms=150) for _ in range(2)))
+
+    results = asyncio.run(run())
+
+    assert [[c.id for c in result] for result in results] == [[1], [1]]
+
+
+def test_concurrent_overload_skips_instead_of_queueing(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(CrossEncoder=FakeCrossEncoder))
+    reranker = CrossEncoderReranker("fake", max_pending=2)
+    reranker.model
+    reranker.model.delay = 0.1
+    candidates = chunks("x", "query")
+    skipped = metrics.counter("rerank_skipped").value
+
+    async def run():
+        return await asyncio.gather(*(reranker.rerank("query", candidates, top_k=1, budget_ms=150) for _ in range(4)))
+
+    results = asyncio.run(run())
+
+    # Two are scored, two keep retrieval order without waiting
+    assert sorted(result[0].id for result in results) == [0, 0, 1, 1]
+    assert metrics.counter("rerank_skipped").value == skipped + 2
+    assert len(reranker.model.calls) == 2
+    assert reranker._pending == 0
+
+
+def test_abandoned_jobs_are_not_scored(reranker):
+    reranker.model.delay = 0.2
+    candidates = chunks("x", "query")
+
+    async def run():
+        slow = asyncio.ensure_future(reranker.rerank("query", candidates, top_k=1, budget_ms=1000))
+        await asyncio.sleep(0.01)
+        # The caller gives up while its job is still queued behind the first
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(reranker.rerank("query", candidates, top_k=1, budget_ms=1000), 0.05)
+        await slow
+
+    asyncio.run(run())
+    reranker._executor.submit(lambda: None).result()
+
+    assert len(reranker.model.calls) == 1
+
+
+class FailingCrossEncoder:
+    loads = 0
+
+    def __init__(self, model_name, device=None):
+        FailingCrossEncoder.loads += 1
+        raise OSError("download failed")
+
+
+def test_model_is_loaded_on_first_rerank_not_construction(monkeypatch):
+    loads = []
+
+    class CountingCrossEncoder(FakeCrossEncoder):
+        def __init__(self, model_name, device=None):
+            loads.append(model_name)
+            time.sleep(0.05)
+            super().__init__(model_name, device)
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(CrossEncoder=CountingCrossEncoder))
+    reranker = CrossEncoderReranker("fake")
+    assert loads == []
+
+    async def run():
+        # A request and warm-up (on another thread) load at the same time
+        warm = asyncio.get_running_loop().run_in_executor(None, reranker.score, "q", ["q"])
+        result = await reranker.rerank("query", chunks("x", "query"), top_k=1)
+        await warm
+        return result
+
+    assert [c.id for c in asyncio.run(run())] == [1]
+    assert loads == ["fake"]
+
+
+def test_failed_model_load_falls_back_to_retrieval_order(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(CrossEncoder=FailingCrossEncoder))
+    FailingCrossEncoder.loads = 0
+    reranker = CrossEncoderReranker("fake")
+    errors = metrics.counter("rerank_errors").value
+
+    for _ in range(2):
+        result = asyncio.run(reranker.rerank("query", chunks("x", "query"), top_k=1))
+        assert [c.id for c in result] == [0]
+
+    assert metrics.counter("rerank_errors").value == errors + 2
+    # The failure is remembered instead of retried on every request
+    assert FailingCrossEncoder.loads == 1
@@ -0,0 +1,72 @@
+import re
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.v1 import router_chat
+from app.db.dependencies import get_async_db
+from app.models import Chunk, Document
+
+client = TestClient(app)
+
+
+class WordTokenizer:
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+
+def make_chunk(id, document, chunk_index, content):
+    return Chunk(id=id, document_id=document.id, document=document, chunk_index=chunk_index, content=content)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    policy = Document(id=1, filename="policy.pdf")
+    notes = Document(id=2, filename="notes.txt")
+    chunks = [
+        make_chunk(11, policy, 3, "Refunds are issued within 30 days. " * 10),
+        make_chunk(20, notes, 0, "Refunds need a receipt."),
+        make_chunk(12, policy, 4, "Store credit is offered after that."),
+    ]
+
+    async def stream(prompt):
+        for token in ("Within ", "30 days."):
+            yield token
+
+    batcher = MagicMock()
+    batcher.embed = AsyncMock(return_value=[0.0] * 384)
+    service = MagicMock(tokenizer=WordTokenizer())
+    monkeypatch.setattr(router_chat, "get_embedding_batcher", lambda: batcher)
+    monkeypatch.setattr(router_chat, "get_embedding_service", lambda: service)
+    monkeypatch.setattr(router_chat, "get_answer_cache", lambda: None)
+    monkeypatch.setattr(router_chat, "get_reranker", lambda: None)
+    monkeypatch.setattr(router_chat, "retrieve", AsyncMock(return_value=chunks))
+    monkeypatch.setattr(router_chat, "generate_response", AsyncMock(return_value="Within 30 days."))
+    monkeypatch.setattr(router_chat, "generate_response_stream", stream)
+    app.dependency_overrides[get_async_db] = lambda: MagicMock()
+    yield
+    app.dependency_overrides = {}
+
+
+def test_chat_returns_sources_and_usage(chat):
+    response = client.post("/chat/", json={"message": "How long do refunds take?"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["response"] == "Within 30 days."
+    # Adjacent chunks 3 and 4 of policy.pdf are one source
+    assert [(s["filename"], s["chunk_index"]) for s in data["sources"]] == [("policy.pdf", 3), ("notes.txt", 0)]
+    assert data["sources"][0]["snippet"].endswith("…")
+    assert len(data["sources"][0]["snippet"]) <= router_chat.SNIPPET_CHARS + 1
+    assert data["usage"]["sources"] == 2
+    assert "retrieve;dur=" in response.headers["Server-Timing"]
+
+
+def test_streamed_chat_ends_with_sources(chat):
+    response = client.post("/chat/", json={"message": "How long do refunds take?", "stream": True})
+
+    events = re.findall(r"event: (\w+)", response.text)
+    assert events == ["token", "token", "sources", "done"]
+    assert '"filename": "notes.txt"' in response.text
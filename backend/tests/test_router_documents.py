@@ -22,6 +22,7 @@ def mock_db():
     def side_effect_refresh(instance):
         instance.id = 1
         instance.created_at = "2024-01-01T00:00:00" # Mock date if needed
+        instance.updated_at = "2024-01-01T00:00:00"
         
     mock.refresh.side_effect = side_effect_refresh
     return mock
@@ -33,30 +34,139 @@ def override_dependencies(mock_db):
     app.dependency_overrides = {}
 
 @pytest.fixture
-    # Mock the embedding service
-    mock_service = MagicMock()
-    # Mocking single embedding
-    mock_service.get_embedding.return_value = [0.1] * 384
-    # Mocking batch embeddings
-    mock_service.get_embeddings.side_effect = lambda texts, **kwargs: [[0.1] * 384] * len(texts)
-    
-    # Patch get_embedding_service in router_documents
-    monkeypatch.setattr("app.api.v1.router_documents.get_embedding_service", lambda: mock_service)
-    
-    # Also patch in rag_service if it's used there (though this test might only cover upload)
-    monkeypatch.setattr("app.services.rag_service.get_embedding_service", lambda: mock_service)
-    
-    return mock_service
+def mock_ingestion_queue(monkeypatch, tmp_path):
+    # Keep uploads out of the working tree and jobs out of the worker pool
+    monkeypatch.setattr("app.services.ingestion_service.UPLOAD_DIR", str(tmp_path))
+    mock_queue = MagicMock()
+    monkeypatch.setattr("app.api.v1.router_documents.get_ingestion_queue", lambda: mock_queue)
+    return mock_queue
 
-def test_upload_document_success(override_dependencies, mock_embedding_service, mock_db):
+def test_upload_document_queues_job(override_dependencies, mock_ingestion_queue, mock_db, tmp_path):
     filename = "test_doc.txt"
     content = b"This is a dummy test content for verifying the fix."
     files = {"file": (filename, content, "text/plain")}
     
     response = client.post("/documents/upload", files=files)
     
-    # If we get 200, the await error is gone
-    assert response.status_code == 200, f"Upload failed with status {response.status_code}: {response.json()}"
+    assert response.status_code == 202, f"Upload failed with status {response.status_code}: {response.json()}"
     data = response.json()
     assert data["filename"] == filename
+    assert data["status"] == "queued"
     assert "id" in data
+
+    mock_ingestion_queue.admit.assert_called_once()
+    mock_ingestion_queue.submit.assert_called_once()
+    stored = list(tmp_path.iterdir())
+    assert len(stored) == 1
+    assert stored[0].read_bytes() == content
+
+def test_upload_rejects_unsupported_format(override_dependencies, mock_ingestion_queue):
+    files = {"file": ("image.png", b"png", "image/png")}
+
+    response = client.post("/documents/upload", files=files)
+
+    assert response.status_code == 400
+    mock_ingestion_queue.admit.assert_not_called()
+
+def test_get_missing_job(override_dependencies):
+    response = client.get("/documents/jobs/42")
+
+    assert response.status_code == 404
+
+def test_upload_too_large_is_rejected(override_dependencies, mock_ingestion_queue, tmp_path):
+    files = {"file": ("big.txt", b"x" * (10 * 1024 * 1024 + 1), "text/plain")}
+
+    response = client.post("/documents/upload", files=files)
+
+    assert response.status_code == 413
+    mock_ingestion_queue.release.assert_called_once()
+    mock_ingestion_queue.submit.assert_not_called()
+    assert list(tmp_path.iterdir()) == []
+
+def test_update_missing_document(override_dependencies, mock_ingestion_queue):
+    files = {"file": ("policy.txt", b"revised", "text/plain")}
+
+    response = client.put("/documents/7", files=files)
+
+    assert response.status_code == 404
+    mock_ingestion_queue.admit.assert_not_called()
+
+def test_update_document_queues_reindex(override_dependencies, mock_ingestion_queue, mock_db):
+    mock_db.query.return_value.filter_by.return_value.first.return_value = (7,)
+    files = {"file": ("policy.txt", b"revised", "text/plain")}
+
+    response = client.put("/documents/7", files=files)
+
+    assert response.status_code == 202
+    data = response.json()
+    assert data["action"] == "update"
+    assert data["document_id"] == 7
+    mock_ingestion_queue.submit.assert_called_once()
+
+def _document_rows(count):
+    from collections import namedtuple
+    from datetime import datetime, timedelta
+    Row = namedtuple("Row", "id filename file_hash created_at")
+    start = datetime(2024, 1, 1)
+    return [Row(i, f"doc{i}.txt", f"{i:064x}", start - timedelta(minutes=i)) for i in range(1, count + 1)]
+
+def test_list_documents_pages_with_cursor(override_dependencies, mock_db):
+    query = mock_db.query.return_value
+    query.order_by.return_value.limit.return_value.all.return_value = _document_rows(3)
+
+    response = client.get("/documents/?limit=2")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [d["id"] for d in data["items"]] == [1, 2]
+    assert "content" not in data["items"][0]
+    assert data["next_cursor"]
+    query.order_by.return_value.limit.assert_called_once_with(3)
+
+    query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = _document_rows(3)[2:]
+    response = client.get(f"/documents/?limit=2&cursor={data['next_cursor']}")
+
+    assert [d["id"] for d in response.json()["items"]] == [3]
+    assert response.json()["next_cursor"] is None
+    query.filter.assert_called_once()
+
+def test_list_documents_rejects_bad_cursor(override_dependencies):
+    response = client.get("/documents/?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+
+def test_list_documents_optional_columns(override_dependencies, mock_db):
+    mock_db.query.return_value.order_by.return_value.limit.return_value.all.return_value = []
+
+    response = client.get("/documents/?include=chunk_count&include=size")
+
+    assert response.status_code == 200
+    labels = [getattr(c, "name", None) for c in mock_db.query.call_args.args]
+    assert labels[-2:] == ["chunk_count", "size"]
+
+def test_stream_document_content(override_dependencies, mock_db, monkeypatch):
+    monkeypatch.setattr("app.services.blob_store.READ_BLOCK_CHARS", 4)
+    mock_db.query.return_value.filter_by.return_value.first.return_value = MagicMock(content="héllo wörld", content_ref=None)
+
+    response = client.get("/documents/1/content")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == "héllo wörld"
+
+def test_stream_missing_document_content(override_dependencies):
+    response = client.get("/documents/1/content")
+
+    assert response.status_code == 404
+
+def test_stream_offloaded_document_content(override_dependencies, mock_db, monkeypatch, tmp_path):
+    from app.services.blob_store import BlobStore
+    store = BlobStore(str(tmp_path))
+    store.put("ab" * 32, ["offloaded ", "text"])
+    monkeypatch.setattr("app.services.blob_store.get_blob_store", lambda: store)
+    mock_db.query.return_value.filter_by.return_value.first.return_value = MagicMock(content=None, content_ref="ab" * 32)
+
+    response = client.get("/documents/1/content")
+
+    assert response.status_code == 200
+    assert response.text == "offloaded text"
@@ -0,0 +1,87 @@
+import threading
+
+from app.services import vector_index
+from app.services.vector_index import (
+    IndexState,
+    hnsw_ef_search,
+    ivfflat_lists,
+    ivfflat_probes,
+    plan_maintenance,
+    search_settings,
+    settings_statement,
+)
+
+
+def state(kind="hnsw", opclass_ok=True, valid=True, lists=None, m=16, ef_construction=64, built_rows=None):
+    return IndexState(kind, opclass_ok, valid, lists, m, ef_construction, built_rows, 0)
+
+
+def test_lists_follow_table_size():
+    assert ivfflat_lists(500) == 1
+    assert ivfflat_lists(100_000) == 100
+    assert ivfflat_lists(4_000_000) == 2000
+
+
+def test_legacy_index_is_rebuilt():
+    # create_all's index: ivfflat, default lists, L2 opclass, unknown build size
+    legacy = state(kind="ivfflat", opclass_ok=False, lists=100, m=None, ef_construction=None)
+
+    assert plan_maintenance(legacy, 50_000, kind="hnsw")
+    assert plan_maintenance(legacy, 50_000, kind="ivfflat")
+    assert plan_maintenance(legacy, 10, kind="ivfflat") == "drop"
+
+
+def test_healthy_indexes_are_kept():
+    assert plan_maintenance(state(), 1_000_000, kind="hnsw") is None
+    ivf = state(kind="ivfflat", lists=50, m=None, ef_construction=None, built_rows=50_000)
+    assert plan_maintenance(ivf, 60_000, kind="ivfflat") is None
+    assert plan_maintenance(None, 100, kind="ivfflat") is None
+
+
+def test_rebuild_triggers():
+    assert plan_maintenance(None, 0, kind="hnsw") == "missing"
+    assert plan_maintenance(state(valid=False), 100, kind="hnsw") == "invalid"
+    assert plan_maintenance(state(m=8), 100, kind="hnsw")
+    ivf = state(kind="ivfflat", lists=50, m=None, ef_construction=None, built_rows=50_000)
+    assert "grew" in plan_maintenance(ivf, 100_000, kind="ivfflat")
+
+
+def test_search_effort_grows_with_recall():
+    assert ivfflat_probes(100, 0.95) == 10
+    assert ivfflat_probes(100, 0.8) < ivfflat_probes(100, 0.95) < ivfflat_probes(100, 0.99) <= 100
+    assert ivfflat_probes(100, 1.0) == 100
+    assert hnsw_ef_search(0.95, 5) == 40
+    assert hnsw_ef_search(0.5, 50) == 50
+    assert hnsw_ef_search(0.9999, 5) == 1000
+
+
+def test_search_settings(monkeypatch):
+    monkeypatch.setattr(vector_index, "_state", state(kind="ivfflat", lists=400, m=None, ef_construction=None))
+
+    assert search_settings(1.0, 5) == {"enable_indexscan": "off"}
+    assert search_settings(0.95, 5) == {"hnsw.ef_search": "40", "ivfflat.probes": "20"}
+
+    statement, params = settings_statement({"hnsw.ef_search": "40"})
+    assert "set_config(:name0, :value0, true)" in str(statement)
+    assert params == {"name0": "hnsw.ef_search", "value0": "40"}
+
+
+def test_maintenance_runs_off_the_calling_thread(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_maintain(engine):
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+
+    monkeypatch.setattr(vector_index, "maybe_maintain", slow_maintain)
+    monkeypatch.setattr(vector_index, "_checked_at", 0.0)
+    monkeypatch.setattr(vector_index, "_maintain_thread", None)
+
+    vector_index.maintain_in_background(None)
+    # A second caller neither blocks nor starts another rebuild
+    vector_index.maintain_in_background(None)
+    release.set()
+    vector_index._maintain_thread.join(5)
+
+    assert calls == ["vector-index-maintenance"]
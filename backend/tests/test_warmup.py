@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import services
+from app.api.v1 import router_misc
+from app.db.dependencies import get_db
+from app.main import app
+from app.services import warmup
+from app.services.SentenceTransformerService import SentenceTransformerService, get_embedding_service
+from app.services.warmup import Readiness, start_warmup, warm_up
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def readiness(monkeypatch):
+    state = Readiness()
+    monkeypatch.setattr(warmup, "readiness", state)
+    monkeypatch.setattr(router_misc, "readiness", state)
+    return state
+
+
+@pytest.fixture
+def models(monkeypatch):
+    service, reranker = MagicMock(), MagicMock()
+    monkeypatch.setattr(services, "get_embedding_service", lambda: service)
+    monkeypatch.setattr(services, "get_reranker", lambda: reranker)
+    return service, reranker
+
+
+def test_warm_up_runs_each_model_once(readiness, models):
+    service, reranker = models
+
+    warm_up()
+
+    service.encode.assert_called_once_with([warmup.WARMUP_TEXT], use_cache=False, normalize=True)
+    reranker.score.assert_called_once()
+    assert readiness.ready
+    assert readiness.status()["status"] == "ready"
+
+
+def test_failed_warm_up_stays_not_ready(readiness, models):
+    service, _ = models
+    service.encode.side_effect = RuntimeError("Could not load embedding model")
+
+    warm_up()
+
+    assert not readiness.ready
+    assert readiness.status() == {
+        "status": "failed", "warmup_seconds": None, "error": "Could not load embedding model",
+    }
+
+
+def test_warm_up_can_be_disabled(readiness):
+    start_warmup("off")
+    assert readiness.ready
+
+    with pytest.raises(ValueError):
+        start_warmup("eager")
+
+
+def test_ready_waits_for_models_but_health_does_not(readiness):
+    app.dependency_overrides[get_db] = lambda: MagicMock()
+    try:
+        assert client.get("/ready").status_code == 503
+        assert client.get("/ready").json()["model"]["status"] == "warming"
+        assert client.get("/health").status_code == 200
+
+        readiness.mark_ready(1.5)
+        assert client.get("/ready").status_code == 200
+    finally:
+        app.dependency_overrides = {}
+
+
+def test_failed_warm_up_is_retried_until_ready(readiness, models):
+    service, _ = models
+    service.encode.side_effect = [RuntimeError("model download timed out"), RuntimeError("again"), None]
+
+    warmup.warm_up_until_ready(initial_delay=0.01)
+
+    assert service.encode.call_count == 3
+    assert readiness.ready and readiness.error is None
+
+
+def test_loading_on_first_use_recovers_readiness(readiness, monkeypatch):
+    readiness.mark_failed("model download timed out")
+    get_embedding_service.cache_clear()
+    monkeypatch.setattr(SentenceTransformerService, "_instance", None)
+    monkeypatch.setattr(SentenceTransformerService, "_model", None)
+    monkeypatch.setattr(SentenceTransformerService, "_cache", None)
+    try:
+        with patch("app.services.SentenceTransformerService.load_embedding_model"):
+            get_embedding_service()
+    finally:
+        get_embedding_service.cache_clear()
+
+    assert readiness.ready
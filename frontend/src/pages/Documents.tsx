@@ -1,19 +1,22 @@
 import { useEffect, useState } from 'react';
 import { ArrowLeft, FileText, Trash2, Loader2, Sparkles } from 'lucide-react';
 import { Link } from 'react-router-dom';
-import { getDocuments, deleteDocument, DocumentResponse } from '@/services/api';
+import { getDocuments, deleteDocument, DocumentSummary } from '@/services/api';
 import { Button } from '@/components/ui/button';
 import { toast } from 'sonner';
 
 const Documents = () => {
-    const [documents, setDocuments] = useState<DocumentResponse[]>([]);
+    const [documents, setDocuments] = useState<DocumentSummary[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [isLoading, setIsLoading] = useState(true);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [isDeleting, setIsDeleting] = useState<number | null>(null);
 
     const fetchDocuments = async () => {
         try {
-            const data = await getDocuments();
-            setDocuments(data);
+            const page = await getDocuments();
+            setDocuments(page.items);
+            setNextCursor(page.next_cursor);
         } catch (error) {
             toast.error("Failed to load documents");
             console.error(error);
@@ -22,6 +25,22 @@ const Documents = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+
+        setIsLoadingMore(true);
+        try {
+            const page = await getDocuments(nextCursor);
+            setDocuments(current => [...current, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (error) {
+            toast.error("Failed to load more documents");
+            console.error(error);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchDocuments();
     }, []);
@@ -32,7 +51,7 @@ const Documents = () => {
         setIsDeleting(id);
         try {
             await deleteDocument(id);
-            setDocuments(documents.filter(doc => doc.id !== id));
+            setDocuments(current => current.filter(doc => doc.id !== id));
             toast.success("Document deleted");
         } catch (error) {
             toast.error("Failed to delete document");
@@ -143,6 +162,14 @@ const Documents = () => {
                                     </tbody>
                                 </table>
                             </div>
+                            {nextCursor && (
+                                <div className="flex justify-center border-t p-4">
+                                    <Button variant="outline" onClick={loadMore} disabled={isLoadingMore}>
+                                        {isLoadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+                                        Load more
+                                    </Button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
@@ -14,16 +14,74 @@ export interface DocumentResponse {
     file_hash: string;
 }
 
+export interface DocumentSummary {
+    id: number;
+    filename: string;
+    file_hash: string;
+    created_at: string;
+    chunk_count?: number | null;
+    size?: number | null;
+}
+
+export interface DocumentPage {
+    items: DocumentSummary[];
+    next_cursor: string | null;
+}
+
+export interface SourceInfo {
+    document_id: number;
+    filename: string;
+    // First chunk of the source; adjacent chunks are merged into one source
+    chunk_index: number;
+    snippet: string;
+}
+
+export interface PromptUsage {
+    prompt_tokens: number;
+    context_tokens: number;
+    retrieved_tokens: number;
+    sources: number;
+    sources_dropped: number;
+}
+
 export interface ChatResponse {
     response: string;
-    sources: Array<{
-        document_id: number;
-        content: string;
-        chunk_index: number;
-    }>;
+    // In prompt order: sources[0] is "[Source 1]"
+    sources: SourceInfo[];
+    usage: PromptUsage;
+}
+
+export interface IngestionJobResponse {
+    id: number;
+    filename: string;
+    status: "queued" | "running" | "succeeded" | "failed";
+    stage: string;
+    progress: number;
+    attempts: number;
+    error: string | null;
+    document_id: number | null;
+    created_at: string;
+    updated_at: string;
 }
 
-export async function uploadDocument(file: File): Promise<DocumentResponse> {
+const JOB_POLL_INTERVAL_MS = 1000;
+
+export async function getIngestionJob(id: number): Promise<IngestionJobResponse> {
+    const response = await fetch(`${API_BASE_URL}/documents/jobs/${id}`, {
+        headers: {
+            ...getAuthHeader(),
+        }
+    });
+    if (!response.ok) {
+        throw new Error("Failed to fetch upload status");
+    }
+    return response.json();
+}
+
+export async function uploadDocument(
+    file: File,
+    onProgress?: (progress: number) => void
+): Promise<DocumentResponse> {
     const formData = new FormData();
     formData.append("file", file);
 
@@ -40,7 +98,25 @@ export async function uploadDocument(file: File): Promise<DocumentResponse> {
         throw new Error(errorData.detail || "Failed to upload document");
     }
 
-    return response.json();
+    // The document is processed in the background; poll the ingestion job
+    let job: IngestionJobResponse = await response.json();
+    while (job.status === "queued" || job.status === "running") {
+        onProgress?.(job.progress);
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        job = await getIngestionJob(job.id);
+    }
+
+    if (job.status !== "succeeded" || job.document_id === null) {
+        throw new Error(job.error || "Failed to process document");
+    }
+
+    return {
+        id: job.document_id,
+        filename: job.filename,
+        content: "",
+        created_at: job.updated_at,
+        file_hash: "",
+    };
 }
 
 export async function chat(
@@ -73,8 +149,15 @@ export async function chat(
     return response.json();
 }
 
-export async function getDocuments(): Promise<DocumentResponse[]> {
-    const response = await fetch(`${API_BASE_URL}/documents/`, {
+const DOCUMENT_PAGE_SIZE = 50;
+
+export async function getDocuments(
+    cursor: string | null = null,
+    limit: number = DOCUMENT_PAGE_SIZE
+): Promise<DocumentPage> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) params.set("cursor", cursor);
+    const response = await fetch(`${API_BASE_URL}/documents/?${params}`, {
         headers: {
             ...getAuthHeader(),
         }